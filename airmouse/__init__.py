@@ -0,0 +1 @@
+"""Host-side helpers shared by the air mouse overlay scripts."""
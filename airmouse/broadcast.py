@@ -0,0 +1,349 @@
+"""Pointer state published in shared memory for other local processes.
+
+OBS overlays, recorders or a viewer page can follow the laser without
+polling the screen: the overlay writes every filtered pointer sample into a
+fixed ring of records in a named shared memory block, and any number of
+readers map the same block and pick up new records on their own schedule.
+
+Layout: a 64-byte header (HEADER, then the record count `head` as a uint64
+at HEAD_OFFSET) followed by `slots` RECORD-sized entries. Record n (from 1)
+lives in slot (n - 1) % slots and carries n in its seq field. The writer
+zeroes seq, writes the fields, stores seq = n and only then advances head.
+A reader copies the record (seq first), then reads seq again from the
+block: if both are n the copy is consistent. A writer that got to the slot
+in between, even halfway through the fields, left 0 or a later seq there,
+and the record counts as missed. This relies on stores and loads being
+seen in program order, which holds on x86; nothing here blocks the writer.
+
+On Linux the block is /dev/shm/<name>, so readers need not be Python.
+
+Usage:
+    python -m airmouse.broadcast [NAME] [--json]   # follow the pointer
+"""
+import os
+import sys
+import mmap
+import time
+import struct
+import argparse
+from collections import namedtuple
+
+import numpy as np
+
+from airmouse.protocol import buttons_to_mask
+
+DEFAULT_NAME = "airmouse"
+MAGIC = b"AMPTR\x00"
+VERSION = 1
+
+# magic, version, record size, slots, writer pid, open flag, desktop left,
+# top, width, height (pixels)
+HEADER = struct.Struct("<6sHHxxIIIiiII")
+OPEN_OFFSET = 20
+HEAD_OFFSET = 56
+HEADER_SIZE = 64
+# seq, host monotonic time (s), x, y (global pixels), button bitmask, laser
+# on, remote index, padding to 32 bytes
+RECORD = struct.Struct("<QdffHBB4x")
+_SEQ = struct.Struct("<Q")
+_FIELDS = struct.Struct("<dffHBB4x")
+# Batches up to this size are written with struct, larger ones with NumPy.
+_SMALL_BATCH = 8
+
+PointerState = namedtuple("PointerState", "seq t x y buttons laser remote")
+
+
+def record_dtype():
+    return np.dtype({
+        "names": ["seq", "t", "x", "y", "buttons", "laser", "remote"],
+        "formats": ["<u8", "<f8", "<f4", "<f4", "<u2", "u1", "u1"],
+        "offsets": [0, 8, 16, 20, 24, 26, 27],
+        "itemsize": RECORD.size,
+    })
+
+
+def _attach(name):
+    """(buffer, close) of an existing block, mapped read-only on Linux."""
+    path = os.path.join("/dev/shm", name.lstrip("/"))
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return m, m.close
+    from multiprocessing import shared_memory
+    try:
+        shm = shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        # Before Python 3.13 every attach is tracked, and the tracker
+        # unlinks the block when the reader exits.
+        shm = shared_memory.SharedMemory(name)
+        if os.name == "posix":
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+    return shm.buf, shm.close
+
+
+def _pid_alive(pid):
+    if os.name != "posix":
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class PointerBroadcast:
+    """Writer side: one per overlay, owns (creates and removes) the block.
+
+    publish() runs on the GUI thread once per batch: a few struct stores
+    per record for small batches, NumPy slice stores for large ones.
+    """
+
+    def __init__(self, name=DEFAULT_NAME, slots=4096, geometry=(0, 0, 0, 0)):
+        self.name = name
+        self.slots = int(slots)
+        if self.slots < 2:
+            raise ValueError("need at least 2 slots")
+        size = HEADER_SIZE + self.slots * RECORD.size
+        from multiprocessing import shared_memory
+        try:
+            self._shm = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a writer that died; refuse a live one.
+            buf, close = _attach(name)
+            try:
+                magic, _, _, _, pid, is_open = HEADER.unpack_from(buf)[:6]
+            finally:
+                close()
+            if magic == MAGIC and is_open and pid != os.getpid() and _pid_alive(pid):
+                raise OSError(f"shared memory {name!r} is already published by process {pid}")
+            old = shared_memory.SharedMemory(name)
+            old.close()
+            old.unlink()
+            self._shm = shared_memory.SharedMemory(name, create=True, size=size)
+        buf = self._buf = self._shm.buf
+        buf[:size] = bytes(size)
+        self._head = np.ndarray((1,), "<u8", buffer=buf, offset=HEAD_OFFSET)
+        self._ring = np.ndarray((self.slots,), record_dtype(), buffer=buf, offset=HEADER_SIZE)
+        self.set_geometry(*geometry)
+        self.published = 0
+        self.batches = 0
+
+    def set_geometry(self, left, top, width, height):
+        """The desktop area the pixel coordinates refer to."""
+        HEADER.pack_into(self._buf, 0, MAGIC, VERSION, RECORD.size, self.slots, os.getpid(), 1,
+                         int(left), int(top), int(width), int(height))
+
+    def publish(self, samples, x, y, laser, remote=0):
+        """Publish a batch: sample dicts (for time and buttons) and their
+        filtered screen positions. laser is the state after the batch."""
+        n = len(samples)
+        if not n:
+            return
+        head = int(self._head[0])
+        if n > self.slots:
+            samples, x, y = samples[-self.slots:], x[-self.slots:], y[-self.slots:]
+            head += n - self.slots
+            n = self.slots
+        if n <= _SMALL_BATCH:
+            # The usual tick: a few struct stores beat NumPy's per-call setup.
+            buf, slots, size = self._buf, self.slots, RECORD.size
+            for k in range(n):
+                sample = samples[k]
+                offset = HEADER_SIZE + (head + k) % slots * size
+                _SEQ.pack_into(buf, offset, 0)
+                _FIELDS.pack_into(buf, offset + 8, sample["t"], x[k], y[k],
+                                  buttons_to_mask(sample["buttons"]), laser, remote)
+                _SEQ.pack_into(buf, offset, head + k + 1)
+        else:
+            seq = np.arange(head + 1, head + n + 1, dtype=np.uint64)
+            ring = self._ring
+            # At most two contiguous runs; slices keep the stores cheap.
+            start = head % self.slots
+            first = min(n, self.slots - start)
+            for lo, hi, src in ((start, start + first, slice(0, first)), (0, n - first, slice(first, n))):
+                if hi <= lo:
+                    continue
+                rows = ring[lo:hi]
+                rows["seq"] = 0
+                rows["t"] = [s["t"] for s in samples[src]]
+                rows["x"] = x[src]
+                rows["y"] = y[src]
+                rows["buttons"] = [buttons_to_mask(s["buttons"]) for s in samples[src]]
+                rows["laser"] = laser
+                rows["remote"] = remote
+                rows["seq"] = seq[src]
+        self._head[0] = head + n
+        self.published += n
+        self.batches += 1
+
+    def close(self):
+        if self._shm is None:
+            return
+        struct.pack_into("<I", self._buf, OPEN_OFFSET, 0)
+        del self._head, self._ring, self._buf
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def summary(self):
+        return (f"Broadcast {self.name!r}: {self.published} pointer records in {self.batches} "
+                f"batches ({self.slots} slots)")
+
+
+class PointerReader:
+    """Reader side: attaches to a published block by name.
+
+    read() returns the records published since the last call as a NumPy
+    structured array (fields of record_dtype()); latest() just the newest
+    one. Records overwritten before they were read are counted in .missed.
+    """
+
+    def __init__(self, name=DEFAULT_NAME):
+        self.name = name
+        self._buf, self._close = _attach(name)
+        try:
+            magic, version, record_size, slots = HEADER.unpack_from(self._buf)[:4]
+            if magic != MAGIC:
+                raise ValueError(f"shared memory {name!r} is not an airmouse pointer broadcast")
+            if version != VERSION or record_size != RECORD.size:
+                raise ValueError(f"shared memory {name!r}: unsupported version {version}")
+        except ValueError:
+            self._close()
+            raise
+        self.slots = slots
+        self._head = np.ndarray((1,), "<u8", buffer=self._buf, offset=HEAD_OFFSET)
+        self._ring = np.ndarray((slots,), record_dtype(), buffer=self._buf, offset=HEADER_SIZE)
+        # Start at the present: read() returns what comes next.
+        self.next = int(self._head[0])
+        self.missed = 0
+
+    @property
+    def head(self):
+        """Records published so far."""
+        return int(self._head[0])
+
+    @property
+    def closed(self):
+        """True once the writer has shut down (reattach to follow a new one)."""
+        return not HEADER.unpack_from(self._buf)[5]
+
+    @property
+    def writer_pid(self):
+        return HEADER.unpack_from(self._buf)[4]
+
+    @property
+    def geometry(self):
+        """(left, top, width, height) of the desktop the pixels refer to."""
+        return HEADER.unpack_from(self._buf)[6:10]
+
+    def read(self):
+        head = int(self._head[0])
+        start = self.next
+        if head - start > self.slots:
+            self.missed += head - self.slots - start
+            start = head - self.slots
+        self.next = head
+        if head == start:
+            return self._ring[:0].copy()
+        idx = np.arange(start, head) % self.slots
+        records = self._ring[idx]           # fancy indexing copies
+        expected = np.arange(start + 1, head + 1, dtype=np.uint64)
+        # seq again, after the copy: the writer may have started on a slot
+        # after its old seq was copied, and the fields may be the new ones.
+        ok = (records["seq"] == expected) & (self._ring["seq"][idx] == expected)
+        if not ok.all():
+            # Lapped by the writer while copying.
+            self.missed += int((~ok).sum())
+            records = records[ok]
+        return records
+
+    def latest(self, retries=100):
+        """The newest record as a PointerState, or None if nothing was
+        published yet."""
+        ring = self._ring
+        for _ in range(retries):
+            head = int(self._head[0])
+            if not head:
+                return None
+            i = (head - 1) % self.slots
+            rec = ring[i:i + 1].copy()[0]
+            if int(rec["seq"]) == head and int(ring["seq"][i]) == head:
+                return PointerState(head, float(rec["t"]), float(rec["x"]), float(rec["y"]),
+                                    int(rec["buttons"]), bool(rec["laser"]), int(rec["remote"]))
+        return None
+
+    def close(self):
+        if self._buf is None:
+            return
+        del self._head, self._ring
+        self._buf = None
+        self._close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Follow the pointer published by app.py --broadcast.")
+    parser.add_argument("name", nargs="?", default=DEFAULT_NAME)
+    parser.add_argument("--json", action="store_true", help="print every record as a JSON line")
+    parser.add_argument("--interval", type=float, default=0.01, help="poll interval in seconds")
+    args = parser.parse_args()
+
+    reader = None
+    last_print = 0.0
+    count = 0
+    try:
+        while True:
+            if reader is None or reader.closed:
+                if reader is not None:
+                    print("writer closed, waiting for a new one", file=sys.stderr)
+                    reader.close()
+                    reader = None
+                try:
+                    reader = PointerReader(args.name)
+                    print(f"following {args.name!r} (writer pid {reader.writer_pid}, desktop "
+                          f"{reader.geometry})", file=sys.stderr)
+                except (FileNotFoundError, ValueError):
+                    time.sleep(0.5)
+                    continue
+            records = reader.read()
+            count += len(records)
+            now = time.monotonic()
+            if args.json:
+                for r in records:
+                    print(f'{{"t": {r["t"]:.6f}, "x": {r["x"]:.1f}, "y": {r["y"]:.1f}, '
+                          f'"buttons": {r["buttons"]}, "laser": {str(bool(r["laser"])).lower()}, '
+                          f'"remote": {r["remote"]}}}')
+            elif len(records) and now - last_print >= 0.1:
+                r = records[-1]
+                print(f"\rremote {r['remote']}  ({r['x']:7.1f}, {r['y']:7.1f})  "
+                      f"laser {'on ' if r['laser'] else 'off'}  buttons {int(r['buttons']):04b}  "
+                      f"age {(now - r['t']) * 1e3:6.2f} ms  {count} records, {reader.missed} missed",
+                      end="", flush=True)
+                last_print = now
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print()
+    finally:
+        if reader is not None:
+            reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Button events from timestamped button states: a table-driven FSM.
+
+Each button runs a small state machine compiled into a flat transition
+table from the bindings, driven by the samples' own timestamps (the device
+clock for binary frames) instead of the GUI tick, so click/hold thresholds
+are exact to the sample. Per sample the cost is a tuple compare, plus one
+table lookup per changed button and per expired timer.
+
+Events, each (t, kind, button):
+
+    press, release  every edge (presses that become part of a chord are
+                    swallowed, with their release)
+    click           released before long_press; when the button also has a
+                    "double" binding it waits double_click seconds for a
+                    second press first
+    double          second press within double_click of a click
+    long            held for long_press
+    repeat          every `repeat` seconds while held past long_press, only
+                    when bound
+    long_release    released after "long"
+    chord           all buttons of a bound chord pressed within
+                    chord_window; their presses are held back that long.
+                    button is the tuple of member buttons
+
+Config (a dict, or JSON via load_config()):
+
+    {"long_press": 0.4, "double_click": 0.3, "repeat": 0.1, "chord_window": 0.08,
+     "bindings": [
+        {"event": "press", "button": 2, "action": "toggle_laser"},
+        {"event": "click", "button": 1, "when": "laser", "action": "left_click"},
+        {"event": "press", "button": 0, "when": "no_laser", "action": "key", "args": ["up"]},
+        {"event": "chord", "buttons": [0, 3], "action": "recalibrate"}]}
+
+"when" is "laser", "no_laser" or absent (always). Action names and args
+are up to the overlay that runs the bindings.
+"""
+import json
+
+EVENTS = ("press", "release", "click", "double", "long", "repeat", "long_release", "chord")
+WHEN = ("laser", "no_laser")
+TIMING = {"long_press": 0.4, "double_click": 0.3, "repeat": 0.1, "chord_window": 0.08}
+N_BUTTONS = 4
+
+# States and inputs of the per-button machine.
+UP, PENDING, DOWN, HELD, WAIT, DOWN2, CHORD = range(7)
+PRESS, RELEASE, TIMEOUT, CHORDED = range(4)
+_N_INPUTS = 4
+# Timer armed on entering a state.
+_NO_TIMER, _T_CHORD, _T_LONG, _T_REPEAT, _T_DOUBLE = range(5)
+_NEVER = float("inf")
+
+
+def _compile(has_chord, has_double, has_repeat):
+    """Flat table[state * _N_INPUTS + input] = (next state, events, timer);
+    None ignores the input."""
+    table = [None] * (7 * _N_INPUTS)
+
+    def on(state, inp, nxt, events, timer=_NO_TIMER):
+        table[state * _N_INPUTS + inp] = (nxt, events, timer)
+
+    # A short press either clicks at once or waits to see if it is a double.
+    if has_double:
+        short = (WAIT, ("release",), _T_DOUBLE)
+    else:
+        short = (UP, ("release", "click"), _NO_TIMER)
+    if has_chord:
+        on(UP, PRESS, PENDING, (), _T_CHORD)
+    else:
+        on(UP, PRESS, DOWN, ("press",), _T_LONG)
+    on(PENDING, TIMEOUT, DOWN, ("press",), _T_LONG)
+    on(PENDING, RELEASE, short[0], ("press",) + short[1], short[2])
+    on(PENDING, CHORDED, CHORD, ())
+    on(DOWN, RELEASE, *short)
+    on(DOWN, TIMEOUT, HELD, ("long",), _T_REPEAT if has_repeat else _NO_TIMER)
+    on(HELD, TIMEOUT, HELD, ("repeat",), _T_REPEAT)
+    on(HELD, RELEASE, UP, ("release", "long_release"))
+    on(WAIT, PRESS, DOWN2, ("press", "double"))
+    on(WAIT, TIMEOUT, UP, ("click",))
+    on(DOWN2, RELEASE, UP, ("release",))
+    on(CHORD, RELEASE, UP, ())
+    return tuple(table)
+
+
+def load_config(path):
+    """Read a bindings config from a JSON file (validated by ButtonMachine)."""
+    with open(path) as f:
+        config = json.load(f)
+    ButtonMachine(config)
+    return config
+
+
+class ButtonMachine:
+    """Turns per-sample button states into events and bound actions."""
+
+    def __init__(self, config):
+        unknown = set(config) - set(TIMING) - {"bindings"}
+        if unknown:
+            raise ValueError(f"Unknown button config keys: {', '.join(sorted(unknown))}")
+        for name, default in TIMING.items():
+            value = float(config.get(name, default))
+            if value <= 0:
+                raise ValueError(f"{name} must be positive")
+            setattr(self, name, value)
+
+        self._bindings = {}
+        chords = []
+        bound = set()
+        for b in config.get("bindings", ()):
+            event = b.get("event")
+            if event not in EVENTS:
+                raise ValueError(f"Unknown button event {event!r}")
+            when = b.get("when")
+            if when is not None and when not in WHEN:
+                raise ValueError(f"'when' must be one of {', '.join(WHEN)}, got {when!r}")
+            if "action" not in b:
+                raise ValueError(f"Binding without an action: {b}")
+            if event == "chord":
+                button = tuple(sorted(set(b.get("buttons", ()))))
+                if len(button) < 2 or not all(0 <= i < N_BUTTONS for i in button):
+                    raise ValueError(f"A chord needs two or more of buttons 0-{N_BUTTONS - 1}: {b}")
+                if button not in chords:
+                    chords.append(button)
+                bound.update((event, i) for i in button)
+            else:
+                button = b.get("button")
+                if not isinstance(button, int) or not 0 <= button < N_BUTTONS:
+                    raise ValueError(f"Binding needs a button 0-{N_BUTTONS - 1}: {b}")
+                bound.add((event, button))
+            self._bindings.setdefault((event, button), []).append(
+                (when, b["action"], tuple(b.get("args", ()))))
+
+        # Only pay for the delays a button's bindings actually need.
+        self._tables = [_compile(("chord", i) in bound, ("double", i) in bound, ("repeat", i) in bound)
+                        for i in range(N_BUTTONS)]
+        self._chords = [[c for c in chords if i in c] for i in range(N_BUTTONS)]
+        self.reset()
+
+    def reset(self):
+        self._state = [UP] * N_BUTTONS
+        self._deadline = [_NEVER] * N_BUTTONS
+        self._pressed_at = [0.0] * N_BUTTONS
+        self._prev = (0,) * N_BUTTONS
+
+    @property
+    def next_deadline(self):
+        """Time of the next timer event (inf if none)."""
+        return min(self._deadline)
+
+    def feed(self, t, buttons):
+        """Advance to sample time t, then apply the sample's button states;
+        returns the events, in time order."""
+        events = []
+        if min(self._deadline) <= t:
+            self._advance(t, events)
+        prev = self._prev
+        if buttons != prev:
+            for i in range(N_BUTTONS):
+                if buttons[i] != prev[i]:
+                    self._input(i, PRESS if buttons[i] else RELEASE, t, events)
+            self._prev = tuple(buttons)
+        return events
+
+    def advance(self, t):
+        """Fire the timers due by t (no sample arrived to do it)."""
+        events = []
+        self._advance(t, events)
+        return events
+
+    def _advance(self, t, events):
+        deadline = self._deadline
+        while True:
+            d = min(deadline)
+            if d > t:
+                return
+            i = deadline.index(d)
+            self._input(i, TIMEOUT, d, events)
+            if deadline[i] < t and self._state[i] == HELD:
+                # After a stall, one catch-up repeat rather than a burst.
+                deadline[i] = t
+
+    def _input(self, i, inp, t, events):
+        entry = self._tables[i][self._state[i] * _N_INPUTS + inp]
+        if entry is None:
+            return
+        state, emit, timer = entry
+        if inp == PRESS:
+            self._pressed_at[i] = t
+        self._state[i] = state
+        for kind in emit:
+            events.append((t, kind, i))
+        if timer == _NO_TIMER:
+            self._deadline[i] = _NEVER
+        elif timer == _T_LONG:
+            self._deadline[i] = self._pressed_at[i] + self.long_press
+        elif timer == _T_REPEAT:
+            self._deadline[i] = t + self.repeat
+        elif timer == _T_DOUBLE:
+            self._deadline[i] = t + self.double_click
+        else:
+            self._deadline[i] = t + self.chord_window
+            for chord in self._chords[i]:
+                if all(self._state[j] == PENDING for j in chord):
+                    events.append((t, "chord", chord))
+                    for j in chord:
+                        self._input(j, CHORDED, t, events)
+                    break
+
+    def actions(self, kind, button, laser_on):
+        """(action, args) pairs bound to an event in the current mode."""
+        for when, action, args in self._bindings.get((kind, button), ()):
+            if when is None or (when == "laser") == laser_on:
+                yield action, args
@@ -0,0 +1,204 @@
+"""Online calibration of the pointer's rest offset and its drift.
+
+The pointer axes are absolute orientation values, so a bias in the sensor
+fusion shows up as the rest pose slowly walking off-centre during a talk.
+The calibrator watches the same samples as the pointer, on the normalised
+axes (value / SCALE, the units of map_to_screen()'s `cal`):
+
+  * stillness is detected from the variance of x and y over a short
+    sliding window, kept as running sums in a fixed ring buffer;
+  * while still, Welford's running mean and variance accumulate over the
+    whole still period, which also catches a slow creep the short window
+    cannot see;
+  * once a still period has lasted `settle` seconds, is quiet as a whole and
+    lies within `max_offset` of the current calibration, `cal` is pulled
+    towards its mean with time constant `tau`;
+  * the drift rate is estimated from successive rest poses and `cal`
+    follows it in between (predict=False turns that off).
+
+Everything is O(1) per sample and memory is fixed. Only rest poses near the
+current centre count, and callers pass enabled=False while the laser is on,
+so holding the dot on something never recalibrates it. recalibrate() makes
+the current pose the centre at once (the recalibrate button action).
+"""
+import math
+
+from .mapping import SCALE
+
+
+class AutoCalibrator:
+    """Rest offset and drift of one remote's pointer axes.
+
+    window is the stillness window in seconds (capped at `size` samples),
+    still the largest standard deviation (normalised units) that counts as
+    still, max_rate the largest drift followed, in normalised units per
+    minute.
+    """
+
+    def __init__(self, window=0.5, size=256, still=0.01, settle=1.0, tau=20.0, max_offset=0.15,
+                 predict=True, drift_tau=300.0, max_rate=0.02):
+        self.window = float(window)
+        self.size = int(size)
+        self.still = float(still)
+        self.settle = float(settle)
+        self.tau = float(tau)
+        self.max_offset = float(max_offset)
+        self.predict = bool(predict)
+        self.drift_tau = float(drift_tau)
+        self.max_rate = float(max_rate) / 60.0
+        if self.size < 2 or min(self.window, self.still, self.tau, self.drift_tau) <= 0:
+            raise ValueError("need size >= 2 and positive window, still, tau and drift_tau")
+
+        n = self.size
+        self._t = [0.0] * n
+        self._x = [0.0] * n
+        self._y = [0.0] * n
+        self.cal = (0.0, 0.0)
+        self.rate = (0.0, 0.0)
+        self.updates = 0
+        self.rests = 0
+        self.recalibrations = 0
+        self.reset()
+
+    def reset(self):
+        """Forget the motion history, keeping the calibration."""
+        self._head = 0
+        self._n = 0
+        self._sx = self._sy = self._sxx = self._syy = 0.0
+        self._since_resum = 0
+        self._last_t = None
+        self._end_segment()
+        self.last_rest = None       # (t, x, y) of the last accepted rest pose
+
+    def _end_segment(self):
+        # Welford state of the current still period.
+        self._w_n = 0
+        self._w_t0 = 0.0
+        self._w_mx = self._w_my = 0.0
+        self._w_m2x = self._w_m2y = 0.0
+        self._w_used = False
+
+    def _evict(self):
+        i = (self._head - self._n) % self.size
+        self._n -= 1
+        x, y = self._x[i], self._y[i]
+        self._sx -= x
+        self._sy -= y
+        self._sxx -= x * x
+        self._syy -= y * y
+
+    def feed(self, t, x, y, enabled=True):
+        """Add one sample (raw sensor values). With enabled=False (laser on,
+        buttons held) stillness is tracked but the calibration only follows
+        the drift rate."""
+        x = min(max(x, -SCALE), SCALE) / SCALE
+        y = min(max(y, -SCALE), SCALE) / SCALE
+        last = self._last_t
+        self._last_t = t
+        if last is not None and self.predict and t > last:
+            dt = t - last
+            self.cal = (self.cal[0] + self.rate[0] * dt, self.cal[1] + self.rate[1] * dt)
+
+        size = self.size
+        if self._n == size:
+            self._evict()
+        oldest = t - self.window
+        while self._n and self._t[(self._head - self._n) % size] < oldest:
+            self._evict()
+        i = self._head
+        self._t[i], self._x[i], self._y[i] = t, x, y
+        self._sx += x
+        self._sy += y
+        self._sxx += x * x
+        self._syy += y * y
+        self._head = (i + 1) % size
+        self._n += 1
+        # Re-add the window from scratch now and then so rounding in the
+        # running sums cannot build up over a long session.
+        self._since_resum += 1
+        if self._since_resum >= size:
+            self._resum()
+
+        n = self._n
+        mx, my = self._sx / n, self._sy / n
+        var = max(self._sxx / n - mx * mx, 0.0) + max(self._syy / n - my * my, 0.0)
+        if n < 2 or var > self.still * self.still:
+            self._end_segment()
+            return
+
+        # Still: extend the still period's running mean and variance.
+        if self._w_n == 0:
+            self._w_t0 = t
+        self._w_n += 1
+        k = self._w_n
+        dx = x - self._w_mx
+        self._w_mx += dx / k
+        self._w_m2x += dx * (x - self._w_mx)
+        dy = y - self._w_my
+        self._w_my += dy / k
+        self._w_m2y += dy * (y - self._w_my)
+        if enabled and t - self._w_t0 >= self.settle:
+            self._update(t)
+
+    def feed_samples(self, samples, enabled=True):
+        """feed() every sample dict of a batch."""
+        feed = self.feed
+        for s in samples:
+            feed(s["t"], s["x"], s["y"], enabled)
+
+    def _resum(self):
+        self._since_resum = 0
+        self._sx = self._sy = self._sxx = self._syy = 0.0
+        for k in range(self._n):
+            i = (self._head - 1 - k) % self.size
+            x, y = self._x[i], self._y[i]
+            self._sx += x
+            self._sy += y
+            self._sxx += x * x
+            self._syy += y * y
+
+    def _update(self, t):
+        k = self._w_n
+        if (self._w_m2x + self._w_m2y) / k > self.still * self.still:
+            return
+        mx, my = self._w_mx, self._w_my
+        cx, cy = self.cal
+        if math.hypot(mx - cx, my - cy) > self.max_offset:
+            return
+        dt = t - self._w_t0 if not self._w_used else t - self._w_last
+        a = 1.0 - math.exp(-max(dt, 0.0) / self.tau)
+        self.cal = (cx + a * (mx - cx), cy + a * (my - cy))
+        self._w_last = t
+        self.updates += 1
+        if self._w_used:
+            return
+        # First update of this rest period: a new point for the drift rate.
+        self._w_used = True
+        self.rests += 1
+        rest = self.last_rest
+        self.last_rest = (t, mx, my)
+        if rest is None or t - rest[0] < self.settle:
+            return
+        span = t - rest[0]
+        limit = self.max_rate
+        rx = min(max((mx - rest[1]) / span, -limit), limit)
+        ry = min(max((my - rest[2]) / span, -limit), limit)
+        b = 1.0 - math.exp(-span / self.drift_tau)
+        self.rate = (self.rate[0] + b * (rx - self.rate[0]), self.rate[1] + b * (ry - self.rate[1]))
+
+    def recalibrate(self):
+        """Make the current pose (the mean over the window) the centre."""
+        if self._n:
+            self.cal = (self._sx / self._n, self._sy / self._n)
+        self.rate = (0.0, 0.0)
+        self.last_rest = None
+        self._end_segment()
+        self.recalibrations += 1
+        return self.cal
+
+    def summary(self):
+        per_min = 60.0
+        return (f"cal ({self.cal[0]:+.4f}, {self.cal[1]:+.4f}), drift "
+                f"({self.rate[0] * per_min:+.4f}, {self.rate[1] * per_min:+.4f})/min, "
+                f"{self.rests} rest periods, {self.updates} updates, "
+                f"{self.recalibrations} recalibrations")
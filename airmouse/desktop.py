@@ -0,0 +1,85 @@
+"""Cached virtual desktop geometry for the overlays.
+
+Screen geometry is read once and recomputed only when Qt reports a change
+(screen added/removed, primary switched, resolution or layout changed), so
+the per-sample mapping and the per-click SendInput scaling never query the
+window system.
+"""
+from PyQt5 import QtCore, QtWidgets
+from PyQt5.QtCore import pyqtSignal
+
+from .mapping import AREAS
+
+
+def _union(rects):
+    area = QtCore.QRect()
+    for rect in rects:
+        area = area.united(rect)
+    return area
+
+
+class DesktopGeometry(QtCore.QObject):
+    """Geometry of the area the pointer is mapped onto, in global pixels.
+
+    area="all" spans the bounding box of every screen (the virtual desktop),
+    area="primary" only the primary screen. `virtual` is always the whole
+    virtual desktop, which is what absolute SendInput coordinates refer to.
+    Attributes are replaced as a whole on refresh, so the input dispatcher
+    thread can read them without locking.
+    """
+
+    changed = pyqtSignal()
+
+    def __init__(self, area="all", parent=None):
+        super().__init__(parent)
+        if area not in AREAS:
+            raise ValueError(f"Unknown screen area: {area}")
+        self.area = area
+        self.refreshes = 0
+        app = QtWidgets.QApplication.instance()
+        app.screenAdded.connect(self._screen_added)
+        app.screenRemoved.connect(self.refresh)
+        app.primaryScreenChanged.connect(self.refresh)
+        for screen in app.screens():
+            self._watch(screen)
+        self.refresh()
+
+    def _watch(self, screen):
+        screen.geometryChanged.connect(self.refresh)
+        screen.refreshRateChanged.connect(self.refresh)
+
+    def _screen_added(self, screen):
+        self._watch(screen)
+        self.refresh()
+
+    def refresh(self, *_):
+        app = QtWidgets.QApplication.instance()
+        virtual = _union(s.geometry() for s in app.screens())
+        primary = app.primaryScreen()
+        rect = primary.geometry() if self.area == "primary" and primary is not None else virtual
+        if rect.isEmpty():
+            rect = QtCore.QRect(0, 0, 1920, 1080)
+        if virtual.isEmpty():
+            virtual = rect
+        self.rect = rect
+        self.virtual = (virtual.x(), virtual.y(), virtual.width(), virtual.height())
+        self.center = (rect.x() + rect.width() / 2, rect.y() + rect.height() / 2)
+        self.half = (rect.width() / 2, rect.height() / 2)
+        self.screens = len(app.screens())
+        # Fastest display in the area; slower ones simply show fewer frames.
+        rates = [s.refreshRate() for s in app.screens() if s.geometry().intersects(rect)]
+        self.refresh_rate = max(rates, default=0.0) or 60.0
+        self.refreshes += 1
+        self.changed.emit()
+
+    def to_absolute(self, x, y):
+        """Global pixel -> 0..65535 SendInput coordinates (MOUSEEVENTF_VIRTUALDESK)."""
+        left, top, width, height = self.virtual
+        dx = int((x - left) * 65535 / max(width - 1, 1))
+        dy = int((y - top) * 65535 / max(height - 1, 1))
+        return dx, dy
+
+    def describe(self):
+        r = self.rect
+        return (f"{r.width()}x{r.height()}+{r.x()}+{r.y()} ({self.area}, {self.screens} screen(s), "
+                f"{self.refresh_rate:.0f} Hz)")
@@ -0,0 +1,53 @@
+"""Background worker for OS input injection."""
+import time
+import queue
+import threading
+
+from airmouse.stats import LatencyLog
+
+
+class InputDispatcher:
+    """Runs key presses and clicks on a dedicated thread, in submission order.
+
+    Injection can still block (pyautogui, a busy X server, the first use
+    of a backend); doing that on the GUI thread froze the laser dot. The
+    GUI only calls submit(), which returns immediately.
+    """
+
+    def __init__(self, name="input-dispatch", metrics=None):
+        self._queue = queue.Queue()
+        self.metrics = metrics
+        self.queue_latency = LatencyLog()
+        self.run_time = LatencyLog()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, **kwargs):
+        self._queue.put((time.monotonic(), fn, args, kwargs))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            t_submit, fn, args, kwargs = item
+            t_start = time.monotonic()
+            self.queue_latency.add(t_start - t_submit)
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                print("Input dispatch error:", e)
+            t_end = time.monotonic()
+            self.run_time.add(t_end - t_start)
+            if self.metrics is not None:
+                self.metrics.observe("dispatch_wait", t_start - t_submit)
+                self.metrics.observe("dispatch_run", t_end - t_start)
+
+    def close(self, timeout=2.0):
+        """Finish everything already submitted, then stop the worker."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def summary(self):
+        return (self.queue_latency.summary("Input injection wait") + "\n"
+                + self.run_time.summary("Input injection run"))
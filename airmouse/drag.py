@@ -0,0 +1,111 @@
+"""test1.py's button actions: clicks and a right-button drag at the laser.
+
+app.py hands keys, clicks, scrolls and zooms to Injector.perform(). test1.py
+binds its own set: a left or right click at the dot that puts the cursor
+back where it was, and a right-button hold that drags from the dot until
+the button (or the laser) is released. DragActions implements them for
+either host, the Qt overlay (airmouse/drag_overlay.py) or the headless
+runner (DragRunner below); both provide .dispatcher, .injector, .cursor
+and .remotes, and run the pipeline itself unchanged.
+"""
+from .headless import HeadlessRunner
+
+ACTIONS = ("toggle_laser", "key", "left_click", "right_click", "right_down", "right_up",
+           "scroll", "zoom", "recalibrate")
+
+# Keys sent for the "next" / "prev" swipe gestures.
+GESTURE_KEYS = {"next": "right", "prev": "left"}
+
+
+class DragActions:
+    """Mixin performing ACTIONS; goes before the host class."""
+
+    is_rightclick_held = False
+    cursor_moved_for_click = False
+    original_cursor_pos = None
+
+    def _perform(self, remote, actions):
+        for action, args, x, y in actions:
+            if action == "toggle_laser":
+                print("Laser toggled ->", remote.laser_on)
+                if not remote.laser_on:
+                    self.release_drag(x, y)
+            elif action == "left_click" or action == "right_click":
+                button = action.split("_")[0]
+                print(button.capitalize(), "click at", (x, y))
+                self.dispatcher.submit(self._click_at, x, y, button=button)
+            elif action == "right_down":
+                if not self.is_rightclick_held:
+                    print("Start right-click hold at", (x, y))
+                    self.dispatcher.submit(self._mouse_down_at, x, y, button="right")
+                    self.is_rightclick_held = True
+            elif action == "right_up":
+                if self.is_rightclick_held:
+                    print("Release right-click at", (x, y))
+                    self.release_drag(x, y)
+            elif action == "key":
+                print("Key pressed:", args[0])
+                self.injector.perform(action, args, x, y)
+            elif action == "scroll" or action == "zoom":
+                self.injector.perform(action, args, x, y)
+            elif action == "recalibrate":
+                print(f"Calibrated! cal_x={remote.cal[0]:.3f}, cal_y={remote.cal[1]:.3f}")
+
+    def release_drag(self, x, y):
+        """Let go of a held right button at (x, y)."""
+        if self.is_rightclick_held:
+            self.dispatcher.submit(self._mouse_up_at, x, y, button="right")
+            self.is_rightclick_held = False
+
+    def end_drag(self):
+        """On exit, before the dispatcher closes: release a held button and
+        put the cursor back."""
+        remote = self.remotes[0]
+        self.release_drag(remote.lx, remote.ly)
+        self.dispatcher.submit(self._restore_cursor)
+
+    # --- Input injection, run on the dispatcher thread ---
+    # Each click or hold is one backend batch: the move and the button
+    # events go out together, with no sleeps in between.
+    def _click_at(self, x, y, button="left"):
+        events = [("move", x, y), ("down", button), ("up", button)]
+        if self.cursor is None:
+            # Put the cursor back where it was.
+            try:
+                events.append(("move",) + tuple(self.injector.backend.position()))
+            except Exception as e:
+                print("Cursor position error:", e)
+        self.injector.send(events)
+
+    def _mouse_down_at(self, x, y, button="left"):
+        if self.cursor is None:
+            try:
+                self.original_cursor_pos = self.injector.backend.position()
+            except Exception as e:
+                print("Cursor position error:", e)
+        # The cursor stays on the target while the button is held (drag).
+        self.cursor_moved_for_click = True
+        self.injector.send([("move", x, y), ("down", button)])
+
+    def _mouse_up_at(self, x, y, button="left"):
+        events = [("up", button)]
+        if self.cursor_moved_for_click:
+            events.insert(0, ("move", x, y))
+        if self.cursor_moved_for_click and self.original_cursor_pos:
+            events.append(("move",) + tuple(self.original_cursor_pos))
+        self.cursor_moved_for_click = False
+        self.original_cursor_pos = None
+        self.injector.send(events)
+
+    def _restore_cursor(self):
+        if self.cursor_moved_for_click and self.original_cursor_pos:
+            self.injector.send([("move",) + tuple(self.original_cursor_pos)])
+            self.cursor_moved_for_click = False
+            self.original_cursor_pos = None
+
+
+class DragRunner(DragActions, HeadlessRunner):
+    """test1.py --headless: HeadlessRunner with test1.py's actions."""
+
+    def __init__(self, *args, gesture_keys=GESTURE_KEYS, **kwargs):
+        super().__init__(*args, gesture_keys=gesture_keys, **kwargs)
@@ -0,0 +1,35 @@
+"""test1.py's laser overlay: app.py's OverlayWindow with a solid dot and
+test1.py's click and right-button drag actions (airmouse/drag.py).
+
+Like airmouse/overlay.py it is only imported when a window is wanted.
+"""
+from PyQt5 import QtCore, QtWidgets
+
+from .drag import GESTURE_KEYS, DragActions
+from .overlay import OverlayWindow
+
+
+class DragOverlay(DragActions, OverlayWindow):
+    """One remote's dot; C recalibrates, Esc quits."""
+
+    def __init__(self, mailbox, dot_radius=12, gesture_keys=GESTURE_KEYS, **kwargs):
+        super().__init__(mailbox, gesture_keys=gesture_keys, dot_style="dot", dot_radius=dot_radius,
+                         **kwargs)
+        self.setWindowFlag(QtCore.Qt.WindowDoesNotAcceptFocus)
+        if self.timer is not None:
+            # test1.py has always polled every 12 ms.
+            self.timer.setInterval(12)
+
+    def keyPressEvent(self, event):
+        if event.key() == QtCore.Qt.Key_C:
+            for remote in self.remotes:
+                remote.recalibrate()
+                self._perform(remote, [("recalibrate", (), remote.lx, remote.ly)])
+        elif event.key() == QtCore.Qt.Key_Escape:
+            QtWidgets.QApplication.quit()
+
+    def closeEvent(self, event):
+        self.end_drag()
+        # Let queued injections finish before the cursor state is torn down.
+        self.dispatcher.close()
+        super().closeEvent(event)
@@ -0,0 +1,241 @@
+"""Pointer smoothing filters.
+
+Every filter is called as f(t, x, y) -> (x, y) with t in seconds (the
+sample's host timestamp) and x/y in screen pixels, and has reset(). They are
+time-aware: behaviour does not depend on how often the GUI happens to tick.
+f.filter_batch(t, x, y) does the same for NumPy arrays of samples and
+returns arrays; the result is identical to calling f once per sample.
+
+    none      pass-through
+    ema       exponential moving average (test1.py's old smoothing)
+    one-euro  adaptive low-pass: heavy smoothing at rest, little lag in motion
+    kalman    constant-velocity Kalman filter with short-horizon prediction
+"""
+import math
+
+import numpy as np
+
+# Smallest step used when two samples share a timestamp (same serial chunk).
+_MIN_DT = 1e-4
+
+
+class _Filter:
+    def filter_batch(self, t, x, y):
+        # Recursive filters have no closed form; loop over the arrays.
+        n = len(t)
+        fx = np.empty(n)
+        fy = np.empty(n)
+        step = self.__call__
+        for i, (ti, xi, yi) in enumerate(zip(t.tolist(), x.tolist(), y.tolist())):
+            fx[i], fy[i] = step(ti, xi, yi)
+        return fx, fy
+
+
+class PassThrough(_Filter):
+    def __call__(self, t, x, y):
+        return x, y
+
+    def filter_batch(self, t, x, y):
+        return x, y
+
+    def reset(self):
+        pass
+
+
+class EmaFilter(_Filter):
+    """EMA with alpha defined per `period` seconds.
+
+    alpha=0.2 per 12 ms reproduces test1.py's original per-tick smoothing,
+    but at whatever rate samples actually arrive.
+    """
+
+    def __init__(self, alpha=0.2, period=0.012):
+        self.alpha = float(alpha)
+        self.period = float(period)
+        self._k = -math.log(1.0 - self.alpha) / self.period
+        self.reset()
+
+    def reset(self):
+        self._t = None
+        self._x = self._y = 0.0
+
+    def __call__(self, t, x, y):
+        if self._t is None:
+            self._t, self._x, self._y = t, x, y
+            return x, y
+        dt = max(t - self._t, _MIN_DT)
+        self._t = t
+        a = 1.0 - math.exp(-self._k * dt)
+        self._x += a * (x - self._x)
+        self._y += a * (y - self._y)
+        return self._x, self._y
+
+    def filter_batch(self, t, x, y):
+        if len(t) < 8:
+            # Below this the array set-up costs more than the plain loop.
+            return _Filter.filter_batch(self, t, x, y)
+        if self._t is None:
+            self._t, self._x, self._y = float(t[0]), float(x[0]), float(y[0])
+        # y_n = y_{n-1} + a_n (x_n - y_{n-1}) unrolled: with L the cumulative
+        # decay exponent, y_n = e^-L_n * y_0 + sum_j a_j x_j e^-(L_n - L_j).
+        # Each step's exponent is capped (the old state is gone by then) and
+        # the batch is cut where L spans too far for float64.
+        dt = np.maximum(np.diff(t, prepend=self._t), _MIN_DT)
+        step = np.minimum(self._k * dt, 50.0)
+        a = -np.expm1(-step)
+        L = np.cumsum(step)
+        fx = np.empty(len(t))
+        fy = np.empty(len(t))
+        start = 0
+        while start < len(t):
+            base = L[start - 1] if start else 0.0
+            end = int(np.searchsorted(L, base + 600.0, side="right"))
+            end = max(end, start + 1)
+            Lc = L[start:end] - base
+            w = a[start:end] * np.exp(Lc - Lc[-1])
+            decay = np.exp(Lc[-1] - Lc)
+            head = np.exp(-Lc[-1])
+            fx[start:end] = decay * (head * self._x + np.cumsum(w * x[start:end]))
+            fy[start:end] = decay * (head * self._y + np.cumsum(w * y[start:end]))
+            self._x, self._y = float(fx[end - 1]), float(fy[end - 1])
+            start = end
+        self._t = float(t[-1])
+        return fx, fy
+
+
+class _OneEuroAxis:
+    __slots__ = ("x", "dx")
+
+    def __init__(self, x):
+        self.x = x
+        self.dx = 0.0
+
+
+def _smoothing(dt, cutoff):
+    r = 2.0 * math.pi * cutoff * dt
+    return r / (r + 1.0)
+
+
+class OneEuroFilter(_Filter):
+    """One Euro filter (Casiez et al., CHI 2012).
+
+    min_cutoff (Hz) sets jitter at rest, beta how quickly the cutoff opens
+    up with speed (pixels/s), d_cutoff smooths the speed estimate itself.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.005, d_cutoff=1.0):
+        self.min_cutoff = float(min_cutoff)
+        self.beta = float(beta)
+        self.d_cutoff = float(d_cutoff)
+        self.reset()
+
+    def reset(self):
+        self._t = None
+        self._axes = None
+
+    def _step(self, axis, value, dt):
+        a_d = _smoothing(dt, self.d_cutoff)
+        axis.dx += a_d * ((value - axis.x) / dt - axis.dx)
+        cutoff = self.min_cutoff + self.beta * abs(axis.dx)
+        axis.x += _smoothing(dt, cutoff) * (value - axis.x)
+        return axis.x
+
+    def __call__(self, t, x, y):
+        if self._t is None:
+            self._t = t
+            self._axes = (_OneEuroAxis(x), _OneEuroAxis(y))
+            return x, y
+        dt = max(t - self._t, _MIN_DT)
+        self._t = t
+        ax, ay = self._axes
+        return self._step(ax, x, dt), self._step(ay, y, dt)
+
+
+class _KalmanAxis:
+    """Position/velocity state with its 2x2 covariance, unrolled."""
+
+    __slots__ = ("p", "v", "pp", "pv", "vv")
+
+    def __init__(self, p, r):
+        self.p = p
+        self.v = 0.0
+        self.pp = r
+        self.pv = 0.0
+        self.vv = 1e6
+
+
+class KalmanFilter(_Filter):
+    """Constant-velocity Kalman filter per axis.
+
+    q is the white-acceleration noise density (pixels^2/s^3), r the
+    measurement variance (pixels^2). The output is extrapolated `predict`
+    seconds ahead along the estimated velocity to hide the serial + render
+    latency; predict=0 gives the plain filtered position.
+    """
+
+    def __init__(self, q=2e5, r=16.0, predict=0.015):
+        self.q = float(q)
+        self.r = float(r)
+        self.predict = float(predict)
+        self.reset()
+
+    def reset(self):
+        self._t = None
+        self._axes = None
+
+    def _step(self, s, z, dt):
+        q = self.q
+        # Predict.
+        s.p += s.v * dt
+        dt2 = dt * dt
+        pp = s.pp + dt * (2.0 * s.pv + dt * s.vv) + q * dt2 * dt / 3.0
+        pv = s.pv + dt * s.vv + q * dt2 / 2.0
+        vv = s.vv + q * dt
+        # Update with the position measurement.
+        k_den = pp + self.r
+        kp = pp / k_den
+        kv = pv / k_den
+        innov = z - s.p
+        s.p += kp * innov
+        s.v += kv * innov
+        s.pp = (1.0 - kp) * pp
+        s.pv = (1.0 - kp) * pv
+        s.vv = vv - kv * pv
+        return s.p + s.v * self.predict
+
+    def __call__(self, t, x, y):
+        if self._t is None:
+            self._t = t
+            self._axes = (_KalmanAxis(x, self.r), _KalmanAxis(y, self.r))
+            return x, y
+        dt = max(t - self._t, _MIN_DT)
+        self._t = t
+        ax, ay = self._axes
+        return self._step(ax, x, dt), self._step(ay, y, dt)
+
+
+FILTERS = {
+    "none": PassThrough,
+    "ema": EmaFilter,
+    "one-euro": OneEuroFilter,
+    "kalman": KalmanFilter,
+}
+
+
+def parse_filter_opts(opts):
+    """Turn ["beta=0.01", "min_cutoff=0.5"] into keyword arguments."""
+    kwargs = {}
+    for opt in opts or ():
+        name, sep, value = opt.partition("=")
+        if not sep:
+            raise ValueError(f"Filter option must be NAME=VALUE, got {opt!r}")
+        kwargs[name.strip().replace("-", "_")] = float(value)
+    return kwargs
+
+
+def make_filter(name, opts=None):
+    try:
+        cls = FILTERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown filter: {name}") from None
+    return cls(**parse_filter_opts(opts))
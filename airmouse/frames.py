@@ -0,0 +1,182 @@
+"""Display-paced rendering of the pointer, decoupled from the sample rate.
+
+The overlays push every filtered pointer position with its sample time;
+the FrameScheduler renders at most once per refresh interval, on a grid of
+the display's refresh period, and asks for the position the pointer will
+have at the expected present time (interpolated from the filtered trail,
+or extrapolated a bounded distance past the newest sample). A frame whose
+dot would land on the same pixel is skipped, and an idle pointer stops the
+frame clock altogether. With a PlayoutBuffer (airmouse/jitter.py) the
+position is taken that buffer's delay further in the past, so bursty
+arrival is smoothed out of the trail instead of showing as stalls.
+"""
+import time
+from collections import deque
+
+from PyQt5 import QtCore
+
+from .stats import LatencyLog
+
+
+class PointerTrail:
+    """Last few filtered positions, sampled at arbitrary times."""
+
+    def __init__(self, size=32):
+        self._points = deque(maxlen=size)
+
+    def push(self, t, x, y):
+        if self._points and t <= self._points[-1][0]:
+            # Same timestamp (same serial chunk): keep the newest position.
+            self._points[-1] = (self._points[-1][0], x, y)
+        else:
+            self._points.append((t, x, y))
+
+    def clear(self):
+        self._points.clear()
+
+    @property
+    def last_time(self):
+        return self._points[-1][0] if self._points else None
+
+    def at(self, t, max_ahead):
+        """Position at time t; at most max_ahead seconds of extrapolation."""
+        points = self._points
+        if not points:
+            return None
+        t1, x1, y1 = points[-1]
+        if len(points) == 1:
+            return x1, y1
+        if t >= t1:
+            t0, x0, y0 = points[-2]
+            ahead = min(t - t1, max_ahead)
+            u = ahead / (t1 - t0)
+            return x1 + (x1 - x0) * u, y1 + (y1 - y0) * u
+        for i in range(len(points) - 1, 0, -1):
+            t0, x0, y0 = points[i - 1]
+            if t0 <= t:
+                t1, x1, y1 = points[i]
+                u = (t - t0) / (t1 - t0)
+                return x0 + (x1 - x0) * u, y0 + (y1 - y0) * u
+        return points[0][1], points[0][2]
+
+
+class FrameScheduler(QtCore.QObject):
+    """Calls render(x, y) at most once per refresh period.
+
+    render returns True if it changed anything on screen and False if the
+    frame was skipped (dot on the same pixel, or hidden). max_ahead caps the
+    extrapolation past the newest sample in seconds (default: one refresh
+    period); latency is how far after the frame tick the frame is expected
+    to be presented (default: one refresh period, the compositor's queue).
+    playout is an optional PlayoutBuffer whose delay is subtracted from the
+    render time.
+    """
+
+    def __init__(self, render, refresh_rate=60.0, max_ahead=None, latency=None, playout=None,
+                 parent=None):
+        super().__init__(parent)
+        self.render = render
+        self.playout = playout
+        # Room for the playout delay's worth of samples at 1 kHz.
+        self.trail = PointerTrail(32 if playout is None else max(32, int(playout.max_delay * 1e3) + 32))
+        self._max_ahead = max_ahead
+        self._latency = latency
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self._timer.timeout.connect(self._tick)
+        self._origin = time.monotonic()
+        self._slot = None
+        self._last_tick = None
+        self._last_frame = None
+        self._dirty = False
+        self.set_refresh_rate(refresh_rate)
+
+        self.frames = 0
+        self.skipped = 0
+        self.missed = 0
+        self.intervals = LatencyLog()
+        self.lateness = LatencyLog()
+
+    def set_refresh_rate(self, hz):
+        self.refresh_rate = float(hz) if hz and hz > 0 else 60.0
+        self.period = 1.0 / self.refresh_rate
+        self.max_ahead = self.period if self._max_ahead is None else self._max_ahead
+        self.latency = self.period if self._latency is None else self._latency
+
+    def push(self, t, x, y):
+        """Add filtered positions (arrays or scalars) and schedule a frame."""
+        try:
+            for point in zip(t, x, y):
+                self.trail.push(*point)
+        except TypeError:
+            self.trail.push(t, x, y)
+        self.request()
+
+    def request(self):
+        """Schedule a frame for the next refresh slot (state changed)."""
+        self._dirty = True
+        if not self._timer.isActive():
+            self._arm(time.monotonic())
+
+    def _arm(self, now):
+        # Next slot on the refresh grid, never closer than one period to
+        # the previous frame.
+        k = int((now - self._origin) / self.period) + 1
+        slot = self._origin + k * self.period
+        if self._last_tick is not None and slot - self._last_tick < self.period * 0.5:
+            slot += self.period
+        self._slot = slot
+        self._timer.start(max(0, int(round((slot - now) * 1e3))))
+
+    def play_time(self, now):
+        """Trail time shown by a frame ticking at now."""
+        if self.playout is None:
+            return now + self.latency
+        return now + self.latency - self.playout.delay
+
+    def position(self, now=None):
+        now = time.monotonic() if now is None else now
+        return self.trail.at(self.play_time(now), self.max_ahead)
+
+    def _tick(self):
+        now = time.monotonic()
+        # A tick that fires more than half a period after its slot (busy GUI
+        # thread, slow paint) has missed at least one refresh.
+        late = max(now - self._slot, 0.0)
+        self.lateness.add(late)
+        if late > 0.5 * self.period:
+            self.missed += int(late / self.period + 0.5)
+        self._last_tick = now
+        self._dirty = False
+        play = self.play_time(now)
+        pos = self.trail.at(play, self.max_ahead)
+        if pos is None:
+            return
+        last = self.trail.last_time
+        if self.playout is not None:
+            self.playout.frame(play, None if last is None else last + self.max_ahead)
+        if self.render(*pos):
+            if self._last_frame is not None and now - self._last_frame < 4 * self.period:
+                self.intervals.add(now - self._last_frame)
+            self._last_frame = now
+            self.frames += 1
+        else:
+            self.skipped += 1
+        # Keep the clock running while extrapolation can still move the dot;
+        # otherwise the next sample restarts it.
+        if self._dirty or (last is not None and play < last + self.max_ahead):
+            self._arm(now)
+
+    def summary(self, paint_log=None):
+        ivs = sorted(self.intervals.values)
+        parts = [f"{self.refresh_rate:.0f} Hz target, {self.frames} frames, "
+                 f"{self.skipped} skipped (no movement), {self.missed} missed"]
+        if ivs:
+            parts.append(f"frame interval p50 {ivs[len(ivs) // 2] * 1e3:.2f} ms "
+                         f"max {ivs[-1] * 1e3:.2f} ms")
+        if len(self.lateness):
+            parts.append(self.lateness.summary("tick lateness"))
+        if paint_log is not None and len(paint_log):
+            parts.append(paint_log.summary("paint"))
+        return "; ".join(parts)
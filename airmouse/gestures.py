@@ -0,0 +1,246 @@
+"""Streaming gesture recognition for scroll, zoom and slide swipes.
+
+The engine sees the same samples as the pointer, one at a time, on the
+normalised sensor axes (value / SCALE): x and y are the pointer axes, z is
+the third raw axis (a twist of the wrist). Features are kept incrementally
+over a sliding window in a fixed ring buffer - running sums of velocity,
+energy (squared speed) and an 8-bin histogram of planar motion direction -
+so every sample costs the same few operations whatever the window or the
+sample rate. A threshold classifier then turns strokes into actions:
+
+    next / prev   fast horizontal swipe (right / left), one per stroke
+    scroll        sustained vertical motion, one step per scroll_step moved
+                  (positive = up)
+    zoom          twist around the third axis, one step per zoom_step
+                  (positive = in)
+
+A stroke starts when the RMS speed over the window rises above `onset` and
+ends when it falls below `release`. Slow strokes that match nothing within
+max_stroke seconds are plain pointing and are ignored.
+"""
+import math
+
+from .mapping import SCALE
+from .stats import LatencyLog
+
+GESTURES = ("next", "prev", "scroll", "zoom")
+
+_BINS = 8           # 45 degrees each; bin 0 is +x (right), bin 2 is +y (down)
+_MIN_DT = 1e-3
+
+
+class _Stroke:
+    __slots__ = ("t0", "x0", "y0", "z0", "kind", "ref", "emitted")
+
+    def __init__(self, t0, x0, y0, z0):
+        self.t0 = t0
+        self.x0, self.y0, self.z0 = x0, y0, z0
+        self.kind = None
+        self.ref = 0.0
+        self.emitted = False
+
+
+class GestureEngine:
+    """Recognises gestures from one remote's samples.
+
+    feed() returns None or (gesture, amount). Speeds are in normalised
+    units per second, distances in normalised units (1.0 = half the sensor
+    range, i.e. half the screen at unit gain). window is the feature window
+    in seconds; size caps the ring buffer, so at very high sample rates the
+    window is the last `size` samples instead.
+    """
+
+    def __init__(self, window=0.15, size=256, smoothing=0.03, onset=1.0, release=0.5,
+                 min_speed=0.2, dominance=0.6, swipe=0.35, swipe_time=0.4, refractory=0.3,
+                 scroll_step=0.08, zoom_step=0.15, max_stroke=1.5):
+        self.window = float(window)
+        self.size = int(size)
+        self.smoothing = float(smoothing)
+        self.onset = float(onset)
+        self.release = float(release)
+        self.min_speed = float(min_speed)
+        self.dominance = float(dominance)
+        self.swipe = float(swipe)
+        self.swipe_time = float(swipe_time)
+        self.refractory = float(refractory)
+        self.scroll_step = float(scroll_step)
+        self.zoom_step = float(zoom_step)
+        self.max_stroke = float(max_stroke)
+        if self.size < 2 or self.window <= 0 or self.release > self.onset:
+            raise ValueError("need size >= 2, window > 0 and release <= onset")
+
+        # Ring buffer: per-sample time, smoothed position, velocity, energy
+        # and direction bin (-1 when too slow to have a direction).
+        n = self.size
+        self._t = [0.0] * n
+        self._px = [0.0] * n
+        self._py = [0.0] * n
+        self._pz = [0.0] * n
+        self._vx = [0.0] * n
+        self._vy = [0.0] * n
+        self._vz = [0.0] * n
+        self._e = [0.0] * n
+        self._bin = [-1] * n
+
+        self.latency = LatencyLog()
+        self.counts = dict.fromkeys(GESTURES, 0)
+        self.strokes = 0
+        self.ignored = 0
+        self.reset()
+
+    def reset(self):
+        """Forget the motion history (laser toggled, link reconnected)."""
+        self._head = 0
+        self._n = 0
+        self._sum_vx = self._sum_vy = self._sum_vz = 0.0
+        self._energy = 0.0
+        self._hist = [0] * _BINS
+        self._moving = 0
+        self._last = None
+        self._stroke = None
+        self._quiet_until = float("-inf")
+
+    def _evict(self):
+        i = (self._head - self._n) % self.size
+        self._n -= 1
+        self._sum_vx -= self._vx[i]
+        self._sum_vy -= self._vy[i]
+        self._sum_vz -= self._vz[i]
+        self._energy -= self._e[i]
+        b = self._bin[i]
+        if b >= 0:
+            self._hist[b] -= 1
+            self._moving -= 1
+
+    def feed(self, t, x, y, z):
+        """Add one sample (raw sensor values); returns a gesture or None."""
+        x = min(max(x, -SCALE), SCALE) / SCALE
+        y = min(max(y, -SCALE), SCALE) / SCALE
+        z = min(max(z, -SCALE), SCALE) / SCALE
+        last = self._last
+        if last is None:
+            self._last = (t, x, y, z)
+            return None
+        lt, lx, ly, lz = last
+        # Light time-aware smoothing before differentiating, or sensor noise
+        # at a few hundred Hz turns into large velocities.
+        dt = max(t - lt, _MIN_DT)
+        a = 1.0 - math.exp(-dt / self.smoothing)
+        x = lx + a * (x - lx)
+        y = ly + a * (y - ly)
+        z = lz + a * (z - lz)
+        vx = (x - lx) / dt
+        vy = (y - ly) / dt
+        vz = (z - lz) / dt
+        self._last = (max(t, lt), x, y, z)
+
+        size = self.size
+        if self._n == size:
+            self._evict()
+        oldest = t - self.window
+        while self._n and self._t[(self._head - self._n) % size] < oldest:
+            self._evict()
+
+        i = self._head
+        planar = vx * vx + vy * vy
+        e = planar + vz * vz
+        b = -1
+        if planar >= self.min_speed * self.min_speed:
+            b = int(math.atan2(vy, vx) * (_BINS / (2 * math.pi)) + _BINS + 0.5) % _BINS
+            self._hist[b] += 1
+            self._moving += 1
+        self._t[i] = t
+        self._px[i], self._py[i], self._pz[i] = x, y, z
+        self._vx[i], self._vy[i], self._vz[i] = vx, vy, vz
+        self._e[i] = e
+        self._bin[i] = b
+        self._sum_vx += vx
+        self._sum_vy += vy
+        self._sum_vz += vz
+        self._energy += e
+        self._head = (i + 1) % size
+        self._n += 1
+        return self._classify(t, x, y, z)
+
+    def feed_samples(self, samples):
+        """feed() every sample dict of a batch; returns the gestures found."""
+        out = []
+        feed = self.feed
+        for s in samples:
+            g = feed(s["t"], s["x"], s["y"], s["raw"][0])
+            if g is not None:
+                out.append(g)
+        return out
+
+    def features(self):
+        """Mean velocity (x, y, z), mean squared speed and the direction
+        histogram over the current window."""
+        n = self._n or 1
+        return ((self._sum_vx / n, self._sum_vy / n, self._sum_vz / n),
+                max(self._energy, 0.0) / n, list(self._hist))
+
+    def _classify(self, t, x, y, z):
+        rms2 = max(self._energy, 0.0) / self._n
+        stroke = self._stroke
+        if stroke is None:
+            if rms2 < self.onset * self.onset or t < self._quiet_until:
+                return None
+            # The stroke began where the window begins.
+            j = (self._head - self._n) % self.size
+            stroke = self._stroke = _Stroke(self._t[j], self._px[j], self._py[j], self._pz[j])
+            self.strokes += 1
+        elif rms2 < self.release * self.release:
+            self._stroke = None
+            return None
+
+        kind = stroke.kind
+        if kind is None:
+            if t - stroke.t0 > self.max_stroke:
+                stroke.kind = "ignored"
+                self.ignored += 1
+                return None
+            dx, dy, dz = x - stroke.x0, y - stroke.y0, z - stroke.z0
+            hist = self._hist
+            moving = self._moving * self.dominance
+            if abs(dz) >= self.zoom_step and abs(dz) > 2.0 * max(abs(dx), abs(dy)):
+                stroke.kind, stroke.ref = "zoom", stroke.z0
+            elif abs(dx) >= self.swipe and hist[0] + hist[4] >= moving:
+                if t - stroke.t0 > self.swipe_time:
+                    stroke.kind = "ignored"
+                    self.ignored += 1
+                    return None
+                # One swipe per stroke, and none for the swing back.
+                stroke.kind = "swipe"
+                self._quiet_until = t + self.refractory
+                return self._emit("next" if dx > 0 else "prev", 1, t, stroke)
+            elif abs(dy) >= self.scroll_step and hist[2] + hist[6] >= moving:
+                stroke.kind, stroke.ref = "scroll", stroke.y0
+            else:
+                return None
+            kind = stroke.kind
+
+        if kind == "scroll":
+            # Screen y grows downwards; moving up scrolls up (positive).
+            steps = int((stroke.ref - y) / self.scroll_step)
+            if steps:
+                stroke.ref -= steps * self.scroll_step
+                return self._emit("scroll", steps, t, stroke)
+        elif kind == "zoom":
+            steps = int((z - stroke.ref) / self.zoom_step)
+            if steps:
+                stroke.ref += steps * self.zoom_step
+                return self._emit("zoom", steps, t, stroke)
+        return None
+
+    def _emit(self, gesture, amount, t, stroke):
+        if not stroke.emitted:
+            # Recognition latency: start of the motion to the first action.
+            self.latency.add(t - stroke.t0)
+            stroke.emitted = True
+        self.counts[gesture] += 1
+        return gesture, amount
+
+    def summary(self):
+        counts = ", ".join(f"{name} {n}" for name, n in self.counts.items())
+        return (f"{self.strokes} strokes ({self.ignored} ignored as pointing): {counts}; "
+                + self.latency.summary("recognition latency"))
@@ -0,0 +1,196 @@
+"""Run the remotes' pipeline with no window and no Qt.
+
+The serial side is unchanged (serial_reader or MultiSourceIngest filling
+one SampleMailbox per remote); instead of a Qt event loop, the thread that
+calls HeadlessRunner.run() waits on the mailboxes' wakeups and hands each
+batch to Remote.update(), then performs the actions: key presses, clicks,
+scrolls and zooms go through an Injector, the laser only changes state
+since there is nothing to draw it on.
+"""
+import copy
+import time
+import threading
+
+from .dispatch import InputDispatcher
+from .filters import PassThrough
+from .calibration import AutoCalibrator
+from .gestures import GestureEngine
+from .jitter import LinkMonitor
+from .idle import IdleTracker
+from .injection import CursorDriver, Injector, screen_size
+from .remote import BUTTON_GRACE, GESTURE_KEYS, Remote
+
+# Used when --screen-size is not given and pyautogui cannot tell.
+FALLBACK_SCREEN = (1920, 1080)
+
+
+def parse_screen_size(text):
+    """'1920x1080' -> (1920, 1080)."""
+    try:
+        width, height = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"expected WIDTHxHEIGHT, got {text!r}") from None
+    if width <= 0 or height <= 0:
+        raise ValueError(f"screen size must be positive, got {text!r}")
+    return width, height
+
+
+class HeadlessRunner:
+    """OverlayWindow's pipeline without the window; mailbox may be a list
+    of mailboxes, one per remote.
+
+    size is the (width, height) of the screen the pointer is mapped onto,
+    at the origin; by default the primary screen as pyautogui sees it. With
+    cursor_rate the laser moves the real OS cursor, at most that many times
+    a second. broadcast is an optional PointerBroadcast every filtered
+    sample is published to; link_stats keeps a LinkMonitor per remote.
+    With idle_opts (IdleTracker keyword arguments) run() sleeps while no
+    remote has anything to do. gain and gesture_keys are handed to each
+    Remote.
+    """
+
+    def __init__(self, mailbox, stop_event, size=None, latency_log=None, pointer_filter=None,
+                 metrics=None, gesture_opts=None, buttons=None, cal_opts=None, injection="auto",
+                 cursor_rate=None, broadcast=None, link_stats=False, idle_opts=None, gain=1.0,
+                 gesture_keys=GESTURE_KEYS):
+        mailboxes = mailbox if isinstance(mailbox, (list, tuple)) else [mailbox]
+        pointer_filter = pointer_filter if pointer_filter is not None else PassThrough()
+        if size is None:
+            try:
+                size = screen_size()
+            except Exception as e:
+                print(f"Screen size unknown ({e}), using {FALLBACK_SCREEN[0]}x{FALLBACK_SCREEN[1]}")
+                size = FALLBACK_SCREEN
+        self.size = size
+        self.center = (size[0] / 2, size[1] / 2)
+        self.half = (size[0] / 2, size[1] / 2)
+
+        self.remotes = []
+        for i, mb in enumerate(mailboxes):
+            self.remotes.append(Remote(i, mb, pointer_filter if i == 0 else copy.deepcopy(pointer_filter),
+                                       buttons, GestureEngine(**gesture_opts) if gesture_opts is not None else None,
+                                       self.center, gesture_keys, gain,
+                                       calibrator=AutoCalibrator(**cal_opts) if cal_opts is not None else None))
+            if link_stats:
+                self.remotes[-1].link = LinkMonitor()
+            if idle_opts is not None:
+                self.remotes[-1].idle = IdleTracker(mb, **idle_opts)
+        self.stop_event = stop_event
+        self.latency_log = latency_log
+        self.metrics = metrics
+        self.broadcast = broadcast
+        if broadcast is not None:
+            broadcast.set_geometry(0, 0, size[0], size[1])
+        self.dispatcher = InputDispatcher(metrics=metrics)
+        self.injector = Injector(self.dispatcher, self.to_absolute, injection)
+        self.cursor = CursorDriver(self.injector) if cursor_rate else None
+        self.frame_period = 1.0 / cursor_rate if cursor_rate else 0.0
+        self._next_frame = 0.0
+        self._cursor_pos = None
+        self._wake = threading.Event()
+        for remote in self.remotes:
+            remote.mailbox.set_waker(self._wake.set)
+
+    def describe(self):
+        return f"{self.size[0]}x{self.size[1]} (headless)"
+
+    def to_absolute(self, x, y):
+        """Pixel -> 0..65535 SendInput coordinates."""
+        dx = int(x * 65535 / max(self.size[0] - 1, 1))
+        dy = int(y * 65535 / max(self.size[1] - 1, 1))
+        return dx, dy
+
+    def run(self):
+        """Process samples until stop_event is set."""
+        while not self.stop_event.is_set():
+            # Sleep until a sample lands or the next button timer is due;
+            # the cap bounds how late a stop is noticed.
+            deadline = min(r.buttons.next_deadline for r in self.remotes) + BUTTON_GRACE
+            if self._cursor_pos is not None:
+                deadline = min(deadline, self._next_frame)
+            timeout = min(max(deadline - time.monotonic(), 0.0), 0.25)
+            self._wake.wait(timeout)
+            self._wake.clear()
+            self.process_data()
+
+    def process_data(self):
+        t0 = time.perf_counter() if self.metrics is not None else 0.0
+        for remote in self.remotes:
+            self._process_remote(remote)
+            # Long presses and pending clicks fire on time even if the
+            # samples stop coming.
+            now = time.monotonic()
+            if remote.buttons.next_deadline + BUTTON_GRACE <= now:
+                self._perform(remote, remote.advance(now - BUTTON_GRACE))
+        if self._cursor_pos is not None and now >= self._next_frame:
+            # At most one cursor move per frame, with the newest position.
+            self.cursor.move(*self._cursor_pos)
+            self._cursor_pos = None
+            self._next_frame = max(self._next_frame + self.frame_period, now)
+        if self.metrics is not None:
+            self.metrics.observe("process", time.perf_counter() - t0)
+
+    def _process_remote(self, remote):
+        samples, edges = remote.mailbox.take_batch()
+        for kind, text in remote.mailbox.take_messages():
+            print(f"[{kind}]", text)
+        if not samples:
+            self._update_idle(remote, samples)
+            return
+        latest = samples[-1]
+        if self.latency_log is not None:
+            self.latency_log.add(time.monotonic() - latest["t"])
+        if self.metrics is not None:
+            self.metrics.observe("queue", time.monotonic() - latest["t"])
+        if remote.link is not None:
+            remote.link.observe(time.monotonic(), samples)
+        _, fx, fy, actions = remote.update(samples, edges, self.center, self.half)
+        if self.broadcast is not None:
+            self.broadcast.publish(samples, fx, fy, remote.laser_on, remote.source)
+        if self.cursor is not None and remote.laser_on:
+            self._cursor_pos = (fx[-1], fy[-1])
+        self._perform(remote, actions)
+        self._update_idle(remote, samples)
+
+    def _update_idle(self, remote, samples):
+        if remote.idle is None:
+            return
+        # A pending cursor move needs no samples: run() waits for its frame.
+        if remote.idle.update(samples, remote.laser_on or remote.gestures is not None,
+                              busy=remote.buttons.next_deadline != float("inf"),
+                              heartbeat=remote.calibrator is not None) and remote.link is not None:
+            remote.link.pause()
+
+    def _perform(self, remote, actions):
+        tag = f"Remote {remote.source}: " if len(self.remotes) > 1 else ""
+        for action, args, x, y in actions:
+            if action == "toggle_laser":
+                print(f"{tag}Laser {'ON' if remote.laser_on else 'OFF'}")
+                continue
+            if action == "recalibrate":
+                print(f"{tag}Recalibrated: cal=({remote.cal[0]:+.3f}, {remote.cal[1]:+.3f})")
+                continue
+            if action == "click":
+                print(f"{tag}Click at ({x}, {y})")
+            else:
+                print(f"{tag}{action.capitalize()} {' '.join(map(str, args))}")
+            self.injector.perform(action, args, x, y)
+
+    def cursor_summary(self):
+        return self.cursor.summary() if self.cursor is not None else ""
+
+    def idle_summary(self):
+        return "\n".join(f"Idle{f' (remote {r.source})' if len(self.remotes) > 1 else ''}: "
+                         + r.idle.summary() for r in self.remotes if r.idle is not None)
+
+    def link_summary(self):
+        return "\n".join(f"Link{f' (remote {r.source})' if len(self.remotes) > 1 else ''}: "
+                         + r.link.summary() for r in self.remotes if r.link is not None)
+
+    def gesture_summary(self):
+        return "\n".join(f"Gestures{f' (remote {r.source})' if len(self.remotes) > 1 else ''}: "
+                         + r.gestures.summary() for r in self.remotes if r.gestures is not None)
+
+    def calibration_summary(self):
+        return "\n".join(f"Calibration{f' (remote {r.source})' if len(self.remotes) > 1 else ''}: "
+                         + r.calibrator.summary() for r in self.remotes if r.calibrator is not None)
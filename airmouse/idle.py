@@ -0,0 +1,93 @@
+"""Idle power mode: let the GUI thread sleep while nothing can change.
+
+The remote streams samples for the whole talk, and every one of them used
+to wake the consumer (or it polled the mailbox every 12-16 ms), even with
+the laser off and the hand on the lectern. After each batch IdleTracker
+decides whether the consumer has anything to do with the next ordinary
+sample:
+
+    active  a button timer is pending (long press, click), or the pointer
+            matters (laser on, or gestures enabled) and moved more than
+            `motion` within the last `after` seconds
+    idle    otherwise; the mailbox is put to sleep and the consumer blocks
+            in its event loop (timer polling stops too) until a button
+            edge, a move of more than `motion` away from the resting pose,
+            or, with an AutoCalibrator that needs the rest samples, a
+            `heartbeat` a few times a second
+
+motion is in the units of Remote.pose, a fraction of the full deflection
+(1.0 is the screen edge), on any of the three axes (the twist drives the
+zoom gesture). Samples that arrive while asleep are kept in the
+mailbox's batch ring, so the first batch after waking still has the
+newest ones.
+"""
+import time
+
+from .mapping import SCALE
+
+
+class IdleTracker:
+    """Puts one remote's mailbox to sleep when its consumer may idle."""
+
+    def __init__(self, mailbox, after=0.5, motion=0.01, heartbeat=0.25):
+        self.mailbox = mailbox
+        self.after = float(after)
+        self.motion = float(motion)
+        self.heartbeat = float(heartbeat)
+        if min(self.after, self.motion, self.heartbeat) <= 0:
+            raise ValueError("after, motion and heartbeat must be positive")
+        self._anchor = None
+        self._moved_at = None
+        self._last_t = None
+        self._slept_at = None
+        self._started = time.monotonic()
+        self.sleeps = 0
+        self.asleep_time = 0.0
+
+    def update(self, samples, watch_motion, busy=False, heartbeat=False, wake=None):
+        """Call after every batch; returns True if the mailbox now sleeps.
+
+        watch_motion: the pointer position matters (laser on, gestures);
+        busy: something is still pending (a button timer); heartbeat: keep
+        a trickle of samples coming (auto-calibration while at rest); wake
+        is passed on to SampleMailbox.sleep().
+        """
+        now = time.monotonic()
+        asleep = self.mailbox.asleep
+        if self._slept_at is not None and not asleep:
+            self.asleep_time += now - self._slept_at
+            self._slept_at = None
+        if samples:
+            latest = samples[-1]
+            raw = latest["raw"]
+            anchor = self._anchor
+            limit = self.motion * SCALE
+            if anchor is None or any(abs(v - a) > limit for v, a in zip(raw, anchor)):
+                self._anchor = raw
+                self._moved_at = latest["t"]
+            self._last_t = latest["t"]
+        if asleep:
+            # Woken by a message, not by the remote.
+            return True
+        if busy or self._anchor is None:
+            return False
+        if watch_motion:
+            if self._last_t - self._moved_at < self.after:
+                return False
+            motion = self.motion * SCALE
+        else:
+            motion = None
+        self.mailbox.sleep(self._anchor, motion, self.heartbeat if heartbeat else None, wake)
+        self._slept_at = now
+        self.sleeps += 1
+        return True
+
+    def summary(self):
+        total = time.monotonic() - self._started
+        asleep = self.asleep_time
+        if self._slept_at is not None:
+            asleep += time.monotonic() - self._slept_at
+        woken = self.mailbox.idle_wakes
+        return (f"{self.sleeps} sleeps, asleep {100 * asleep / max(total, 1e-9):.0f}% of {total:.1f} s; "
+                f"woken by {woken['edge']} button edges, {woken['motion']} moves, "
+                f"{woken['heartbeat']} heartbeats")
@@ -0,0 +1,171 @@
+"""Single-threaded ingest for several receiver dongles at once.
+
+One thread multiplexes every port with `selectors` (epoll/kqueue) and reads
+whatever each ready fd has buffered, instead of one blocking serial_reader
+thread per port fighting the GUI thread for the GIL. Each source has its
+own FrameDecoder, PortSupervisor (non-blocking reconnect with backoff) and
+sink - normally a SampleMailbox - and every sample it produces is tagged
+with sample["source"], the source's index.
+
+Windows serial handles cannot be passed to select(), so there the loop
+polls in_waiting on every open port with a 1 ms sleep when all are idle.
+"""
+import os
+import sys
+import time
+import selectors
+import threading
+
+from airmouse.protocol import FrameDecoder
+from airmouse.serial_io import PortSupervisor
+
+_READ_SIZE = 65536
+_CAN_SELECT = not sys.platform.startswith("win")
+
+
+class _Source:
+    def __init__(self, index, supervisor, decoder, sink):
+        self.index = index
+        self.supervisor = supervisor
+        self.decoder = decoder
+        self.sink = sink
+        self.fd = None
+        self.reads = 0
+        self.bytes = 0
+        self.samples = 0
+
+
+class MultiSourceIngest:
+    """Reads N ports from one thread; call run() on that thread.
+
+    ports and sinks are parallel lists; messages for a source ("INFO",
+    "ERROR") go to its own sink like serial_reader's do.
+    """
+
+    def __init__(self, ports, baud, sinks, stop_event, frame_mode="auto", csv_fallback=False,
+                 metrics=None):
+        if len(ports) != len(sinks):
+            raise ValueError("one sink per port is required")
+        self.stop_event = stop_event
+        self.metrics = metrics
+        self.sources = []
+        for index, (port, sink) in enumerate(zip(ports, sinks)):
+            log = (lambda kind, text, sink=sink, index=index: sink.put((kind, f"[{index}] {text}")))
+            supervisor = PortSupervisor(port, baud, stop_event, timeout=0, log=log, metrics=metrics)
+            self.sources.append(_Source(index, supervisor, FrameDecoder(frame_mode, csv_fallback), sink))
+        self._selector = selectors.DefaultSelector() if _CAN_SELECT else None
+        self.loops = 0
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                timeout = self._open_due()
+                if self._selector is not None:
+                    self._select(timeout)
+                else:
+                    self._poll(timeout)
+                self.loops += 1
+        finally:
+            for source in self.sources:
+                self._close(source)
+            if self._selector is not None:
+                self._selector.close()
+
+    def _open_due(self):
+        """Try to (re)open closed sources whose backoff expired; returns the
+        longest the loop may wait before the next attempt is due."""
+        now = time.monotonic()
+        timeout = 0.1
+        for source in self.sources:
+            sup = source.supervisor
+            if sup.ser is not None:
+                continue
+            if now >= sup.retry_at and sup.try_open() is not None:
+                source.decoder.reset()
+                if self._selector is not None:
+                    source.fd = sup.ser.fileno()
+                    self._selector.register(source.fd, selectors.EVENT_READ, source)
+                continue
+            timeout = min(timeout, max(sup.retry_at - now, 0.0))
+        return timeout
+
+    def _select(self, timeout):
+        if not self._selector.get_map():
+            self.stop_event.wait(timeout)
+            return
+        for key, _ in self._selector.select(timeout):
+            source = key.data
+            if self.metrics is not None:
+                t0 = time.perf_counter()
+            try:
+                data = os.read(key.fd, _READ_SIZE)
+            except OSError as e:
+                self._lost(source, e)
+                continue
+            if not data:
+                self._lost(source, "end of file")
+                continue
+            if self.metrics is not None:
+                self.metrics.observe("read", time.perf_counter() - t0)
+            self._feed(source, data)
+
+    def _poll(self, timeout):
+        idle = True
+        for source in self.sources:
+            ser = source.supervisor.ser
+            if ser is None:
+                continue
+            try:
+                n = ser.in_waiting
+                data = ser.read(n) if n else None
+            except Exception as e:
+                self._lost(source, e)
+                continue
+            if data:
+                idle = False
+                self._feed(source, data)
+        if idle:
+            self.stop_event.wait(min(timeout, 0.001))
+
+    def _feed(self, source, data):
+        metrics = self.metrics
+        if metrics is not None:
+            t0 = time.perf_counter()
+        samples = source.decoder.feed(data)
+        source.reads += 1
+        source.bytes += len(data)
+        if metrics is not None:
+            metrics.observe("parse", time.perf_counter() - t0)
+            metrics.inc("samples", len(samples))
+        if samples:
+            index = source.index
+            for sample in samples:
+                sample["source"] = index
+            source.samples += len(samples)
+            source.sink.put(("BATCH", samples))
+
+    def _lost(self, source, error):
+        if self._selector is not None and source.fd is not None:
+            self._selector.unregister(source.fd)
+            source.fd = None
+        source.supervisor.lost(error)
+        source.supervisor.retry_at = time.monotonic() + source.supervisor.backoff
+
+    def _close(self, source):
+        if self._selector is not None and source.fd is not None:
+            self._selector.unregister(source.fd)
+            source.fd = None
+        source.supervisor.close()
+
+    def summary(self):
+        parts = [f"[{s.index}] {s.supervisor.device or s.supervisor.describe()}: {s.samples} samples "
+                 f"in {s.reads} reads, {s.supervisor.reconnects} reconnects" for s in self.sources]
+        return f"{len(self.sources)} sources, {self.loops} loop passes; " + "; ".join(parts)
+
+
+def start_ingest(ports, baud, sinks, stop_event, **kwargs):
+    """Run a MultiSourceIngest on a daemon thread; returns (ingest, thread)."""
+    ingest = MultiSourceIngest(ports, baud, sinks, stop_event, **kwargs)
+    thread = threading.Thread(target=ingest.run, name="serial-ingest", daemon=True)
+    thread.start()
+    return ingest, thread
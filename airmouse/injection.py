@@ -0,0 +1,535 @@
+"""OS input injection behind interchangeable backends, loaded on first use.
+
+A backend injects a batch of events as one unit: one SendInput() call, one
+XTest flush or one uinput SYN_REPORT, so a click (move, down, up) needs no
+sleeps between its parts. Events:
+
+    ("move", x, y)       absolute, global pixels
+    ("down", button)     "left", "right" or "middle"
+    ("up", button)
+    ("key", name)        press and release, pyautogui key names
+    ("key_down", name)
+    ("key_up", name)
+    ("scroll", clicks)   wheel notches, positive = up
+
+Backends (make_backend()):
+
+    sendinput   Windows SendInput; keys still go through pyautogui
+    xtest       X11 XTest via python-xlib (what pyautogui uses on Linux)
+    uinput      Linux /dev/uinput virtual device, no X needed (Wayland, console)
+    pyautogui   anything pyautogui supports, one call per event
+    record      keeps the events in memory, for tests and benchmarks
+    auto        sendinput on Windows, else xtest with a display, else
+                uinput if writable, else pyautogui
+
+pyautogui and python-xlib pull in their platform backends (and need a
+display on Linux) at import, so they are imported the first time something
+is injected - normally on the dispatcher thread, or warmed up there right
+after start - instead of before the overlay can appear.
+"""
+import os
+import sys
+import time
+import ctypes
+import struct
+import threading
+
+IS_WINDOWS = sys.platform.startswith("win")
+
+# pyautogui passes scroll clicks straight through as the wheel delta on
+# Windows, where one notch is 120.
+WHEEL_CLICK = 120 if IS_WINDOWS else 1
+
+BACKENDS = ("auto", "sendinput", "xtest", "uinput", "pyautogui", "record")
+
+_lock = threading.Lock()
+_pyautogui = None
+
+
+def pyautogui():
+    """The pyautogui module, imported (with the fail-safe off) on first use."""
+    global _pyautogui
+    if _pyautogui is None:
+        with _lock:
+            if _pyautogui is None:
+                import pyautogui as module
+                module.FAILSAFE = False
+                _pyautogui = module
+    return _pyautogui
+
+
+def screen_size():
+    """Primary screen size in pixels, from pyautogui (needs a display)."""
+    width, height = pyautogui().size()
+    return int(width), int(height)
+
+
+if IS_WINDOWS:
+    user32 = ctypes.windll.user32
+    ULONG_PTR = ctypes.c_size_t
+
+    class MOUSEINPUT(ctypes.Structure):
+        _fields_ = [
+            ("dx", ctypes.c_long),
+            ("dy", ctypes.c_long),
+            ("mouseData", ctypes.c_ulong),
+            ("dwFlags", ctypes.c_ulong),
+            ("time", ctypes.c_ulong),
+            ("dwExtraInfo", ULONG_PTR)
+        ]
+
+    class INPUT_union(ctypes.Union):
+        _fields_ = [("mi", MOUSEINPUT)]
+
+    class INPUT(ctypes.Structure):
+        _fields_ = [
+            ("type", ctypes.c_ulong),
+            ("union", INPUT_union)
+        ]
+
+    class POINT(ctypes.Structure):
+        _fields_ = [("x", ctypes.c_long), ("y", ctypes.c_long)]
+
+    INPUT_MOUSE = 0
+    MOUSEEVENTF_MOVE = 0x0001
+    MOUSEEVENTF_LEFTDOWN = 0x0002
+    MOUSEEVENTF_LEFTUP = 0x0004
+    MOUSEEVENTF_RIGHTDOWN = 0x0008
+    MOUSEEVENTF_RIGHTUP = 0x0010
+    MOUSEEVENTF_MIDDLEDOWN = 0x0020
+    MOUSEEVENTF_MIDDLEUP = 0x0040
+    MOUSEEVENTF_WHEEL = 0x0800
+    MOUSEEVENTF_ABSOLUTE = 0x8000
+    MOUSEEVENTF_VIRTUALDESK = 0x4000
+
+
+def show_cursor(show):
+    """Show or hide the system cursor (Windows only)."""
+    if not IS_WINDOWS:
+        return
+    while True:
+        count = user32.ShowCursor(show)
+        if (show and count >= 0) or (not show and count < 0):
+            break
+
+
+class RecordingBackend:
+    """Keeps every batch in memory: [(monotonic time, [events])]."""
+
+    name = "record"
+
+    def __init__(self, cost=0.0):
+        # Optional simulated cost per event (seconds), for benchmarks.
+        self.cost = cost
+        self.batches = []
+        self.events = 0
+        self._pos = (0, 0)
+
+    def send(self, events):
+        self.batches.append((time.monotonic(), list(events)))
+        self.events += len(events)
+        for event in events:
+            if event[0] == "move":
+                self._pos = (event[1], event[2])
+        if self.cost:
+            time.sleep(self.cost * len(events))
+
+    def position(self):
+        return self._pos
+
+    def close(self):
+        pass
+
+
+class PyAutoGUIBackend:
+    """One pyautogui call per event, without pyautogui's PAUSE after each."""
+
+    name = "pyautogui"
+
+    def send(self, events):
+        gui = pyautogui()
+        for event in events:
+            kind = event[0]
+            if kind == "move":
+                gui.moveTo(event[1], event[2], _pause=False)
+            elif kind == "down":
+                gui.mouseDown(button=event[1], _pause=False)
+            elif kind == "up":
+                gui.mouseUp(button=event[1], _pause=False)
+            elif kind == "key":
+                gui.press(event[1], _pause=False)
+            elif kind == "key_down":
+                gui.keyDown(event[1], _pause=False)
+            elif kind == "key_up":
+                gui.keyUp(event[1], _pause=False)
+            elif kind == "scroll":
+                gui.scroll(event[1] * WHEEL_CLICK, _pause=False)
+
+    def position(self):
+        x, y = pyautogui().position()
+        return int(x), int(y)
+
+    def close(self):
+        pass
+
+
+class SendInputBackend:
+    """Windows: all mouse events of a batch in one SendInput() call.
+
+    to_absolute maps global pixels to the 0..65535 virtual desktop range
+    (DesktopGeometry.to_absolute). Keys go through pyautogui.
+    """
+
+    name = "sendinput"
+    _BUTTONS = {
+        "left": (MOUSEEVENTF_LEFTDOWN, MOUSEEVENTF_LEFTUP) if IS_WINDOWS else None,
+        "right": (MOUSEEVENTF_RIGHTDOWN, MOUSEEVENTF_RIGHTUP) if IS_WINDOWS else None,
+        "middle": (MOUSEEVENTF_MIDDLEDOWN, MOUSEEVENTF_MIDDLEUP) if IS_WINDOWS else None,
+    }
+
+    def __init__(self, to_absolute):
+        if not IS_WINDOWS:
+            raise OSError("SendInput needs Windows")
+        self.to_absolute = to_absolute
+        self._keys = PyAutoGUIBackend()
+
+    def send(self, events):
+        inputs = []
+        for event in events:
+            kind = event[0]
+            if kind.startswith("key"):
+                # Keep the order: flush the mouse events queued so far.
+                self._send_mouse(inputs)
+                inputs = []
+                self._keys.send([event])
+                continue
+            inp = INPUT()
+            inp.type = INPUT_MOUSE
+            if kind == "move":
+                inp.union.mi.dx, inp.union.mi.dy = self.to_absolute(event[1], event[2])
+                inp.union.mi.dwFlags = MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_VIRTUALDESK
+            elif kind in ("down", "up"):
+                down, up = self._BUTTONS[event[1]]
+                inp.union.mi.dwFlags = down if kind == "down" else up
+            elif kind == "scroll":
+                inp.union.mi.dwFlags = MOUSEEVENTF_WHEEL
+                inp.union.mi.mouseData = ctypes.c_ulong(event[1] * WHEEL_CLICK).value
+            inputs.append(inp)
+        self._send_mouse(inputs)
+
+    @staticmethod
+    def _send_mouse(inputs):
+        if inputs:
+            array = (INPUT * len(inputs))(*inputs)
+            user32.SendInput(len(inputs), array, ctypes.sizeof(INPUT))
+
+    def position(self):
+        pt = POINT()
+        user32.GetCursorPos(ctypes.byref(pt))
+        return pt.x, pt.y
+
+    def close(self):
+        pass
+
+
+# pyautogui key names -> X keysym names, where they differ.
+_XK_NAMES = {
+    "up": "Up", "down": "Down", "left": "Left", "right": "Right", "pageup": "Prior",
+    "pagedown": "Next", "pgup": "Prior", "pgdn": "Next", "home": "Home", "end": "End",
+    "enter": "Return", "return": "Return", "esc": "Escape", "escape": "Escape",
+    "space": "space", "tab": "Tab", "backspace": "BackSpace", "delete": "Delete",
+    "ctrl": "Control_L", "ctrlleft": "Control_L", "shift": "Shift_L", "shiftleft": "Shift_L",
+    "alt": "Alt_L", "altleft": "Alt_L", "win": "Super_L", "winleft": "Super_L",
+}
+_X_BUTTONS = {"left": 1, "middle": 2, "right": 3}
+
+
+class XTestBackend:
+    """X11: XTest fake input through python-xlib, one flush per batch."""
+
+    name = "xtest"
+
+    def __init__(self, display=None):
+        from Xlib import X, XK, display as xdisplay
+        from Xlib.ext import xtest
+        self._X, self._XK, self._xtest = X, XK, xtest
+        self._display = xdisplay.Display(display)
+        if not self._display.has_extension("XTEST"):
+            raise OSError("the X server has no XTEST extension")
+        self._keycodes = {}
+
+    def _keycode(self, name):
+        code = self._keycodes.get(name)
+        if code is None:
+            keysym = self._XK.string_to_keysym(_XK_NAMES.get(name.lower(), name))
+            code = self._display.keysym_to_keycode(keysym) if keysym else 0
+            if not code:
+                raise ValueError(f"no key {name!r} on this keyboard")
+            self._keycodes[name] = code
+        return code
+
+    def send(self, events):
+        X, fake = self._X, self._xtest.fake_input
+        d = self._display
+        for event in events:
+            kind = event[0]
+            if kind == "move":
+                fake(d, X.MotionNotify, x=int(event[1]), y=int(event[2]))
+            elif kind == "down":
+                fake(d, X.ButtonPress, _X_BUTTONS[event[1]])
+            elif kind == "up":
+                fake(d, X.ButtonRelease, _X_BUTTONS[event[1]])
+            elif kind in ("key", "key_down"):
+                fake(d, X.KeyPress, self._keycode(event[1]))
+                if kind == "key":
+                    fake(d, X.KeyRelease, self._keycode(event[1]))
+            elif kind == "key_up":
+                fake(d, X.KeyRelease, self._keycode(event[1]))
+            elif kind == "scroll":
+                button = 4 if event[1] > 0 else 5
+                for _ in range(abs(int(event[1]))):
+                    fake(d, X.ButtonPress, button)
+                    fake(d, X.ButtonRelease, button)
+        d.flush()
+
+    def position(self):
+        pointer = self._display.screen().root.query_pointer()
+        return pointer.root_x, pointer.root_y
+
+    def close(self):
+        self._display.close()
+
+
+# Linux input event codes (linux/input-event-codes.h).
+_EV_SYN, _EV_KEY, _EV_REL, _EV_ABS = 0, 1, 2, 3
+_SYN_REPORT, _REL_WHEEL, _ABS_X, _ABS_Y = 0, 8, 0, 1
+_BTN = {"left": 0x110, "right": 0x111, "middle": 0x112}
+_KEY = {
+    "esc": 1, "escape": 1, "backspace": 14, "tab": 15, "enter": 28, "return": 28, "ctrl": 29,
+    "ctrlleft": 29, "shift": 42, "shiftleft": 42, "alt": 56, "altleft": 56, "space": 57,
+    "home": 102, "up": 103, "pageup": 104, "pgup": 104, "left": 105, "right": 106, "end": 107,
+    "down": 108, "pagedown": 109, "pgdn": 109, "delete": 111, "win": 125, "winleft": 125,
+    **{f"f{i}": 58 + i for i in range(1, 11)}, "f11": 87, "f12": 88,
+    **{str(i): 1 + i for i in range(1, 10)}, "0": 11,
+    **{c: 16 + i for i, c in enumerate("qwertyuiop")},
+    **{c: 30 + i for i, c in enumerate("asdfghjkl")},
+    **{c: 44 + i for i, c in enumerate("zxcvbnm")},
+}
+# ioctls (linux/uinput.h): _IOW('U', 100..103, int) and _IO('U', 1..2).
+_UI_SET_EVBIT, _UI_SET_KEYBIT, _UI_SET_RELBIT, _UI_SET_ABSBIT = 0x40045564, 0x40045565, 0x40045566, 0x40045567
+_UI_DEV_CREATE, _UI_DEV_DESTROY = 0x5501, 0x5502
+_ABS_MAX = 65535
+# struct input_event: struct timeval, __u16 type, __u16 code, __s32 value
+_EVENT = struct.Struct("llHHi")
+
+
+class UinputBackend:
+    """Linux: a virtual absolute pointer and keyboard on /dev/uinput.
+
+    Works without X (Wayland, consoles) given write access to /dev/uinput.
+    to_absolute maps global pixels to 0..65535 across the whole desktop,
+    which is how the compositor maps the device's absolute axes.
+    """
+
+    name = "uinput"
+
+    def __init__(self, to_absolute, path="/dev/uinput"):
+        import fcntl
+        self.to_absolute = to_absolute
+        self._fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        try:
+            for ev in (_EV_KEY, _EV_REL, _EV_ABS):
+                fcntl.ioctl(self._fd, _UI_SET_EVBIT, ev)
+            for code in sorted(set(_BTN.values()) | set(_KEY.values())):
+                fcntl.ioctl(self._fd, _UI_SET_KEYBIT, code)
+            fcntl.ioctl(self._fd, _UI_SET_RELBIT, _REL_WHEEL)
+            for axis in (_ABS_X, _ABS_Y):
+                fcntl.ioctl(self._fd, _UI_SET_ABSBIT, axis)
+            # struct uinput_user_dev: name, input_id, ff_effects_max,
+            # absmax/absmin/absfuzz/absflat[ABS_CNT]
+            absmax = [0] * 64
+            absmax[_ABS_X] = absmax[_ABS_Y] = _ABS_MAX
+            setup = struct.pack("80sHHHHi", b"airmouse", 0x06, 0x1209, 0xa1a1, 1, 0)
+            setup += struct.pack("64i", *absmax) + bytes(3 * 64 * 4)
+            os.write(self._fd, setup)
+            fcntl.ioctl(self._fd, _UI_DEV_CREATE)
+        except OSError:
+            os.close(self._fd)
+            raise
+        self._fcntl = fcntl
+        self._pos = (0, 0)
+
+    def send(self, events):
+        out = []
+
+        def emit(type_, code, value):
+            out.append(_EVENT.pack(0, 0, type_, code, value))
+
+        for event in events:
+            kind = event[0]
+            if kind == "move":
+                ax, ay = self.to_absolute(event[1], event[2])
+                emit(_EV_ABS, _ABS_X, min(max(ax, 0), _ABS_MAX))
+                emit(_EV_ABS, _ABS_Y, min(max(ay, 0), _ABS_MAX))
+                self._pos = (int(event[1]), int(event[2]))
+            elif kind in ("down", "up"):
+                if out:
+                    # Report the move first, so the click lands where it should.
+                    emit(_EV_SYN, _SYN_REPORT, 0)
+                emit(_EV_KEY, _BTN[event[1]], 1 if kind == "down" else 0)
+            elif kind.startswith("key"):
+                code = _KEY.get(event[1].lower())
+                if code is None:
+                    raise ValueError(f"no uinput key code for {event[1]!r}")
+                if kind != "key_up":
+                    emit(_EV_KEY, code, 1)
+                if kind == "key":
+                    # A press and release in one report would be dropped.
+                    emit(_EV_SYN, _SYN_REPORT, 0)
+                if kind != "key_down":
+                    emit(_EV_KEY, code, 0)
+            elif kind == "scroll":
+                emit(_EV_REL, _REL_WHEEL, int(event[1]))
+        emit(_EV_SYN, _SYN_REPORT, 0)
+        os.write(self._fd, b"".join(out))
+
+    def position(self):
+        # uinput cannot read the cursor back; this is the last position sent.
+        return self._pos
+
+    def close(self):
+        try:
+            self._fcntl.ioctl(self._fd, _UI_DEV_DESTROY)
+        finally:
+            os.close(self._fd)
+
+
+def make_backend(name="auto", to_absolute=None):
+    """Create an injection backend by name (see BACKENDS). to_absolute is
+    needed by sendinput and uinput."""
+    if name == "auto":
+        if IS_WINDOWS:
+            return SendInputBackend(to_absolute)
+        if os.environ.get("DISPLAY"):
+            try:
+                return XTestBackend()
+            except Exception:
+                pass
+        if os.access("/dev/uinput", os.W_OK):
+            try:
+                return UinputBackend(to_absolute)
+            except OSError:
+                pass
+        return PyAutoGUIBackend()
+    if name == "sendinput":
+        return SendInputBackend(to_absolute)
+    if name == "xtest":
+        return XTestBackend()
+    if name == "uinput":
+        return UinputBackend(to_absolute)
+    if name == "pyautogui":
+        return PyAutoGUIBackend()
+    if name == "record":
+        return RecordingBackend()
+    raise ValueError(f"unknown injection backend {name!r} (choose from {', '.join(BACKENDS)})")
+
+
+class Injector:
+    """Performs bound actions ("key", "click", "scroll", "zoom") on an
+    InputDispatcher's thread through an injection backend.
+
+    backend is a backend name (created on the dispatcher thread on first
+    use) or a backend object; to_absolute is handed to the backends that
+    need it.
+    """
+
+    ACTIONS = ("key", "click", "scroll", "zoom")
+
+    def __init__(self, dispatcher, to_absolute, backend="auto"):
+        self.dispatcher = dispatcher
+        self.to_absolute = to_absolute
+        self._backend = backend if not isinstance(backend, str) else None
+        self._backend_name = backend if isinstance(backend, str) else backend.name
+
+    @property
+    def backend(self):
+        """The backend, created on first use (call from the dispatcher thread)."""
+        if self._backend is None:
+            self._backend = make_backend(self._backend_name, self.to_absolute)
+            print(f"Input injection: {self._backend.name}")
+        return self._backend
+
+    def warm_up(self):
+        """Set the backend up on the dispatcher thread now, not on the
+        first key press."""
+        self.dispatcher.submit(lambda: self.backend)
+
+    def perform(self, action, args, x, y):
+        if action == "key":
+            self.dispatcher.submit(self.send, [("key", args[0])])
+        elif action == "click":
+            self.dispatcher.submit(self.send, [("move", x, y), ("down", "left"), ("up", "left")])
+        elif action == "scroll":
+            self.dispatcher.submit(self.send, [("scroll", int(args[0]) if args else 1)])
+        elif action == "zoom":
+            # Ctrl+wheel zooms in browsers, viewers and office apps.
+            self.dispatcher.submit(self.send, [("key_down", "ctrl"),
+                                               ("scroll", int(args[0]) if args else 1),
+                                               ("key_up", "ctrl")])
+        else:
+            return False
+        return True
+
+    # Below runs on the dispatcher thread, never the GUI thread.
+    def send(self, events):
+        try:
+            self.backend.send(events)
+        except Exception as e:
+            print(f"Injection error ({events[0][0]}): {e}")
+
+    def close(self):
+        if self._backend is not None:
+            self._backend.close()
+
+
+class CursorDriver:
+    """Moves the real OS cursor to the pointer, coalesced.
+
+    move() is called at most once per display frame (the overlay's frame
+    scheduler, or the headless runner's frame tick) with the newest
+    position. A move is only queued on the dispatcher when none is still
+    waiting there, and the queued move sends whatever the newest position
+    is when it runs, so a slow backend never builds up a backlog.
+    """
+
+    def __init__(self, injector):
+        self.injector = injector
+        self._target = None
+        self._sent = None
+        self._queued = False
+        self.frames = 0
+        self.moves = 0
+
+    def move(self, x, y):
+        """Returns True if a move was queued."""
+        self.frames += 1
+        pos = (int(x), int(y))
+        self._target = pos
+        if pos == self._sent or self._queued:
+            return False
+        self._queued = True
+        self.injector.dispatcher.submit(self._flush)
+        return True
+
+    def _flush(self):
+        # Dispatcher thread.
+        self._queued = False
+        pos = self._target
+        if pos == self._sent:
+            return
+        self._sent = pos
+        self.moves += 1
+        self.injector.send([("move", pos[0], pos[1])])
+
+    def summary(self):
+        return f"Cursor: {self.moves} moves over {self.frames} frames"
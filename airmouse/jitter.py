@@ -0,0 +1,219 @@
+"""Link quality and an adaptive playout delay for bursty sample arrival.
+
+USB-serial dongles and ESP-NOW links hand samples over in bursts with
+gaps in between: the average rate is fine, but a pointer drawn from
+whatever has arrived by each frame stalls in the gaps and jumps at the
+bursts. The cure is the one every audio/video jitter buffer uses: play the
+trail back a little in the past, far enough that the next burst usually
+lands before the playout clock runs out of samples, and interpolate
+between samples at render time.
+
+LinkMonitor watches each batch as the consumer takes it:
+
+    staleness  how old the newest sample was when the next batch arrived,
+               i.e. how far behind the present the pointer would have to
+               be drawn for that batch not to come too late
+    jitter     RFC 3550 interarrival jitter: a 1/16 running mean of the
+               change in transit time (arrival - sample time) from one
+               sample to the next
+    bursts     samples per batch and the gaps between batches
+    loss       gaps in the sequence numbers of binary frames and UDP lines
+
+PlayoutBuffer turns the staleness into a delay: the --quantile of the
+last --window seconds of staleness, raised at once when that goes up and
+let down by at most --release seconds per second, within [min_delay,
+max_delay]. Stalls longer than `stall` (the remote going quiet) are left
+out of the estimate. FrameScheduler subtracts the delay from its render
+time; frames that still ran out of samples count as underruns.
+"""
+from collections import deque
+
+import numpy as np
+
+from .stats import percentile
+
+# Sequence numbers are 16 bits on the wire (protocol.FRAME_STRUCT, udp).
+SEQ_MOD = 1 << 16
+
+
+class LinkMonitor:
+    """Rate, loss, burst and jitter figures of one remote's sample stream."""
+
+    def __init__(self, stall=0.25, history=4096):
+        self.stall = stall
+        self.samples = 0
+        self.batches = 0
+        self.lost = 0
+        self.reordered = 0
+        self.stalls = 0
+        self.jitter = 0.0
+        self.max_burst = 0
+        self._first_t = None
+        self._last_t = None
+        self._last_seq = None
+        self._transit = None
+        self._last_arrival = None
+        # Recent values only: the figures describe the link as it is now.
+        self.staleness = deque(maxlen=history)
+        self.gaps = deque(maxlen=history)
+        self.bursts = deque(maxlen=history)
+
+    def observe(self, now, samples):
+        """Account for a batch taken at `now`; returns its staleness in
+        seconds, or None for the first batch and after a stall."""
+        n = len(samples)
+        if not n:
+            return None
+        self.samples += n
+        self.batches += 1
+        self.bursts.append(n)
+        if n > self.max_burst:
+            self.max_burst = n
+
+        # RFC 3550 section 6.4.1, with the host sample time as the send time.
+        jitter, transit = self.jitter, self._transit
+        last_seq = self._last_seq
+        for sample in samples:
+            d = now - sample["t"]
+            if transit is not None:
+                jitter += (abs(d - transit) - jitter) / 16.0
+            transit = d
+            seq = sample.get("seq")
+            if seq is not None:
+                if last_seq is not None:
+                    ahead = (seq - last_seq) % SEQ_MOD
+                    if ahead == 0 or ahead > SEQ_MOD // 2:
+                        self.reordered += 1
+                    else:
+                        self.lost += ahead - 1
+                last_seq = seq
+        self.jitter, self._transit, self._last_seq = jitter, transit, last_seq
+
+        staleness = None
+        if self._last_arrival is not None:
+            gap = now - self._last_arrival
+            self.gaps.append(gap)
+            stale = now - self._last_t
+            if stale > self.stall:
+                self.stalls += 1
+            else:
+                staleness = stale
+                self.staleness.append(stale)
+        self._last_arrival = now
+        self._last_t = samples[-1]["t"]
+        if self._first_t is None:
+            self._first_t = samples[0]["t"]
+        return staleness
+
+    def pause(self):
+        """The consumer stopped taking samples on purpose (idle): the next
+        batch starts afresh instead of counting as a late one."""
+        self._last_arrival = None
+        self._transit = None
+
+    @property
+    def rate(self):
+        """Mean samples per second so far."""
+        if self._first_t is None or self._last_t <= self._first_t:
+            return 0.0
+        return (self.samples - 1) / (self._last_t - self._first_t)
+
+    @property
+    def loss(self):
+        """Fraction of sequence-numbered samples that never arrived."""
+        total = self.samples + self.lost
+        return self.lost / total if total else 0.0
+
+    def summary(self):
+        if not self.samples:
+            return "no samples"
+        gaps = sorted(self.gaps)
+        stale = sorted(self.staleness)
+        parts = [f"{self.rate:.0f} samples/s in {self.batches} batches, burst mean "
+                 f"{sum(self.bursts) / len(self.bursts):.1f} max {self.max_burst}",
+                 f"{self.lost} lost ({100 * self.loss:.2f}%), {self.reordered} reordered, "
+                 f"{self.stalls} stalls",
+                 f"jitter {self.jitter * 1e3:.2f} ms"]
+        if gaps:
+            parts.append(f"batch gap p50 {percentile(gaps, 50) * 1e3:.2f} p95 "
+                         f"{percentile(gaps, 95) * 1e3:.2f} max {gaps[-1] * 1e3:.2f} ms")
+        if stale:
+            parts.append(f"staleness p50 {percentile(stale, 50) * 1e3:.2f} p95 "
+                         f"{percentile(stale, 95) * 1e3:.2f} ms")
+        return "; ".join(parts)
+
+
+class PlayoutBuffer:
+    """Adaptive playout delay, fed the LinkMonitor's staleness.
+
+    min_delay and max_delay bound the delay (seconds); quantile (0-100) of
+    the last `window` seconds of staleness is the target, recomputed every
+    `interval` seconds; release is how fast (seconds per second) the delay
+    comes down after the link calms down.
+    """
+
+    def __init__(self, min_delay=0.0, max_delay=0.1, quantile=95.0, window=2.0, release=0.02,
+                 interval=0.1):
+        min_delay, max_delay = float(min_delay), float(max_delay)
+        if not 0.0 <= min_delay <= max_delay:
+            raise ValueError("need 0 <= min_delay <= max_delay")
+        if not 0.0 < float(quantile) <= 100.0:
+            raise ValueError("quantile must be in (0, 100]")
+        if float(window) <= 0 or float(release) <= 0 or float(interval) <= 0:
+            raise ValueError("window, release and interval must be positive")
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.quantile = float(quantile)
+        self.window = float(window)
+        self.release = float(release)
+        self.interval = float(interval)
+        self.delay = min_delay
+        self.target = min_delay
+        self._history = deque()
+        self._next_update = 0.0
+        self._last_update = None
+        self._starved = False
+        self.frames = 0
+        self.underruns = 0
+        self.max_seen = min_delay
+
+    def observe(self, now, staleness):
+        """Add one batch's staleness (None is ignored) and adapt the delay."""
+        history = self._history
+        if staleness is not None:
+            history.append((now, staleness))
+        while history and history[0][0] < now - self.window:
+            history.popleft()
+        if now < self._next_update:
+            return self.delay
+        self._next_update = now + self.interval
+        if history:
+            values = np.fromiter((s for _, s in history), float, len(history))
+            self.target = min(max(float(np.percentile(values, self.quantile)), self.min_delay),
+                              self.max_delay)
+        else:
+            self.target = self.min_delay
+        dt = now - self._last_update if self._last_update is not None else 0.0
+        self._last_update = now
+        if self.target >= self.delay:
+            # Too little buffering stalls the dot: catch up at once.
+            self.delay = self.target
+        else:
+            self.delay = max(self.target, self.delay - self.release * dt)
+        if self.delay > self.max_seen:
+            self.max_seen = self.delay
+        return self.delay
+
+    def frame(self, play_time, limit):
+        """Note a frame tick; an underrun is a run of ticks whose playout
+        time was past `limit`, the newest sample plus the extrapolation
+        allowed, so the dot stood still waiting for the link."""
+        self.frames += 1
+        starved = limit is not None and play_time > limit
+        if starved and not self._starved:
+            self.underruns += 1
+        self._starved = starved
+
+    def summary(self):
+        return (f"playout delay {self.delay * 1e3:.1f} ms (target {self.target * 1e3:.1f}, "
+                f"max {self.max_seen * 1e3:.1f}), {self.underruns} underruns in {self.frames} ticks")
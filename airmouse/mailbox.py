@@ -0,0 +1,207 @@
+"""Bounded hand-off between the serial thread and the GUI thread."""
+import time
+import threading
+import collections
+
+
+class SampleMailbox:
+    """Newest pose in a single slot, button transitions in a small ring.
+
+    A drop-in replacement for the queue.Queue the serial reader used to fill:
+    put() accepts the same ("DATA", sample) / ("BATCH", samples) /
+    ("INFO"|"ERROR", text) tuples. Poses never queue up - a slow GUI tick just
+    sees the newest one - but every sample whose buttons differ from the
+    previous one is kept in order so no press or release is lost.
+
+    Consumers that want every sample since their last tick use take_batch();
+    those come from a ring of the last `history` samples, so a stalled GUI
+    still gets a bounded batch.
+
+    A consumer with nothing to do can sleep(): samples are still kept, but
+    the waker only fires again for a button edge, a move away from the
+    consumer's last pose, or a heartbeat (see airmouse/idle.py).
+    """
+
+    def __init__(self, edge_capacity=64, message_capacity=64, history=512):
+        self._lock = threading.Lock()
+        self._latest = None
+        self._edges = collections.deque()
+        self._history = collections.deque(maxlen=history)
+        self._messages = collections.deque(maxlen=message_capacity)
+        self.edge_capacity = edge_capacity
+        self._last_buttons = None
+        self._wake = None
+        self._wake_pending = False
+        self._sleep = None
+        self._sleep_wake = None
+
+        self.published = 0
+        self.taken = 0
+        self.overwritten = 0
+        self.edge_drops = 0
+        self.edge_depth_max = 0
+        self.history_drops = 0
+        self.wakeups = 0
+        self.idle_wakes = {"edge": 0, "motion": 0, "heartbeat": 0}
+
+    def put(self, item):
+        kind, payload = item
+        if kind == "DATA":
+            self.publish(payload)
+        elif kind == "BATCH":
+            for sample in payload:
+                self.publish(sample)
+        else:
+            self._messages.append(item)
+            self._notify()
+
+    put_nowait = put
+
+    def publish(self, sample):
+        buttons = sample["buttons"]
+        with self._lock:
+            edge = buttons != self._last_buttons
+            if edge:
+                self._last_buttons = buttons
+                edges = self._edges
+                if len(edges) < self.edge_capacity:
+                    edges.append(sample)
+                    if len(edges) > self.edge_depth_max:
+                        self.edge_depth_max = len(edges)
+                else:
+                    self.edge_drops += 1
+            if self._latest is not None:
+                self.overwritten += 1
+            self._latest = sample
+            history = self._history
+            if len(history) == history.maxlen and self._sleep is None:
+                self.history_drops += 1
+            history.append(sample)
+            wake = None
+            if not self._wake_pending:
+                if self._sleep is None:
+                    wake = self._wake
+                elif self._sleep_over(sample, edge):
+                    wake = self._sleep_wake or self._wake
+                    self._sleep_wake = None
+            if wake is not None:
+                self._wake_pending = True
+                self.wakeups += 1
+        self.published += 1
+        if wake is not None:
+            wake()
+
+    def _sleep_over(self, sample, edge):
+        # Called with the lock held while the consumer sleeps.
+        ref, motion, until = self._sleep
+        if edge:
+            cause = "edge"
+        elif motion is not None and any(abs(v - r) > motion for v, r in zip(sample["raw"], ref)):
+            cause = "motion"
+        elif until is not None and sample["t"] >= until:
+            cause = "heartbeat"
+        else:
+            return False
+        self._sleep = None
+        self.idle_wakes[cause] += 1
+        return True
+
+    def sleep(self, ref=None, motion=None, heartbeat=None, wake=None):
+        """Stop waking the consumer for ordinary samples.
+
+        The next wakeup comes with a button edge, a sample more than
+        `motion` (raw units, on any axis) away from the raw pose ref, or the first
+        sample `heartbeat` seconds after the newest one so far; motion and
+        heartbeat are off when None. That wakeup calls `wake` if given
+        (a polling consumer has no waker of its own), else the waker, and
+        ends the sleep.
+        """
+        with self._lock:
+            until = None
+            if heartbeat is not None:
+                newest = self._history[-1]["t"] if self._history else time.monotonic()
+                until = newest + heartbeat
+            self._sleep = (ref, motion if ref is not None else None, until)
+            self._sleep_wake = wake
+
+    @property
+    def asleep(self):
+        return self._sleep is not None
+
+    def set_waker(self, wake):
+        """Call wake() (from the producer thread) when data arrives.
+
+        Wakeups are coalesced: after one fires, no other is sent until the
+        consumer calls take().
+        """
+        self._wake = wake
+
+    def _notify(self):
+        with self._lock:
+            wake = self._wake is not None and not self._wake_pending
+            if wake:
+                self._wake_pending = True
+                self.wakeups += 1
+        if wake:
+            self._wake()
+
+    def take(self):
+        """Return (newest pose or None, list of button-edge samples in order).
+
+        Edges are only ever returned together with a pose. Also re-arms the
+        waker, so consumers should take() before take_messages().
+        """
+        with self._lock:
+            self._wake_pending = False
+            latest = self._latest
+            if latest is None:
+                return None, []
+            self._latest = None
+            edges = list(self._edges)
+            self._edges.clear()
+            self._history.clear()
+        self.taken += 1
+        return latest, edges
+
+    def take_batch(self):
+        """Return (all samples since the last take, button-edge samples).
+
+        The sample list is empty when nothing new arrived; otherwise its last
+        entry is the newest pose.
+        """
+        with self._lock:
+            self._wake_pending = False
+            if self._latest is None:
+                return [], []
+            self._latest = None
+            samples = list(self._history)
+            self._history.clear()
+            edges = list(self._edges)
+            self._edges.clear()
+        self.taken += 1
+        return samples, edges
+
+    def take_messages(self):
+        out = []
+        pop = self._messages.popleft
+        while self._messages:
+            out.append(pop())
+        return out
+
+    def stats(self):
+        return {
+            "published": self.published,
+            "taken": self.taken,
+            "overwritten": self.overwritten,
+            "edge_depth": len(self._edges),
+            "edge_depth_max": self.edge_depth_max,
+            "edge_drops": self.edge_drops,
+            "history_drops": self.history_drops,
+            "wakeups": self.wakeups,
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"{s['published']} samples, {s['taken']} consumed, {s['overwritten']} superseded, "
+                f"button backlog max {s['edge_depth_max']}, {s['edge_drops']} button edges dropped, "
+                f"{s['history_drops']} samples beyond the batch ring, {s['wakeups']} consumer wakeups")
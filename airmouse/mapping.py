@@ -0,0 +1,30 @@
+"""Vectorised sample-to-screen mapping for a batch of samples."""
+import numpy as np
+
+# Sensor values are clamped to +/-SCALE and normalised to +/-1.
+SCALE = 8.0
+
+# Where the pointer is mapped (DesktopGeometry) and how the dot is shown
+# (DotView); defined here so option parsing does not need Qt.
+AREAS = ("all", "primary")
+WINDOW_MODES = ("full", "sprite")
+
+
+def batch_arrays(samples):
+    """Columns t, x, y of a list of sample dicts as float64 arrays."""
+    n = len(samples)
+    t = np.fromiter((s["t"] for s in samples), np.float64, n)
+    x = np.fromiter((s["x"] for s in samples), np.float64, n)
+    y = np.fromiter((s["y"] for s in samples), np.float64, n)
+    return t, x, y
+
+
+def map_to_screen(x, y, center, half, cal=(0.0, 0.0), gain=1.0):
+    """Clamp, remove the calibration offset, scale and place on screen.
+
+    center and half are (x, y) pairs in pixels; gain multiplies the
+    normalised offset before it is scaled to half the screen.
+    """
+    nx = (np.clip(x, -SCALE, SCALE) / SCALE - cal[0]) * gain
+    ny = (np.clip(y, -SCALE, SCALE) / SCALE - cal[1]) * gain
+    return center[0] + nx * half[0], center[1] + ny * half[1]
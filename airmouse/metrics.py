@@ -0,0 +1,170 @@
+"""Per-stage pipeline timing: fixed-bucket histograms and a stats endpoint.
+
+Stages (seconds):
+
+    read      serial read, from the first byte being available to the chunk
+              being in memory
+    parse     FrameDecoder.feed() for one chunk
+    queue     sample timestamp to the GUI tick that takes it
+    process   process_data() / update_from_queue() for one tick
+    dispatch  input injection, split into dispatch_wait (queued) and
+              dispatch_run (pyautogui / SendInput)
+    paint     paintEvent()
+    reconnect serial link lost to port reopened (PortSupervisor)
+
+Everything is off unless a PipelineMetrics is passed in; the instrumented
+code only pays a `metrics is not None` check then. Each histogram is
+written from one thread (the stage's own) and read as a snapshot by the
+console dump or the HTTP endpoint, so no locks are needed.
+"""
+import os
+import stat
+import threading
+from bisect import bisect_left
+
+STAGES = ("read", "parse", "queue", "process", "dispatch_wait", "dispatch_run", "paint",
+          "reconnect")
+
+# 5 us .. 5 s, roughly 1-2.5-5 per decade; the last bucket is +Inf.
+BUCKETS = (5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+           1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q, counts=None):
+        """Upper bound of the bucket holding the q-quantile (0..1)."""
+        counts = self.counts if counts is None else counts
+        total = sum(counts)
+        if not total:
+            return float("nan")
+        rank = q * total
+        seen = 0
+        for bound, n in zip(self.bounds + (float("inf"),), counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class PipelineMetrics:
+    """One histogram per stage plus a few event counters."""
+
+    def __init__(self, stages=STAGES):
+        self.stages = {name: Histogram() for name in stages}
+        self.counters = {}
+
+    def observe(self, stage, seconds):
+        self.stages[stage].observe(seconds)
+
+    def inc(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self):
+        """Console table: count, mean and bucketed p50/p99 per stage."""
+        lines = [f"  {'stage':<14} {'count':>9} {'mean ms':>9} {'p50 <=':>9} {'p99 <=':>9}"]
+        for name, h in self.stages.items():
+            counts = list(h.counts)
+            n = sum(counts)
+            if not n:
+                continue
+            lines.append(f"  {name:<14} {n:>9d} {h.sum / max(h.count, 1) * 1e3:>9.3f} "
+                         f"{h.quantile(0.5, counts) * 1e3:>9.3f} {h.quantile(0.99, counts) * 1e3:>9.3f}")
+        if self.counters:
+            lines.append("  " + ", ".join(f"{k} {v}" for k, v in sorted(self.counters.items())))
+        return "\n".join(lines)
+
+    def prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        out = ["# HELP airmouse_stage_seconds Time spent per pipeline stage.",
+               "# TYPE airmouse_stage_seconds histogram"]
+        for name, h in self.stages.items():
+            counts = list(h.counts)
+            total = 0
+            for bound, n in zip(h.bounds, counts):
+                total += n
+                out.append(f'airmouse_stage_seconds_bucket{{stage="{name}",le="{bound:g}"}} {total}')
+            total += counts[-1]
+            out.append(f'airmouse_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {total}')
+            out.append(f'airmouse_stage_seconds_sum{{stage="{name}"}} {h.sum:.9f}')
+            out.append(f'airmouse_stage_seconds_count{{stage="{name}"}} {total}')
+        for key, value in sorted(self.counters.items()):
+            out.append(f"# TYPE airmouse_{key}_total counter")
+            out.append(f"airmouse_{key}_total {value}")
+        return "\n".join(out) + "\n"
+
+
+def _remove_stale_socket(path):
+    """Remove a socket an earlier run left at path; refuse anything else."""
+    import socket
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(st.st_mode):
+        raise FileExistsError(f"{path} exists and is not a socket")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        pass
+    else:
+        raise OSError(f"{path}: another server is listening there")
+    finally:
+        probe.close()
+    os.unlink(path)
+
+
+def serve_metrics(metrics, address):
+    """Serve /metrics on "HOST:PORT" (or just "PORT", bound to localhost)
+    or "unix:/path/to.sock" from a daemon thread (a socket left behind at
+    the path is replaced, anything else there refused). Returns the server;
+    call shutdown() and server_close() on exit."""
+    # http.server is imported here, not at startup, when it is wanted.
+    import socketserver
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = metrics.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def address_string(self):
+            # Unix socket peers have no address tuple.
+            return self.client_address[0] if self.client_address else "unix"
+
+        def log_message(self, fmt, *args):
+            pass
+
+    class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    if address.startswith("unix:"):
+        path = address[5:]
+        _remove_stale_socket(path)
+        server = UnixHTTPServer(path, MetricsHandler)
+    else:
+        host, _, port = address.rpartition(":")
+        server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), MetricsHandler)
+        server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
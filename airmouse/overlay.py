@@ -0,0 +1,353 @@
+"""app.py's laser overlay: one translucent window, a dot per remote.
+
+This is the only part of app.py that needs Qt; it is imported when a
+window is actually wanted, so --headless and tools that only need the
+pipeline never load PyQt5's GUI modules.
+"""
+import copy
+import time
+import functools
+
+from PyQt5 import QtWidgets, QtGui, QtCore
+
+from .qt_wakeup import QtWaker
+from .dispatch import InputDispatcher
+from .filters import PassThrough
+from .sprites import SpriteCache, DotView
+from .desktop import DesktopGeometry
+from .frames import FrameScheduler
+from .calibration import AutoCalibrator
+from .gestures import GestureEngine
+from .jitter import LinkMonitor, PlayoutBuffer
+from .idle import IdleTracker
+from .injection import IS_WINDOWS, CursorDriver, Injector, show_cursor
+from .remote import BUTTON_GRACE, GESTURE_KEYS, Remote
+
+GLOW_RADIUS = 25
+
+# Dot colour per remote when several receivers drive one overlay; the
+# first keeps the classic red glow.
+REMOTE_COLORS = [None] + [QtGui.QColor(c) for c in (
+    "#00c853", "#2979ff", "#ffd600", "#d500f9", "#00e5ff", "#ff6d00", "#ffffff",
+    "#76ff03", "#f50057", "#3d5afe", "#ffab00", "#1de9b6", "#c6ff00", "#ff3d00", "#651fff")]
+
+
+class OverlayRemote(Remote):
+    """A Remote plus its dot: colour, view, frame scheduler, button timer."""
+
+    def __init__(self, *args, color=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.color = color
+        self.dot_x, self.dot_y = self.lx, self.ly
+        self.drawn = None
+        self.view = None
+        self.scheduler = None
+        self.playout = None
+        self.button_timer = None
+        self.button_deadline = None
+
+
+class OverlayWindow(QtWidgets.QWidget):
+    """Laser overlay; mailbox may be a list of mailboxes, one per remote.
+
+    With cursor=True the laser moves the real OS cursor (once per display
+    frame at most) instead of drawing a dot; injection names the backend
+    (see airmouse/injection.py). broadcast is an optional PointerBroadcast
+    every filtered sample is published to. With jitter_opts (PlayoutBuffer
+    keyword arguments) each dot is drawn an adaptive playout delay behind
+    its samples; link_stats keeps a LinkMonitor per remote either way.
+    With idle_opts (IdleTracker keyword arguments) the GUI thread sleeps
+    while no remote has anything to show or do. gain and gesture_keys are
+    handed to each Remote; dot_style and dot_radius pick the sprite.
+
+    worker is an optional, started PipelineWorker (airmouse/worker.py)
+    that runs ingest and the pipeline in another process; mailbox is
+    unused then, and the overlay only draws its frames and performs its
+    actions (pointer_filter, gesture_opts, cal_opts, idle_opts and the link
+    statistics belong to the worker).
+    """
+
+    def __init__(self, mailbox, wakeup="event", latency_log=None, pointer_filter=None, paint_log=None,
+                 window_mode="full", screens="all", metrics=None, gesture_opts=None, buttons=None,
+                 cal_opts=None, injection="auto", cursor=False, broadcast=None, jitter_opts=None,
+                 link_stats=False, idle_opts=None, worker=None, gain=1.0, gesture_keys=GESTURE_KEYS,
+                 dot_style="glow", dot_radius=GLOW_RADIUS):
+        super().__init__(flags=QtCore.Qt.FramelessWindowHint |
+                              QtCore.Qt.WindowStaysOnTopHint |
+                              QtCore.Qt.Tool)
+        self.setAttribute(QtCore.Qt.WA_TranslucentBackground)
+        self.setAttribute(QtCore.Qt.WA_TransparentForMouseEvents)
+
+        if worker is not None:
+            mailboxes = [None] * worker.remotes
+        else:
+            mailboxes = mailbox if isinstance(mailbox, (list, tuple)) else [mailbox]
+        if len(mailboxes) > 1 and window_mode != "full":
+            raise ValueError("several remotes need the full-screen window mode")
+        pointer_filter = pointer_filter if pointer_filter is not None else PassThrough()
+
+        # Full-screen overlay or a small window that follows the dot; both
+        # map onto the cached desktop geometry.
+        self.desktop = DesktopGeometry(screens, self)
+        self.dot_style = dot_style
+        self.dot_radius = dot_radius
+
+        self.remotes = []
+        for i, mb in enumerate(mailboxes):
+            remote = OverlayRemote(i, mb, pointer_filter if i == 0 else copy.deepcopy(pointer_filter),
+                                   buttons, GestureEngine(**gesture_opts) if gesture_opts is not None else None,
+                                   self.desktop.center, gesture_keys, gain,
+                                   color=REMOTE_COLORS[i % len(REMOTE_COLORS)],
+                                   calibrator=AutoCalibrator(**cal_opts) if cal_opts is not None else None)
+            remote.view = DotView(self, window_mode, dot_radius, self.desktop)
+            self.desktop.changed.connect(remote.view.apply_geometry)
+            if jitter_opts is not None or link_stats:
+                remote.link = LinkMonitor()
+            if jitter_opts is not None:
+                remote.playout = PlayoutBuffer(**jitter_opts)
+            if idle_opts is not None:
+                remote.idle = IdleTracker(mb, **idle_opts)
+            # Paint at the display's refresh rate, not once per sample.
+            remote.scheduler = FrameScheduler(functools.partial(self._render, remote),
+                                              self.desktop.refresh_rate, playout=remote.playout,
+                                              parent=self)
+            self.desktop.changed.connect(
+                lambda s=remote.scheduler: s.set_refresh_rate(self.desktop.refresh_rate))
+            remote.button_timer = QtCore.QTimer(self)
+            remote.button_timer.setSingleShot(True)
+            remote.button_timer.timeout.connect(functools.partial(self._button_timeout, remote))
+            self.remotes.append(remote)
+        self.metrics = metrics
+        self.broadcast = broadcast
+        self.worker = worker
+        if worker is not None:
+            self._send_geometry()
+            self.desktop.changed.connect(self._send_geometry)
+        if broadcast is not None:
+            self._publish_geometry()
+            self.desktop.changed.connect(self._publish_geometry)
+        self.dispatcher = InputDispatcher(metrics=metrics)
+        self.injector = Injector(self.dispatcher, self.desktop.to_absolute, injection)
+        self.cursor = CursorDriver(self.injector) if cursor else None
+        self.sprites = SpriteCache()
+        self.paint_log = paint_log
+
+        # Cursor state tracking
+        self.cursor_visible = True
+        if IS_WINDOWS:
+            show_cursor(True)
+
+        self.latency_log = latency_log
+        self.timer = None
+        self._resume = None
+        if wakeup == "timer":
+            self.timer = QtCore.QTimer()
+            self.timer.timeout.connect(self.process_data)
+            self.timer.start(16)  # ~60 FPS
+            if idle_opts is not None:
+                # The poll stops while every remote is idle; a sleeping
+                # mailbox restarts it.
+                self._resume = QtWaker(self._resume_polling, self).wake.emit
+        elif worker is not None:
+            # The worker writes to its socket after every batch it publishes.
+            self.notifier = QtCore.QSocketNotifier(worker.wake_fd, QtCore.QSocketNotifier.Read, self)
+            self.notifier.activated.connect(self._worker_woken)
+        else:
+            # The reader wakes the event loop as soon as a sample lands.
+            self.waker = QtWaker(self.process_data, self)
+            for remote in self.remotes:
+                remote.mailbox.set_waker(self.waker.wake.emit)
+
+    def process_data(self):
+        t0 = time.perf_counter() if self.metrics is not None else 0.0
+        if self.worker is not None:
+            self._process_worker()
+        else:
+            for remote in self.remotes:
+                self._process_remote(remote)
+        if self.metrics is not None:
+            self.metrics.observe("process", time.perf_counter() - t0)
+
+    def _process_remote(self, remote):
+        samples, edges = remote.mailbox.take_batch()
+        for kind, text in remote.mailbox.take_messages():
+            print(f"[{kind}]", text)
+        if not samples:
+            self._update_idle(remote, samples)
+            return
+        latest = samples[-1]
+        if self.latency_log is not None:
+            self.latency_log.add(time.monotonic() - latest["t"])
+        if self.metrics is not None:
+            self.metrics.observe("queue", time.monotonic() - latest["t"])
+        if remote.link is not None:
+            now = time.monotonic()
+            staleness = remote.link.observe(now, samples)
+            if remote.playout is not None:
+                remote.playout.observe(now, staleness)
+
+        # Every sample since the last tick is mapped and filtered in one go;
+        # buttons and gestures run after the trail is handed to the painter.
+        t, fx, fy, actions = remote.update(samples, edges, self.desktop.center, self.desktop.half)
+        remote.scheduler.push(t, fx, fy)
+        if self.broadcast is not None:
+            self.broadcast.publish(samples, fx, fy, remote.laser_on, remote.source)
+        self._perform(remote, actions)
+        self._arm_button_timer(remote)
+        self._update_idle(remote, samples)
+
+    def _process_worker(self):
+        # Positions and actions come finished from the worker process.
+        records, events = self.worker.take()
+        if len(records):
+            age = time.monotonic() - float(records["t"][-1])
+            if self.latency_log is not None:
+                self.latency_log.add(age)
+            if self.metrics is not None:
+                self.metrics.observe("queue", age)
+            for remote in self.remotes:
+                mine = records if len(self.remotes) == 1 else records[records["remote"] == remote.source]
+                if len(mine):
+                    remote.scheduler.push(mine["t"].tolist(), mine["x"].tolist(), mine["y"].tolist())
+        for source, action, args, x, y, laser, cal in events:
+            remote = self.remotes[source]
+            remote.laser_on, remote.cal = laser, tuple(cal)
+            if action == "toggle_laser":
+                remote.scheduler.request()
+            self._perform(remote, [(action, tuple(args), x, y)])
+
+    def _worker_woken(self):
+        if not self.worker.drain():
+            self.notifier.setEnabled(False)
+            print("[ERROR] The worker process has exited")
+            return
+        self.process_data()
+
+    def _update_idle(self, remote, samples):
+        if remote.idle is None:
+            return
+        if not remote.idle.update(samples, remote.laser_on or remote.gestures is not None,
+                                  busy=remote.buttons.next_deadline != float("inf"),
+                                  heartbeat=remote.calibrator is not None, wake=self._resume):
+            return
+        if remote.link is not None:
+            # Samples held back while asleep are not link jitter.
+            remote.link.pause()
+        if self.timer is not None and all(r.mailbox.asleep for r in self.remotes):
+            self.timer.stop()
+
+    def _resume_polling(self):
+        if not self.timer.isActive():
+            self.timer.start()
+        self.process_data()
+
+    def _perform(self, remote, actions):
+        tag = f"Remote {remote.source}: " if len(self.remotes) > 1 else ""
+        for action, args, x, y in actions:
+            if action == "toggle_laser":
+                # Hide cursor while any laser is on, unless it is the pointer
+                if self.cursor is None:
+                    show_cursor(not any(r.laser_on for r in self.remotes))
+                print(f"{tag}Laser {'ON' if remote.laser_on else 'OFF'}")
+                continue
+            if action == "recalibrate":
+                print(f"{tag}Recalibrated: cal=({remote.cal[0]:+.3f}, {remote.cal[1]:+.3f})")
+                continue
+            if action != "click":
+                print(f"{tag}{action.capitalize()} {' '.join(map(str, args))}")
+            self.injector.perform(action, args, x, y)
+
+    def _arm_button_timer(self, remote):
+        # Long presses and pending clicks fire on time even if the samples
+        # stop coming.
+        deadline = remote.buttons.next_deadline
+        if deadline == remote.button_deadline:
+            return
+        remote.button_deadline = deadline
+        if deadline == float("inf"):
+            remote.button_timer.stop()
+        else:
+            delay = deadline + BUTTON_GRACE - time.monotonic()
+            remote.button_timer.start(max(0, int(delay * 1e3 + 0.5)))
+
+    def _button_timeout(self, remote):
+        self._process_remote(remote)
+        self._perform(remote, remote.advance(time.monotonic() - BUTTON_GRACE))
+        self._arm_button_timer(remote)
+
+    def paintEvent(self, event):
+        t0 = time.perf_counter()
+        painter = None
+        dpr = self.devicePixelRatioF()
+        for remote in self.remotes:
+            if not remote.laser_on:
+                continue
+            if painter is None:
+                painter = QtGui.QPainter(self)
+            # The laser dot (glow, or a solid dot), pre-rendered once per screen scale
+            sprite = self.sprites.get(self.dot_style, self.dot_radius, dpr, remote.color)
+            painter.drawPixmap(remote.view.sprite_pos(remote.dot_x, remote.dot_y), sprite)
+        if painter is None:
+            return
+        painter.end()
+        if self.paint_log is not None:
+            self.paint_log.add(time.perf_counter() - t0)
+        if self.metrics is not None:
+            self.metrics.observe("paint", time.perf_counter() - t0)
+
+    def _render(self, remote, x, y):
+        # Called by the frame scheduler with the position expected at the
+        # next present; nothing is painted unless the dot actually moved.
+        state = (int(x), int(y)) if remote.laser_on else None
+        if state == remote.drawn:
+            return False
+        remote.drawn = state
+        if self.cursor is not None:
+            # Real cursor mode: the OS cursor is the dot.
+            return state is not None and self.cursor.move(*state)
+        remote.dot_x, remote.dot_y = int(x), int(y)
+        # Repaint only where the dot was and where it is now (full mode), or
+        # just move the sprite window.
+        region = remote.view.move(remote.dot_x, remote.dot_y, remote.laser_on)
+        if not region.isEmpty():
+            self.update(region)
+        return True
+
+    def _publish_geometry(self):
+        rect = self.desktop.rect
+        self.broadcast.set_geometry(rect.x(), rect.y(), rect.width(), rect.height())
+
+    def _send_geometry(self):
+        rect = self.desktop.rect
+        self.worker.set_geometry(self.desktop.center, self.desktop.half,
+                                 (rect.x(), rect.y(), rect.width(), rect.height()))
+
+    def cursor_summary(self):
+        return self.cursor.summary() if self.cursor is not None else ""
+
+    def gesture_summary(self):
+        return "\n".join(f"Gestures{f' (remote {r.source})' if len(self.remotes) > 1 else ''}: "
+                         + r.gestures.summary() for r in self.remotes if r.gestures is not None)
+
+    def calibration_summary(self):
+        return "\n".join(f"Calibration{f' (remote {r.source})' if len(self.remotes) > 1 else ''}: "
+                         + r.calibrator.summary() for r in self.remotes if r.calibrator is not None)
+
+    def idle_summary(self):
+        return "\n".join(f"Idle{f' (remote {r.source})' if len(self.remotes) > 1 else ''}: "
+                         + r.idle.summary() for r in self.remotes if r.idle is not None)
+
+    def link_summary(self):
+        return "\n".join(f"Link{f' (remote {r.source})' if len(self.remotes) > 1 else ''}: "
+                         + r.link.summary() + (f"; {r.playout.summary()}" if r.playout is not None else "")
+                         for r in self.remotes if r.link is not None)
+
+    def frame_summary(self):
+        return "\n".join(f"Frames{f' (remote {r.source})' if len(self.remotes) > 1 else ''}: "
+                         + r.scheduler.summary(self.paint_log if r.source == 0 else None)
+                         for r in self.remotes)
+
+    def closeEvent(self, event):
+        if IS_WINDOWS and not self.cursor_visible:
+            show_cursor(True)
+        super().closeEvent(event)
@@ -0,0 +1,312 @@
+"""Wire formats spoken by the receiver dongle.
+
+Two formats can arrive on the serial link:
+
+* text   - ``RX -> X: .. Y: .. Z: .. | Buttons: a b c d`` lines, plus the
+           ``x,y,z,b1,b2,b3,b4`` comma-separated fallback used by test1.py
+* binary - fixed-size little-endian frames laid out as FRAME_STRUCT
+
+FrameDecoder accepts raw bytes in any chunking, works out which format the
+dongle is sending from the first bytes it sees, and returns sample dicts.
+"""
+import re
+import struct
+import time
+import binascii
+import warnings
+
+import numpy as np
+
+RX_PATTERN = re.compile(
+    r"RX\s*->\s*X:\s*([-\d\.]+)\s*Y:\s*([-\d\.]+)\s*Z:\s*([-\d\.]+)\s*\|\s*Buttons:\s*([01])\s+([01])\s+([01])\s+([01])",
+    re.IGNORECASE
+)
+
+# RX_PATTERN with whitespace that cannot cross a line break, so a whole batch
+# of lines can be scanned with one finditer().
+_RX_BATCH_PATTERN = re.compile(RX_PATTERN.pattern.replace(r"\s", r"[^\S\n]"), re.IGNORECASE)
+
+# A batch of exactly seven non-blank CSV fields per line whose button fields
+# are what int() takes, checked with one fullmatch() on the joined lines.
+_CSV_NUM = r"[^,\n]*?[^,\s][^,\n]*"
+_CSV_INT = r"[^\S\n]*[+-]?\d+[^\S\n]*"
+_CSV_LINE = rf"{_CSV_NUM},{_CSV_NUM},{_CSV_NUM},{_CSV_INT},{_CSV_INT},{_CSV_INT},{_CSV_INT}"
+_CSV_BATCH_PATTERN = re.compile(rf"(?:{_CSV_LINE}\n)*{_CSV_LINE}")
+
+# Sync bytes are outside ASCII so a text stream can never look like a frame.
+SYNC = b"\xa5\x5a"
+
+# sync, sequence, device timestamp (us), x, y, z, button bitmask, CRC-16
+FRAME_STRUCT = struct.Struct("<2sHIfffBH")
+FRAME_SIZE = FRAME_STRUCT.size
+
+# The CRC (CRC-16/CCITT, init 0xFFFF) covers everything between sync and CRC.
+_CRC_START = len(SYNC)
+_CRC_END = FRAME_SIZE - 2
+
+FRAME_MODES = ("auto", "text", "binary")
+
+# Bit n of the mask is button n; indexing a table beats four shifts per frame.
+_BUTTON_TUPLES = tuple(
+    ((m >> 0) & 1, (m >> 1) & 1, (m >> 2) & 1, (m >> 3) & 1) for m in range(16)
+)
+
+# Give up on auto-detection of a chunk of garbage after this many bytes.
+_DETECT_LIMIT = 4 * FRAME_SIZE + 256
+
+
+def make_sample(x_val, y_val, z_val, buttons, t=None, seq=None, t_dev=None):
+    sample = {
+        "x": z_val,  # Using Z for X-axis movement
+        "y": y_val,  # Using Y for Y-axis movement
+        "buttons": buttons,
+        "raw": (x_val, y_val, z_val),
+        "t": time.monotonic() if t is None else t,
+    }
+    if seq is not None:
+        sample["seq"] = seq
+        sample["t_dev"] = t_dev
+    return sample
+
+
+def buttons_to_mask(buttons):
+    return (buttons[0] & 1) | (buttons[1] & 1) << 1 | (buttons[2] & 1) << 2 | (buttons[3] & 1) << 3
+
+
+def pack_frame(seq, t_dev_us, x_val, y_val, z_val, buttons):
+    """Build one binary frame, the way the firmware lays it out."""
+    body = FRAME_STRUCT.pack(SYNC, seq & 0xFFFF, t_dev_us & 0xFFFFFFFF,
+                             x_val, y_val, z_val, buttons_to_mask(buttons), 0)
+    crc = binascii.crc_hqx(body[_CRC_START:_CRC_END], 0xFFFF)
+    return body[:_CRC_END] + struct.pack("<H", crc)
+
+
+def unpack_frame(buf, off=0):
+    """(seq, t_dev, x, y, z, buttons) of the frame at buf[off:], or None if
+    it does not start with SYNC or fails its CRC."""
+    if buf[off:off + 2] != SYNC:
+        return None
+    _, seq, t_dev, x_val, y_val, z_val, mask, crc = FRAME_STRUCT.unpack_from(buf, off)
+    if crc != binascii.crc_hqx(buf[off + _CRC_START:off + _CRC_END], 0xFFFF):
+        return None
+    return seq, t_dev, x_val, y_val, z_val, _BUTTON_TUPLES[mask & 0x0F]
+
+
+def parse_text_line(line, csv_fallback=False, t=None):
+    """Parse one decoded, stripped text line; returns a sample or None."""
+    m = RX_PATTERN.search(line)
+    if m:
+        try:
+            x_val = float(m.group(1))
+            y_val = float(m.group(2))
+            z_val = float(m.group(3))
+            buttons = (int(m.group(4)), int(m.group(5)), int(m.group(6)), int(m.group(7)))
+        except ValueError:
+            return None
+        return make_sample(x_val, y_val, z_val, buttons, t)
+
+    if csv_fallback:
+        parts = [p.strip() for p in line.split(",") if p.strip() != ""]
+        if len(parts) >= 7:
+            try:
+                xv = float(parts[0]); yv = float(parts[1]); zv = float(parts[2])
+                buttons = (int(parts[3]), int(parts[4]), int(parts[5]), int(parts[6]))
+            except ValueError:
+                return None
+            return make_sample(xv, yv, zv, buttons, t)
+    return None
+
+
+class FrameDecoder:
+    """Incremental decoder for the dongle byte stream.
+
+    mode is "text", "binary" or "auto"; in auto mode the decoder stays
+    undecided until it sees either a frame with a valid CRC or a complete
+    text line that parses, and then sticks with that format.
+    """
+
+    def __init__(self, mode="auto", csv_fallback=False):
+        if mode not in FRAME_MODES:
+            raise ValueError(f"Unknown frame mode: {mode}")
+        self.mode = mode
+        self.csv_fallback = csv_fallback
+        self._buf = bytearray()
+        self.frames = 0
+        self.crc_errors = 0
+        self.seq_gaps = 0
+        self._last_seq = None
+        self._last_chunk_t = None
+        self._period = None
+
+    def reset(self):
+        """Forget partial input and sequence/timing state, e.g. after the
+        port was reopened. The detected mode and the counters are kept."""
+        self._buf.clear()
+        self._last_seq = None
+        self._last_chunk_t = None
+        self._period = None
+
+    def feed(self, data):
+        if data:
+            self._buf += data
+        if self.mode == "binary":
+            return self._decode_binary()
+        if self.mode == "text":
+            return self._decode_text()
+        return self._detect()
+
+    def _detect(self):
+        buf = self._buf
+        start = buf.find(SYNC)
+        while start != -1 and len(buf) - start >= FRAME_SIZE:
+            if self._crc_ok(start):
+                self.mode = "binary"
+                del buf[:start]
+                return self._decode_binary()
+            start = buf.find(SYNC, start + 1)
+
+        nl = buf.find(b"\n")
+        while nl != -1:
+            line = buf[:nl].decode("utf-8", errors="ignore").strip()
+            del buf[:nl + 1]
+            if line and parse_text_line(line, self.csv_fallback) is not None:
+                self.mode = "text"
+                # Re-queue the line that proved the format so it isn't lost.
+                buf[:0] = line.encode() + b"\n"
+                return self._decode_text()
+            nl = buf.find(b"\n")
+
+        if len(buf) > _DETECT_LIMIT:
+            del buf[:len(buf) - FRAME_SIZE]
+        return []
+
+    def _crc_ok(self, off):
+        buf = self._buf
+        crc = binascii.crc_hqx(buf[off + _CRC_START:off + _CRC_END], 0xFFFF)
+        return crc == (buf[off + _CRC_END] | buf[off + _CRC_END + 1] << 8)
+
+    def _decode_binary(self):
+        buf = self._buf
+        unpack_from = FRAME_STRUCT.unpack_from
+        crc_hqx = binascii.crc_hqx
+        out = []
+        off = 0
+        end = len(buf) - FRAME_SIZE
+        now = time.monotonic()
+        last_seq = self._last_seq
+        while off <= end:
+            if buf[off] != 0xA5 or buf[off + 1] != 0x5A:
+                nxt = buf.find(SYNC, off + 1)
+                if nxt == -1:
+                    off = max(off, len(buf) - 1)
+                    break
+                off = nxt
+                continue
+            _, seq, t_dev, x_val, y_val, z_val, mask, crc = unpack_from(buf, off)
+            if crc != crc_hqx(buf[off + _CRC_START:off + _CRC_END], 0xFFFF):
+                self.crc_errors += 1
+                off += 1
+                continue
+            if last_seq is not None and seq != (last_seq + 1) & 0xFFFF:
+                self.seq_gaps += 1
+            last_seq = seq
+            # Same keys as make_sample(), built inline to keep this loop tight.
+            out.append({"x": z_val, "y": y_val, "buttons": _BUTTON_TUPLES[mask & 0x0F],
+                        "raw": (x_val, y_val, z_val), "t": now, "seq": seq, "t_dev": t_dev})
+            off += FRAME_SIZE
+        self._last_seq = last_seq
+        self.frames += len(out)
+        if off:
+            del buf[:off]
+        if len(out) > 1:
+            # Back-date earlier frames of the chunk by their device clock delta.
+            last = out[-1]["t_dev"]
+            for sample in out[:-1]:
+                sample["t"] = now - ((last - sample["t_dev"]) & 0xFFFFFFFF) * 1e-6
+        return out
+
+    def _decode_text(self):
+        out = self._parse_text()
+        if out:
+            self._spread_times(out)
+        return out
+
+    def _spread_times(self, out):
+        """Give the samples of one chunk distinct, evenly spaced timestamps.
+
+        Text lines carry no device clock, so the sample period is estimated
+        from how many lines arrive per unit time and each chunk is laid out
+        backwards from its arrival time.
+        """
+        now = out[-1]["t"]
+        n = len(out)
+        if self._last_chunk_t is not None:
+            period = min(max((now - self._last_chunk_t) / n, 0.0002), 0.05)
+            self._period = period if self._period is None else self._period + 0.1 * (period - self._period)
+        self._last_chunk_t = now
+        if n > 1 and self._period is not None:
+            p = self._period
+            for i, sample in enumerate(out):
+                sample["t"] = now - (n - 1 - i) * p
+
+    def _parse_text(self):
+        buf = self._buf
+        last = buf.rfind(b"\n")
+        if last == -1:
+            return []
+        # All complete lines are decoded and parsed as one batch; the partial
+        # tail stays in the buffer for the next feed().
+        text = buf[:last].decode("utf-8", errors="ignore")
+        del buf[:last + 1]
+        now = time.monotonic()
+
+        try:
+            out = [
+                {"x": float(m.group(3)), "y": float(m.group(2)),
+                 "buttons": (int(m.group(4)), int(m.group(5)), int(m.group(6)), int(m.group(7))),
+                 "raw": (float(m.group(1)), float(m.group(2)), float(m.group(3))), "t": now}
+                for m in _RX_BATCH_PATTERN.finditer(text)
+            ] if "->" in text else []
+        except ValueError:
+            out = None
+        lines = [line for line in text.split("\n") if line.strip()]
+        if out is not None:
+            if not self.csv_fallback or len(out) == len(lines):
+                return out
+        if not out and self.csv_fallback:
+            batch = parse_csv_batch(lines, now)
+            if batch is not None:
+                return batch
+        # Mixed or malformed batch: fall back to one line at a time.
+        out = []
+        for line in lines:
+            sample = parse_text_line(line.strip(), self.csv_fallback, now)
+            if sample is not None:
+                out.append(sample)
+        return out
+
+
+def parse_csv_batch(lines, t):
+    """Parse a batch of ``x,y,z,b1,b2,b3,b4`` lines in one go.
+
+    Returns None when the batch is not uniformly seven fields per line with
+    integer buttons, in which case the caller parses line by line.
+    """
+    if _CSV_BATCH_PATTERN.fullmatch("\n".join(lines)) is None:
+        return None
+    joined = ",".join(lines)
+    with warnings.catch_warnings():
+        # Older NumPy only warns on text it cannot parse, newer raises.
+        warnings.simplefilter("ignore")
+        try:
+            arr = np.fromstring(joined, dtype=np.float64, sep=",")
+        except ValueError:
+            return None
+    if arr.size != 7 * len(lines) or joined.count(",") != 7 * len(lines) - 1:
+        return None
+    arr = arr.reshape(-1, 7)
+    buttons = arr[:, 3:7]
+    out = []
+    for row, b in zip(arr[:, :3].tolist(), buttons.astype(np.int64).tolist()):
+        out.append({"x": row[2], "y": row[1], "buttons": tuple(b), "raw": tuple(row), "t": t})
+    return out
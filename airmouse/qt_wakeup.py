@@ -0,0 +1,48 @@
+"""Wake the Qt event loop from the serial thread, or for a signal."""
+import signal
+import socket
+
+from PyQt5 import QtCore
+
+
+class QtWaker(QtCore.QObject):
+    """Queued signal that runs slot on the GUI thread.
+
+    Hand wake.emit to SampleMailbox.set_waker(); the mailbox only emits when
+    no wakeup is already pending, so at most one event sits in the queue.
+    """
+
+    wake = QtCore.pyqtSignal()
+
+    def __init__(self, slot, parent=None):
+        super().__init__(parent)
+        self.wake.connect(slot, QtCore.Qt.QueuedConnection)
+
+
+class SignalWaker(QtCore.QObject):
+    """Run Python signal handlers while the GUI thread sits in Qt.
+
+    Python only runs them between bytecodes of the main thread; with
+    nothing else waking the event loop (an idle overlay, a --worker that
+    does all the reading) a Ctrl+C would wait forever. The signal's wakeup
+    fd is one end of a socket pair watched by a QSocketNotifier, so the
+    loop wakes and the handler runs. By default SIGINT and SIGTERM quit
+    the application, so aboutToQuit's cleanup still runs.
+    """
+
+    def __init__(self, app, signals=(signal.SIGINT, signal.SIGTERM)):
+        super().__init__(app)
+        self._read, self._write = socket.socketpair()
+        self._read.setblocking(False)
+        self._write.setblocking(False)
+        signal.set_wakeup_fd(self._write.fileno())
+        for signum in signals:
+            signal.signal(signum, lambda signum, frame: app.quit())
+        self.notifier = QtCore.QSocketNotifier(self._read.fileno(), QtCore.QSocketNotifier.Read, self)
+        self.notifier.activated.connect(self._drain)
+
+    def _drain(self):
+        try:
+            self._read.recv(64)
+        except BlockingIOError:
+            pass
@@ -0,0 +1,156 @@
+"""Session recording to a compact fixed-record binary log.
+
+File layout: a 16-byte header (HEADER) followed by RECORD-sized entries of
+host monotonic time, raw x/y/z and the button bitmask. Records are
+fixed-size and aligned, so load_session() can memory-map a multi-hour file
+straight into NumPy arrays.
+
+Usage:
+    python -m airmouse.recorder session.amrec     # print a summary
+"""
+import os
+import sys
+import struct
+import threading
+
+from airmouse.protocol import buttons_to_mask
+
+MAGIC = b"AMREC\x00"
+VERSION = 1
+
+# magic, version, record size, reserved
+HEADER = struct.Struct("<6sHH6x")
+# host monotonic time (s), raw x, y, z, button bitmask, padding to 8 bytes
+RECORD = struct.Struct("<dfffB3x")
+
+
+def record_dtype():
+    import numpy as np
+    return np.dtype({
+        "names": ["t", "x", "y", "z", "buttons"],
+        "formats": ["<f8", "<f4", "<f4", "<f4", "u1"],
+        "offsets": [0, 8, 12, 16, 20],
+        "itemsize": RECORD.size,
+    })
+
+
+class SessionRecorder:
+    """Appends samples to a session file from a background thread.
+
+    append() runs on the serial thread and only packs the sample into a
+    preallocated ring; the writer thread flushes whole runs of records with
+    one write() call. If the writer falls a full ring behind, new samples
+    are counted in .dropped rather than blocking the reader.
+    """
+
+    def __init__(self, path, capacity=16384, flush_interval=0.25):
+        self.path = path
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self._ring = bytearray(capacity * RECORD.size)
+        self._view = memoryview(self._ring)
+        # Single producer / single consumer: only append() moves _head and
+        # only the writer moves _tail.
+        self._head = 0
+        self._tail = 0
+        self.dropped = 0
+        self.written = 0
+
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="session-recorder", daemon=True)
+        self._thread.start()
+
+    def append(self, sample):
+        head = self._head
+        pending = head - self._tail
+        if pending >= self.capacity:
+            self.dropped += 1
+            return
+        x_val, y_val, z_val = sample["raw"]
+        RECORD.pack_into(self._ring, (head % self.capacity) * RECORD.size,
+                         sample["t"], x_val, y_val, z_val, buttons_to_mask(sample["buttons"]))
+        self._head = head + 1
+        if pending == self.capacity // 2:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._drain()
+
+    def _drain(self):
+        head = self._head
+        tail = self._tail
+        n = head - tail
+        if not n:
+            return
+        rs = RECORD.size
+        start = tail % self.capacity
+        first = min(n, self.capacity - start)
+        self._file.write(self._view[start * rs:(start + first) * rs])
+        if n > first:
+            self._file.write(self._view[:(n - first) * rs])
+        self._tail = head
+        self.written += n
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._drain()
+        self._file.close()
+
+    def summary(self):
+        return f"Recorded {self.written} samples to {self.path} ({self.dropped} dropped)"
+
+
+def load_session(path):
+    """Memory-map a session file as a structured NumPy array (no copy).
+
+    Fields: t (float64 seconds), x, y, z (float32 raw axes) and buttons
+    (uint8 bitmask, bit n = button n). A partially written last record is
+    ignored.
+    """
+    import numpy as np
+    with open(path, "rb") as f:
+        magic, version, record_size = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a session recording")
+    if version != VERSION or record_size != RECORD.size:
+        raise ValueError(f"{path}: unsupported recording version {version}")
+    n = (os.path.getsize(path) - HEADER.size) // RECORD.size
+    if n == 0:
+        return np.zeros(0, dtype=record_dtype())
+    return np.memmap(path, dtype=record_dtype(), mode="r", offset=HEADER.size, shape=(n,))
+
+
+def buttons_from_mask(mask, index):
+    """Button `index` as a 0/1 array from the buttons field."""
+    return (mask >> index) & 1
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(2)
+    rec = load_session(sys.argv[1])
+    if not len(rec):
+        print("empty recording")
+        return
+    t = rec["t"]
+    duration = float(t[-1] - t[0])
+    print(f"{len(rec)} samples over {duration:.1f} s ({len(rec) / max(duration, 1e-9):.1f} Hz)")
+    gaps = t[1:] - t[:-1]
+    if len(gaps):
+        print(f"largest gap {gaps.max() * 1e3:.1f} ms")
+    for i in range(4):
+        b = buttons_from_mask(rec["buttons"], i)
+        print(f"button {i}: {int(((b[1:] == 1) & (b[:-1] == 0)).sum())} presses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Per-receiver pointer, button and gesture state, without any GUI.
+
+Remote.update() runs one batch of samples from the mailbox through the
+host-side pipeline: mapping onto the screen, smoothing, the button state
+machine and the gesture engine. It returns the filtered trail and the
+actions to perform. The Qt overlays and the headless runner differ only in
+what they do with those.
+"""
+from .buttons import ButtonMachine
+from .mapping import SCALE, batch_arrays, map_to_screen
+
+# app.py's button bindings (see airmouse/buttons.py).
+BUTTONS = {
+    "long_press": 0.3,
+    "bindings": [
+        {"event": "press", "button": 2, "action": "toggle_laser"},
+        {"event": "press", "button": 0, "when": "no_laser", "action": "key", "args": ["up"]},
+        {"event": "press", "button": 3, "when": "no_laser", "action": "key", "args": ["down"]},
+        {"event": "click", "button": 1, "when": "laser", "action": "click"},
+    ],
+}
+
+# Buttons 0 and 3 together make the current pose the centre. Bound only
+# with --auto-cal (or in a --buttons file): a chord holds back its members'
+# presses for chord_window, and the slide keys should go out on the edge.
+RECALIBRATE_CHORD = {"event": "chord", "buttons": [0, 3], "action": "recalibrate"}
+
+
+def with_recalibrate_chord(buttons):
+    """A copy of a bindings config with RECALIBRATE_CHORD added."""
+    return dict(buttons, bindings=list(buttons["bindings"]) + [RECALIBRATE_CHORD])
+
+
+# Keys sent for the "next" / "prev" swipe gestures.
+GESTURE_KEYS = {"next": "down", "prev": "up"}
+
+# A button timer (long press, pending click) that no sample has passed
+# yet is fired this long after its deadline, to let samples in flight land.
+BUTTON_GRACE = 0.02
+
+
+class Remote:
+    """Pointer and button state of one receiver (sample source).
+
+    buttons is a ButtonMachine or a bindings config; gestures an optional
+    GestureEngine, run while the laser is off; calibrator an optional
+    AutoCalibrator that keeps `cal` centred while the laser is off. gain
+    and cal are applied by map_to_screen(). link is an optional
+    LinkMonitor the runner feeds each batch to, idle an optional
+    IdleTracker that puts the mailbox to sleep.
+    """
+
+    def __init__(self, source, mailbox, pointer_filter, buttons=None, gestures=None,
+                 center=(0, 0), gesture_keys=GESTURE_KEYS, gain=1.0, calibrator=None):
+        self.source = source
+        self.mailbox = mailbox
+        self.pointer_filter = pointer_filter
+        if not isinstance(buttons, ButtonMachine):
+            buttons = ButtonMachine(buttons if buttons is not None else BUTTONS)
+        self.buttons = buttons
+        self.gestures = gestures
+        self.gesture_keys = gesture_keys
+        self.gain = gain
+        self.calibrator = calibrator
+        self.link = None
+        self.idle = None
+        self.cal = (0.0, 0.0)
+        self.pose = (0.0, 0.0)
+        self.laser_on = False
+        self.lx, self.ly = int(center[0]), int(center[1])
+
+    def update(self, samples, edges, center, half):
+        """Map and filter a batch, then run its button edges and gestures.
+
+        Returns (t, fx, fy, actions): the filtered positions with their
+        sample times, and [(action, args, x, y)] in order, x/y being the
+        pointer position when it happened. "toggle_laser" and "recalibrate"
+        are applied here as well as returned, since the bindings after them
+        depend on them; swipes come back as "key" actions, scroll and zoom
+        gestures as "scroll" and "zoom".
+        """
+        if self.calibrator is not None:
+            self.calibrator.feed_samples(samples, enabled=not self.laser_on)
+            self.cal = self.calibrator.cal
+        t, x, y = batch_arrays(samples)
+        self.pose = (min(max(float(x[-1]), -SCALE), SCALE) / SCALE, min(max(float(y[-1]), -SCALE), SCALE) / SCALE)
+        px, py = map_to_screen(x, y, center, half, cal=self.cal, gain=self.gain)
+        fx, fy = self.pointer_filter.filter_batch(t, px, py)
+
+        # Button transitions are replayed in order, each at the position it
+        # happened at, then the newest state so held buttons keep being timed.
+        actions = []
+        buttons = self.buttons
+        if edges:
+            index = {id(sample): i for i, sample in enumerate(samples)}
+            for sample in edges:
+                i = index.get(id(sample), len(samples) - 1)
+                self.lx, self.ly = int(fx[i]), int(fy[i])
+                self._run(buttons.feed(sample["t"], sample["buttons"]), actions)
+        latest = samples[-1]
+        self.lx, self.ly = int(fx[-1]), int(fy[-1])
+        self._run(buttons.feed(latest["t"], latest["buttons"]), actions)
+
+        if self.gestures is not None and not self.laser_on:
+            for gesture, amount in self.gestures.feed_samples(samples):
+                if gesture in self.gesture_keys:
+                    actions.append(("key", (self.gesture_keys[gesture],), self.lx, self.ly))
+                else:
+                    actions.append((gesture, (amount,), self.lx, self.ly))
+        return t, fx, fy, actions
+
+    def recalibrate(self):
+        """Make the current pose the centre of the screen."""
+        if self.calibrator is not None:
+            self.cal = self.calibrator.recalibrate()
+        else:
+            self.cal = self.pose
+        return self.cal
+
+    def advance(self, t):
+        """Actions of button timers due by t that no sample has passed."""
+        actions = []
+        self._run(self.buttons.advance(t), actions)
+        return actions
+
+    def _run(self, events, actions):
+        for _, kind, button in events:
+            for action, args in self.buttons.actions(kind, button, self.laser_on):
+                if action == "toggle_laser":
+                    self.laser_on = not self.laser_on
+                    if self.gestures is not None:
+                        self.gestures.reset()
+                elif action == "recalibrate":
+                    self.recalibrate()
+                actions.append((action, args, self.lx, self.ly))
@@ -0,0 +1,242 @@
+"""Bulk reads from the serial port, a supervisor that keeps it open, and
+the reader thread app.py and test1.py share."""
+import time
+import random
+import threading
+
+from airmouse.protocol import FrameDecoder
+from airmouse.stats import LatencyLog
+
+
+class ChunkReader:
+    """Reads everything the driver has buffered in one call.
+
+    readline() costs a timeout loop and a fresh bytes object per line; this
+    pulls ser.in_waiting bytes at once into a preallocated bytearray and
+    returns a memoryview over it. The view is only valid until the next
+    read(), so callers must consume it (FrameDecoder.feed copies) first.
+
+    With a clock (e.g. time.perf_counter), `ready` is set to the moment the
+    first byte of each chunk was available, so the read itself can be timed
+    apart from the wait for data.
+    """
+
+    def __init__(self, ser, size=16384, clock=None):
+        self.ser = ser
+        self.clock = clock
+        self.ready = 0.0
+        self.size = size
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+        self.reads = 0
+        self.bytes = 0
+
+    def read(self):
+        ser = self.ser
+        view = self.view
+        n = 0
+        if not ser.in_waiting:
+            # Nothing buffered: block (up to the port timeout) for the first byte.
+            first = ser.read(1)
+            if not first:
+                return None
+            view[0] = first[0]
+            n = 1
+        if self.clock is not None:
+            self.ready = self.clock()
+        waiting = min(ser.in_waiting, self.size - n)
+        if waiting:
+            n += ser.readinto(view[n:n + waiting])
+        self.reads += 1
+        self.bytes += n
+        return view[:n]
+
+
+# USB-serial bridges found on ESP32 boards used as the receiver dongle:
+# CP210x, CH340, CH9102, ESP32-S2/S3 native USB CDC, FTDI.
+DONGLE_IDS = ((0x10C4, 0xEA60), (0x1A86, 0x7523), (0x1A86, 0x55D4),
+              (0x303A, 0x1001), (0x303A, 0x0002), (0x0403, 0x6001))
+
+
+def parse_usb_id(text):
+    """"10c4:ea60" -> (0x10C4, 0xEA60)."""
+    vid, sep, pid = text.partition(":")
+    if not sep:
+        raise ValueError(f"USB id must be VID:PID in hex, got {text!r}")
+    return int(vid, 16), int(pid, 16)
+
+
+def find_port(usb_ids=DONGLE_IDS, serial_number=None):
+    """Device name of the first port matching the serial number (if given)
+    or one of the VID:PID pairs, or None."""
+    from serial.tools import list_ports
+
+    for info in list_ports.comports():
+        if serial_number is not None:
+            if info.serial_number == serial_number:
+                return info.device
+        elif info.vid is not None and (info.vid, info.pid) in usb_ids:
+            return info.device
+    return None
+
+
+class PortSupervisor:
+    """Opens the dongle's port and reopens it after a disconnect.
+
+    With port=None the port is found with serial.tools.list_ports by USB
+    serial number or VID:PID on every attempt, so the dongle may come back
+    under a different name. Attempts back off exponentially from `backoff`
+    to `max_backoff` seconds with full jitter; the short cap keeps the
+    reconnect time bounded by re-enumeration plus at most one poll.
+    Reconnect times (link lost -> port open) go to reconnect_log.
+    """
+
+    def __init__(self, port=None, baud=115200, stop_event=None, usb_ids=DONGLE_IDS,
+                 serial_number=None, timeout=0.5, backoff=0.02, max_backoff=0.25,
+                 log=None, metrics=None):
+        self.port = port
+        self.baud = baud
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
+        self.usb_ids = tuple(usb_ids)
+        self.serial_number = serial_number
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.log = log or (lambda kind, text: None)
+        self.metrics = metrics
+        self.ser = None
+        self.device = None
+        self._lost_at = None
+        self._delay = backoff
+        self._waiting = False
+        self.retry_at = 0.0
+        self.attempts = 0
+        self.reconnects = 0
+        self.reconnect_log = LatencyLog()
+
+    def describe(self):
+        if self.port is not None:
+            return self.port
+        if self.serial_number is not None:
+            return f"USB serial {self.serial_number}"
+        return "USB " + ", ".join(f"{v:04x}:{p:04x}" for v, p in self.usb_ids)
+
+    def connect(self):
+        """Block until the port is open and return it, or None once stopped."""
+        while not self.stop_event.is_set():
+            ser = self.try_open()
+            if ser is not None:
+                return ser
+            self.stop_event.wait(max(self.retry_at - time.monotonic(), 0.0))
+        return None
+
+    def try_open(self):
+        """One non-blocking attempt. Returns the open port, or None and sets
+        retry_at to when the next attempt is due."""
+        import serial
+
+        device = self.port or find_port(self.usb_ids, self.serial_number)
+        error = "no matching port"
+        if device is not None:
+            try:
+                self.ser = serial.Serial(device, self.baud, timeout=self.timeout)
+            except (serial.SerialException, OSError) as e:
+                error = e
+            else:
+                self.device = device
+                self._delay = self.backoff
+                self._waiting = False
+                self._opened()
+                return self.ser
+        self.attempts += 1
+        if not self._waiting:
+            self.log("ERROR", f"Serial open failed ({self.describe()}): {error}; retrying")
+            self._waiting = True
+        self.retry_at = time.monotonic() + random.uniform(0.5, 1.0) * self._delay
+        self._delay = min(self._delay * 2.0, self.max_backoff)
+        return None
+
+    def _opened(self):
+        if self._lost_at is None:
+            self.log("INFO", f"Opened {self.device} @ {self.baud}")
+            return
+        took = time.monotonic() - self._lost_at
+        self._lost_at = None
+        self.reconnects += 1
+        self.reconnect_log.add(took)
+        if self.metrics is not None:
+            self.metrics.observe("reconnect", took)
+            self.metrics.inc("reconnects")
+        self.log("INFO", f"Reconnected to {self.device} in {took * 1e3:.0f} ms")
+
+    def lost(self, error):
+        """The open port failed; close it so connect() starts over."""
+        if self._lost_at is None:
+            self._lost_at = time.monotonic()
+        self.log("ERROR", f"Serial link lost ({error}); reconnecting")
+        self.close()
+
+    def close(self):
+        if self.ser is not None:
+            try:
+                self.ser.close()
+            except Exception:
+                pass
+            self.ser = None
+
+
+def serial_reader(port, baud, q, stop_event, frame_mode="auto", recorder=None, metrics=None,
+                  usb_ids=DONGLE_IDS, usb_serial=None, csv_fallback=False):
+    """Read the dongle until stop_event, putting ("BATCH", samples) and
+    ("INFO"/"ERROR", text) on q, a SampleMailbox.
+
+    A lost dongle is reopened (or found again by USB id when port is None);
+    the consumer only sees a gap in samples. csv_fallback also accepts
+    test1.py's ``x,y,z,b1,b2,b3,b4`` lines.
+    """
+    import serial
+    supervisor = PortSupervisor(port, baud, stop_event, usb_ids, usb_serial,
+                                log=lambda kind, text: q.put((kind, text)), metrics=metrics)
+    decoder = FrameDecoder(frame_mode, csv_fallback=csv_fallback)
+    announced = decoder.mode != "auto"
+    ser = None
+    while not stop_event.is_set():
+        if ser is None:
+            ser = supervisor.connect()
+            if ser is None:
+                break
+            decoder.reset()
+            reader = ChunkReader(ser, clock=time.perf_counter if metrics is not None else None)
+        try:
+            chunk = reader.read()
+        except (serial.SerialException, OSError) as e:
+            supervisor.lost(e)
+            ser = None
+            continue
+        try:
+            if not chunk:
+                continue
+            if metrics is not None:
+                t_read = time.perf_counter()
+                metrics.observe("read", t_read - reader.ready)
+            samples = decoder.feed(chunk)
+            if metrics is not None:
+                metrics.observe("parse", time.perf_counter() - t_read)
+                metrics.inc("samples", len(samples))
+            if samples:
+                if recorder is not None:
+                    for sample in samples:
+                        recorder.append(sample)
+                q.put(("BATCH", samples))
+            if not announced and decoder.mode != "auto":
+                q.put(("INFO", f"Detected {decoder.mode} frames"))
+                announced = True
+        except Exception as e:
+            q.put(("ERROR", f"Serial decode error: {e}"))
+            break
+    if decoder.crc_errors or decoder.seq_gaps:
+        q.put(("INFO", f"Binary frames: {decoder.frames} ok, {decoder.crc_errors} CRC errors, "
+                       f"{decoder.seq_gaps} sequence gaps"))
+    if supervisor.reconnects:
+        q.put(("INFO", supervisor.reconnect_log.summary(f"{supervisor.reconnects} reconnects")))
+    supervisor.close()
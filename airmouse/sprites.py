@@ -0,0 +1,167 @@
+"""Pre-rendered laser dot sprites and damage tracking for the overlays."""
+import math
+
+from PyQt5 import QtCore, QtGui
+
+from .mapping import WINDOW_MODES
+
+STYLES = ("glow", "dot")
+
+
+def _tint(color, toward_white, alpha):
+    # Blend `color` a fraction of the way to white, with the given alpha.
+    r, g, b = (int(c + (255 - c) * toward_white) for c in (color.red(), color.green(), color.blue()))
+    return QtGui.QColor(r, g, b, alpha)
+
+
+def _paint_glow(painter, center, radius, color=None):
+    # app.py's look: soft glow of `radius` around a solid core.
+    base = color or QtGui.QColor(255, 0, 0)
+    gradient = QtGui.QRadialGradient(center, radius)
+    gradient.setColorAt(0.0, _tint(base, 0.4, 200))
+    gradient.setColorAt(0.7, _tint(base, 0.2, 150))
+    gradient.setColorAt(1.0, _tint(base, 0.0, 0))
+    painter.setBrush(QtGui.QBrush(gradient))
+    painter.setPen(QtCore.Qt.NoPen)
+    painter.drawEllipse(center, radius, radius)
+    core = radius * 8.0 / 25.0
+    painter.setBrush(_tint(base, 0.0, 255))
+    painter.drawEllipse(center, core, core)
+
+
+def _paint_dot(painter, center, radius, color=None):
+    # test1.py's look: one solid translucent disc.
+    painter.setBrush(QtGui.QBrush(color or QtGui.QColor(255, 0, 0, 230)))
+    painter.setPen(QtCore.Qt.NoPen)
+    painter.drawEllipse(center, radius, radius)
+
+
+_PAINTERS = {"glow": _paint_glow, "dot": _paint_dot}
+
+
+def render_sprite(style, radius, dpr=1.0, color=None):
+    """Draw one dot into a transparent pixmap at device pixel ratio dpr."""
+    side = 2 * int(math.ceil(radius)) + 2
+    pixmap = QtGui.QPixmap(int(math.ceil(side * dpr)), int(math.ceil(side * dpr)))
+    pixmap.setDevicePixelRatio(dpr)
+    pixmap.fill(QtCore.Qt.transparent)
+    painter = QtGui.QPainter(pixmap)
+    painter.setRenderHint(QtGui.QPainter.Antialiasing)
+    center = QtCore.QPointF(side / 2.0, side / 2.0)
+    _PAINTERS[style](painter, center, radius, color)
+    painter.end()
+    return pixmap
+
+
+class SpriteCache:
+    """Sprites keyed by (style, radius, device pixel ratio, colour).
+
+    Painting the dot becomes a single drawPixmap() of a cached image
+    instead of building gradients and antialiased ellipses every frame.
+    """
+
+    def __init__(self):
+        self._cache = {}
+
+    def get(self, style, radius, dpr=1.0, color=None):
+        key = (style, radius, round(dpr, 3), color.rgba() if color is not None else None)
+        pixmap = self._cache.get(key)
+        if pixmap is None:
+            pixmap = render_sprite(style, radius, dpr, color)
+            self._cache[key] = pixmap
+        return pixmap
+
+    def clear(self):
+        self._cache.clear()
+
+
+def sprite_rect(x, y, radius):
+    """Logical-pixel rect covered by a sprite of `radius` centred on (x, y)."""
+    side = 2 * int(math.ceil(radius)) + 2
+    return QtCore.QRect(int(x) - side // 2, int(y) - side // 2, side, side)
+
+
+class DotDamage:
+    """Remembers where the dot was last painted.
+
+    move() returns the region to repaint for the next frame: exactly the old
+    rect plus the new one, so the previous position is always erased and
+    nothing else on the full-screen overlay is touched.
+    """
+
+    def __init__(self):
+        self.rect = None
+
+    def move(self, rect):
+        """rect is the new dot rect, or None when the dot is hidden."""
+        region = QtGui.QRegion()
+        if rect == self.rect:
+            return region
+        if self.rect is not None:
+            region += self.rect
+        if rect is not None:
+            region += rect
+        self.rect = rect
+        return region
+
+
+class DotView:
+    """Puts the dot on screen for an overlay widget.
+
+    full    the widget covers the mapped desktop area and only the old and
+            new dot rects are repainted
+    sprite  the widget is a click-through window just big enough for the
+            sprite and is moved to the dot, so the compositor only blends a
+            few thousand pixels per frame instead of a full-screen surface
+
+    Positions are global desktop pixels. move() returns the region the
+    caller has to repaint (possibly empty); sprite_pos() is where the sprite
+    goes in widget coordinates.
+    """
+
+    def __init__(self, widget, mode, radius, desktop):
+        if mode not in WINDOW_MODES:
+            raise ValueError(f"Unknown window mode: {mode}")
+        self.widget = widget
+        self.mode = mode
+        self.radius = radius
+        self.desktop = desktop
+        self.damage = DotDamage()
+        self.visible = False
+        self.moves = 0
+        if mode == "sprite":
+            widget.setWindowFlag(QtCore.Qt.WindowTransparentForInput)
+            widget.setWindowFlag(QtCore.Qt.WindowDoesNotAcceptFocus)
+        self.apply_geometry()
+
+    def apply_geometry(self):
+        """Call when the desktop geometry changed."""
+        if self.mode == "full":
+            self.widget.setGeometry(self.desktop.rect)
+            self.damage = DotDamage()
+        else:
+            side = sprite_rect(0, 0, self.radius).width()
+            self.widget.setFixedSize(side, side)
+
+    def move(self, x, y, visible):
+        if self.mode == "full":
+            origin = self.desktop.rect.topLeft()
+            rect = sprite_rect(x - origin.x(), y - origin.y(), self.radius) if visible else None
+            return self.damage.move(rect)
+        region = QtGui.QRegion()
+        if visible:
+            pos = sprite_rect(x, y, self.radius).topLeft()
+            if pos != self.widget.pos():
+                self.widget.move(pos)
+                self.moves += 1
+        if visible != self.visible:
+            # Same pixmap wherever the window is; repaint only on toggle.
+            region += self.widget.rect()
+        self.visible = visible
+        return region
+
+    def sprite_pos(self, x, y):
+        if self.mode == "full":
+            origin = self.desktop.rect.topLeft()
+            return sprite_rect(x - origin.x(), y - origin.y(), self.radius).topLeft()
+        return QtCore.QPoint(0, 0)
@@ -0,0 +1,34 @@
+"""Small latency bookkeeping helpers."""
+from array import array
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return float("nan")
+    k = (len(sorted_values) - 1) * p / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class LatencyLog:
+    """Collects latencies (seconds) into a flat array for a summary at exit."""
+
+    def __init__(self, capacity=1_000_000):
+        self.values = array("d")
+        self.capacity = capacity
+
+    def add(self, seconds):
+        if len(self.values) < self.capacity:
+            self.values.append(seconds)
+
+    def __len__(self):
+        return len(self.values)
+
+    def summary(self, label="latency"):
+        v = sorted(self.values)
+        if not v:
+            return f"{label}: no samples"
+        ms = [percentile(v, p) * 1e3 for p in (50, 95, 99)]
+        return (f"{label}: n={len(v)} p50={ms[0]:.3f} ms p95={ms[1]:.3f} ms "
+                f"p99={ms[2]:.3f} ms max={v[-1] * 1e3:.3f} ms")
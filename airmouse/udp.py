@@ -0,0 +1,210 @@
+"""UDP ingest: the remote sends straight over Wi-Fi, no dongle in between.
+
+Each datagram is self-contained and holds either
+
+* text   - one or more ``RX -> X: .. | Buttons: a b c d`` lines (or the
+           ``x,y,z,b1,b2,b3,b4`` fallback), each optionally ending in
+           ``| Seq: n`` so reordering can be detected, or
+* binary - one or more protocol.FRAME_STRUCT frames back to back, which
+           carry their own 16-bit sequence number and CRC.
+
+UDP may duplicate, drop and reorder. Samples are accepted in sequence
+order only: a sequence number at or behind the newest one seen (within
+REORDER_WINDOW) is dropped as late, a jump ahead counts the packets in
+between as lost, and one far behind is taken as the sender restarting.
+Lines without a sequence number are taken in arrival order.
+
+The receiver thread waits on the socket with a selector and drains it with
+non-blocking recv_into() calls on one preallocated buffer; samples go to
+the sink (a SampleMailbox) as ("BATCH", samples) like serial_reader's.
+"""
+import re
+import time
+import socket
+import selectors
+
+from airmouse.protocol import FRAME_MODES, FRAME_SIZE, SYNC, make_sample, parse_text_line, unpack_frame
+
+DEFAULT_PORT = 5005
+_MAX_DATAGRAM = 65536
+# Hand a batch on after this many datagrams even if more are queued.
+_MAX_DRAIN = 256
+SEQ_PATTERN = re.compile(r"\|\s*Seq:\s*(\d+)", re.IGNORECASE)
+# Sequence numbers are compared modulo 2**16 (the binary frame's field).
+SEQ_MOD = 1 << 16
+REORDER_WINDOW = 1024
+
+
+def parse_udp_address(text):
+    """"HOST:PORT", ":PORT" or "PORT" -> (host, port); an empty host binds
+    every interface."""
+    host, _, port = text.rpartition(":")
+    host = host.strip("[]")
+    try:
+        port = int(port)
+    except ValueError:
+        raise ValueError(f"bad UDP address {text!r}, expected HOST:PORT") from None
+    if not 0 < port < 65536:
+        raise ValueError(f"bad UDP port {port}")
+    return host, port
+
+
+class SequenceFilter:
+    """Drops late and duplicate sequence numbers, counts the gaps."""
+
+    def __init__(self, window=REORDER_WINDOW):
+        self.window = window
+        self.last = None
+        self.late = 0
+        self.lost = 0
+        self.restarts = 0
+
+    def accept(self, seq):
+        seq %= SEQ_MOD
+        last = self.last
+        if last is not None:
+            ahead = (seq - last) % SEQ_MOD
+            if ahead == 0 or ahead > SEQ_MOD - self.window:
+                self.late += 1
+                return False
+            if ahead < SEQ_MOD // 2:
+                self.lost += ahead - 1
+            else:
+                self.restarts += 1
+        self.last = seq
+        return True
+
+    def reset(self):
+        self.last = None
+
+
+class UdpReceiver:
+    """Receives samples on a UDP socket; call run() on its own thread.
+
+    frame_mode is "text", "binary" or "auto" (decided per datagram by the
+    sync bytes). recorder, if given, gets every accepted sample.
+    """
+
+    def __init__(self, address, sink, stop_event, frame_mode="auto", recorder=None, metrics=None,
+                 rcvbuf=1 << 18):
+        if frame_mode not in FRAME_MODES:
+            raise ValueError(f"Unknown frame mode: {frame_mode}")
+        host, port = parse_udp_address(address) if isinstance(address, str) else address
+        family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        try:
+            # Room for a GUI stall's worth of datagrams in the kernel.
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        except OSError:
+            pass
+        self.sock.bind((host or ("::" if family == socket.AF_INET6 else "0.0.0.0"), port))
+        self.sock.setblocking(False)
+        self.address = self.sock.getsockname()[:2]
+        self.sink = sink
+        self.stop_event = stop_event
+        self.frame_mode = frame_mode
+        self.recorder = recorder
+        self.metrics = metrics
+        self._buf = bytearray(_MAX_DATAGRAM)
+        self.seq = SequenceFilter()
+        self.peer = None
+        self.packets = 0
+        self.bytes = 0
+        self.samples = 0
+        self.bad = 0
+
+    def run(self):
+        sel = selectors.DefaultSelector()
+        sel.register(self.sock, selectors.EVENT_READ)
+        self.sink.put(("INFO", f"Listening for UDP on {self.address[0]}:{self.address[1]}"))
+        try:
+            while not self.stop_event.is_set():
+                # The timeout only bounds how late a stop is noticed.
+                if sel.select(0.1):
+                    self.drain()
+        finally:
+            sel.close()
+            self.sock.close()
+
+    def drain(self):
+        """Read every datagram queued on the socket; returns how many."""
+        recv_into = self.sock.recvfrom_into
+        buf = self._buf
+        metrics = self.metrics
+        samples = []
+        n_packets = 0
+        while n_packets < _MAX_DRAIN:
+            try:
+                n, peer = recv_into(buf)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as e:
+                # e.g. ICMP port unreachable reported on Windows
+                self.sink.put(("ERROR", f"UDP receive error: {e}"))
+                break
+            now = time.monotonic()
+            n_packets += 1
+            self.bytes += n
+            if peer != self.peer:
+                if self.peer is not None:
+                    self.seq.reset()
+                self.peer = peer
+                self.sink.put(("INFO", f"UDP samples from {peer[0]}:{peer[1]}"))
+            t0 = time.perf_counter() if metrics is not None else 0.0
+            before, late = len(samples), self.seq.late
+            if self.frame_mode == "binary" or (self.frame_mode == "auto" and buf[0:2] == SYNC):
+                self._decode_binary(n, now, samples)
+            else:
+                self._decode_text(n, now, samples)
+            if len(samples) == before and self.seq.late == late:
+                self.bad += 1
+            if metrics is not None:
+                metrics.observe("parse", time.perf_counter() - t0)
+        self.packets += n_packets
+        if samples:
+            if self.recorder is not None:
+                for sample in samples:
+                    self.recorder.append(sample)
+            self.samples += len(samples)
+            if metrics is not None:
+                metrics.inc("samples", len(samples))
+            self.sink.put(("BATCH", samples))
+        return n_packets
+
+    def _decode_binary(self, n, now, out):
+        buf = self._buf
+        accept = self.seq.accept
+        first = len(out)
+        for off in range(0, n - FRAME_SIZE + 1, FRAME_SIZE):
+            frame = unpack_frame(buf, off)
+            if frame is None or not accept(frame[0]):
+                continue
+            seq, t_dev, x_val, y_val, z_val, buttons = frame
+            out.append(make_sample(x_val, y_val, z_val, buttons, now, seq, t_dev))
+        if len(out) - first > 1:
+            # Back-date earlier frames of the datagram by their device clock delta.
+            last = out[-1]["t_dev"]
+            for sample in out[first:-1]:
+                sample["t"] = now - ((last - sample["t_dev"]) & 0xFFFFFFFF) * 1e-6
+
+    def _decode_text(self, n, now, out):
+        text = self._buf[:n].decode("utf-8", errors="ignore")
+        for line in text.split("\n"):
+            line = line.strip()
+            if not line:
+                continue
+            sample = parse_text_line(line, csv_fallback=True, t=now)
+            if sample is None:
+                continue
+            m = SEQ_PATTERN.search(line)
+            if m is not None:
+                if not self.seq.accept(int(m.group(1))):
+                    continue
+                sample["seq"] = int(m.group(1)) % SEQ_MOD
+            out.append(sample)
+
+    def summary(self):
+        seq = self.seq
+        return (f"UDP {self.address[0]}:{self.address[1]}: {self.samples} samples in "
+                f"{self.packets} datagrams, {seq.late} late/duplicate dropped, {seq.lost} lost, "
+                f"{seq.restarts} sender restarts, {self.bad} undecodable")
@@ -0,0 +1,527 @@
+"""Ingest and the pointer pipeline in a separate process (app.py --worker).
+
+In one process the serial thread, the Qt event loop, injection and
+painting share one GIL: a long paint or a slow injection call holds up
+serial_reader, and a burst of parsing holds up the next frame. With
+--worker a child process owns the sources (serial_reader,
+MultiSourceIngest or UdpReceiver filling SampleMailboxes, as before) and
+runs Remote.update() - mapping, calibration, filtering, buttons and
+gestures - on its own main thread. The GUI process only draws and injects:
+
+    frames   every filtered position goes into a PointerBroadcast ring
+             (airmouse/broadcast.py), the --broadcast block if one is asked
+             for, else a private one; the overlay reads it with a
+             PointerReader
+    events   button and gesture actions go into an EventRing, a lossless
+             single-producer single-consumer ring in shared memory whose
+             slots carry their own seq and checksum
+    wakeup   after each batch the worker writes a byte to a socket pair;
+             the overlay watches its end with a QSocketNotifier and drains
+             it before reading the rings, so a busy GUI gets one wakeup for
+             many batches (a polling overlay goes without)
+
+Nothing per sample is pickled. A multiprocessing Pipe carries the few
+control messages: the worker's start-up result, the desktop geometry it
+maps onto (again whenever the screens change), the stop request and the
+worker's summary on the way out. The worker ignores SIGINT and stops when
+the GUI process asks or goes away, or on SIGTERM.
+
+Windows has no fork, so the worker is started with the spawn method
+everywhere: it imports the pipeline afresh and never inherits Qt state.
+"""
+import os
+import copy
+import json
+import time
+import signal
+import socket
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+from .broadcast import PointerBroadcast, PointerReader
+from .calibration import AutoCalibrator
+from .filters import PassThrough
+from .gestures import GestureEngine
+from .idle import IdleTracker
+from .ingest import start_ingest
+from .jitter import LinkMonitor
+from .mailbox import SampleMailbox
+from .metrics import PipelineMetrics
+from .recorder import SessionRecorder
+from .remote import BUTTON_GRACE, Remote
+from .serial_io import DONGLE_IDS
+from .udp import UdpReceiver
+
+EVENT_MAGIC = b"AMEVT\x00"
+EVENT_VERSION = 2
+# magic, version, slot size, slots; then head and tail (uint64) at their
+# offsets.
+EVENT_HEADER = struct.Struct("<6sHHxxI")
+EVENT_HEAD_OFFSET = 48
+EVENT_TAIL_OFFSET = 56
+EVENT_HEADER_SIZE = 64
+# Per slot: seq (event number + 1), CRC-32 and length of the JSON after it.
+_SLOT = struct.Struct("<QIH")
+_SEQ = struct.Struct("<Q")
+_CHECK = struct.Struct("<IH")
+
+
+class EventRing:
+    """Lossless single-producer single-consumer ring of small JSON records.
+
+    Slot n % slots holds event n as UTF-8 JSON behind a _SLOT header. The
+    producer writes the JSON, then its CRC-32 and length, then seq = n + 1,
+    and only then advances `head`; the consumer only writes `tail` (after
+    copying), so neither needs a lock. The consumer does not trust the
+    order the stores become visible in: a slot whose seq or checksum does
+    not match yet is retried a few times and otherwise left, with the ones
+    after it, for the next read(), never returned half-written. An event
+    that does not fit, or finds the ring full, is counted in .dropped
+    rather than overwriting one not yet read. Button actions come at human
+    speed, so the default 256 slots only fill if the consumer is gone.
+    """
+
+    def __init__(self, name=None, slots=256, slot_size=256):
+        from multiprocessing import shared_memory
+        if name is None:
+            if slots < 1 or not _SLOT.size < slot_size <= 0xFFFF:
+                raise ValueError(f"need at least 1 slot of {_SLOT.size + 1} to 65535 bytes")
+            size = EVENT_HEADER_SIZE + slots * slot_size
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+            self._buf = self._shm.buf
+            self._buf[:size] = bytes(size)
+            EVENT_HEADER.pack_into(self._buf, 0, EVENT_MAGIC, EVENT_VERSION, slot_size, slots)
+            self.owner = True
+        else:
+            self._shm = shared_memory.SharedMemory(name)
+            self._buf = self._shm.buf
+            magic, version, slot_size, slots = EVENT_HEADER.unpack_from(self._buf)
+            if magic != EVENT_MAGIC or version != EVENT_VERSION:
+                self._buf = None
+                self._shm.close()
+                raise ValueError(f"shared memory {name!r} is not an airmouse event ring")
+            self.owner = False
+        self.name = self._shm.name
+        self.slots = slots
+        self.slot_size = slot_size
+        self._head = np.ndarray((1,), "<u8", buffer=self._buf, offset=EVENT_HEAD_OFFSET)
+        self._tail = np.ndarray((1,), "<u8", buffer=self._buf, offset=EVENT_TAIL_OFFSET)
+        self.written = 0
+        self.dropped = 0
+
+    def put(self, event):
+        """Append one JSON-serialisable event; False if it was dropped."""
+        data = json.dumps(event, separators=(",", ":")).encode()
+        head = int(self._head[0])
+        if len(data) > self.slot_size - _SLOT.size or head - int(self._tail[0]) >= self.slots:
+            self.dropped += 1
+            return False
+        offset = EVENT_HEADER_SIZE + head % self.slots * self.slot_size
+        start = offset + _SLOT.size
+        self._buf[start:start + len(data)] = data
+        # seq last: until it reads head + 1 the slot still holds an old event.
+        _CHECK.pack_into(self._buf, offset + _SEQ.size, zlib.crc32(data), len(data))
+        _SEQ.pack_into(self._buf, offset, head + 1)
+        self._head[0] = head + 1
+        self.written += 1
+        return True
+
+    def read(self, retries=1000):
+        """Every event put since the last call, oldest first."""
+        head = int(self._head[0])
+        n = int(self._tail[0])
+        out = []
+        while n < head:
+            for _ in range(retries):
+                data = self._slot(n)
+                if data is not None:
+                    break
+            else:
+                break
+            out.append(json.loads(data))
+            n += 1
+        self._tail[0] = n
+        return out
+
+    def _slot(self, n):
+        """Event n's JSON if its slot is complete, else None."""
+        offset = EVENT_HEADER_SIZE + n % self.slots * self.slot_size
+        seq, crc, length = _SLOT.unpack_from(self._buf, offset)
+        if seq != n + 1 or length > self.slot_size - _SLOT.size:
+            return None
+        start = offset + _SLOT.size
+        data = bytes(self._buf[start:start + length])
+        if zlib.crc32(data) != crc or _SLOT.unpack_from(self._buf, offset)[0] != seq:
+            return None
+        return data
+
+    def close(self):
+        if self._shm is None:
+            return
+        del self._head, self._tail
+        self._buf = None
+        self._shm.close()
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._shm = None
+
+
+class PipelineWorker:
+    """The GUI process's handle on the worker: starts it, reads its rings.
+
+    reader is the serial_reader used for a single port; ports, udp, baud,
+    frame_mode, usb_ids and usb_serial pick the sources like app.py's
+    options. pointer_filter, buttons, gesture_opts, cal_opts, idle_opts and
+    link_stats are HeadlessRunner's; metrics=True keeps PipelineMetrics in
+    the worker, record is a session file to record to, and broadcast the
+    name to publish the frames under (default: a private block). With
+    wake=False there is no wakeup socket, for an overlay that polls.
+
+    start(), then wait_ready() once the GUI is up; take() returns the
+    frames and events published since the last call.
+    """
+
+    def __init__(self, reader=None, ports=None, udp=None, baud=115200, frame_mode="auto",
+                 usb_ids=DONGLE_IDS, usb_serial=None, pointer_filter=None, buttons=None,
+                 gesture_opts=None, cal_opts=None, idle_opts=None, link_stats=False, metrics=False,
+                 record=None, broadcast=None, wake=True):
+        ports = list(ports) if ports else [None]
+        if reader is None and udp is None and len(ports) == 1:
+            raise ValueError("a single serial port needs its reader")
+        self.remotes = len(ports)
+        self._config = {
+            "reader": reader, "ports": ports, "udp": udp, "baud": baud, "frame_mode": frame_mode,
+            "usb_ids": usb_ids, "usb_serial": usb_serial,
+            "pointer_filter": pointer_filter if pointer_filter is not None else PassThrough(),
+            "buttons": buttons, "gesture_opts": gesture_opts, "cal_opts": cal_opts,
+            "idle_opts": idle_opts, "link_stats": link_stats, "metrics": metrics, "record": record,
+            "frames": broadcast or f"airmouse-worker-{os.getpid()}", "public": bool(broadcast),
+        }
+        self._wake = wake
+        self._process = None
+        self._ctl = None
+        self._sock = None
+        self.wake_fd = None
+        self.reader = None
+        self.events = None
+        self.pid = None
+        self.report = ""
+        self.frames = 0
+        self.actions = 0
+        self.reads = 0
+        self.wakeups = 0
+
+    def start(self):
+        """Spawn the worker; it opens the sources and waits for geometry."""
+        import multiprocessing
+        ctx = multiprocessing.get_context("spawn")
+        self._ctl, child_ctl = ctx.Pipe()
+        self.events = EventRing()
+        wake = None
+        if self._wake:
+            self._sock, wake = socket.socketpair()
+            self._sock.setblocking(False)
+            self.wake_fd = self._sock.fileno()
+        self._process = ctx.Process(target=_worker_main, name="airmouse-worker", daemon=True,
+                                    args=(self._config, child_ctl, wake, self.events.name))
+        self._process.start()
+        child_ctl.close()
+        if wake is not None:
+            wake.close()
+
+    def wait_ready(self, timeout=10.0):
+        """Wait until the worker has its sources open; OSError if it could
+        not open them (the message says why) or did not start."""
+        if not self._ctl.poll(timeout):
+            self.close()
+            raise OSError("the worker process did not start")
+        try:
+            kind, value = self._ctl.recv()
+        except EOFError:
+            kind, value = "error", "the worker process exited"
+        if kind != "ready":
+            self.close()
+            raise OSError(value)
+        self.pid = value
+        self.reader = PointerReader(self._config["frames"])
+
+    def set_geometry(self, center, half, rect):
+        """The area to map onto: its centre and half size, and (left, top,
+        width, height) for the broadcast header, in global pixels."""
+        try:
+            self._ctl.send(("geometry", tuple(center), tuple(half), tuple(rect)))
+        except OSError:
+            pass
+
+    def drain(self):
+        """Empty the wakeup socket; False once the worker has gone."""
+        self.wakeups += 1
+        try:
+            while True:
+                if not self._sock.recv(4096):
+                    return False
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+
+    def take(self):
+        """(frame records since the last call, as PointerReader.read()
+        returns them, [[remote, action, args, x, y, laser, cal]])."""
+        records = self.reader.read()
+        events = self.events.read()
+        if len(records) or events:
+            self.reads += 1
+            self.frames += len(records)
+            self.actions += len(events)
+        return records, events
+
+    def close(self, timeout=2.0):
+        """Stop the worker and keep its summary in .report."""
+        if self._process is None:
+            return
+        try:
+            self._ctl.send(("stop",))
+            deadline = time.monotonic() + timeout
+            while self._ctl.poll(max(deadline - time.monotonic(), 0.0)):
+                kind, value = self._ctl.recv()
+                if kind == "summary":
+                    self.report = value
+                    break
+        except (OSError, EOFError):
+            pass
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout)
+        self._process = None
+        self._ctl.close()
+        if self.reader is not None:
+            self.reader.close()
+        self.events.close()
+        if self._sock is not None:
+            self._sock.close()
+
+    def summary(self):
+        missed = self.reader.missed if self.reader is not None else 0
+        wakeups = f", {self.wakeups} wakeups" if self._wake else ""
+        return (f"Worker (pid {self.pid}): {self.frames} frames and {self.actions} actions "
+                f"taken in {self.reads} reads{wakeups}, {missed} frames missed")
+
+
+class _WorkerPipeline:
+    """The worker process's half: sources, Remote.update() and the rings."""
+
+    def __init__(self, config, wake, events_name):
+        self.stop_event = threading.Event()
+        self.metrics = PipelineMetrics() if config["metrics"] else None
+        ports = config["ports"]
+        self.mailboxes = [SampleMailbox() for _ in ports]
+        self.remotes = []
+        for i, mb in enumerate(self.mailboxes):
+            pointer_filter = config["pointer_filter"]
+            remote = Remote(i, mb, pointer_filter if i == 0 else copy.deepcopy(pointer_filter),
+                            config["buttons"],
+                            GestureEngine(**config["gesture_opts"])
+                            if config["gesture_opts"] is not None else None,
+                            calibrator=AutoCalibrator(**config["cal_opts"])
+                            if config["cal_opts"] is not None else None)
+            if config["link_stats"]:
+                remote.link = LinkMonitor()
+            if config["idle_opts"] is not None:
+                remote.idle = IdleTracker(mb, **config["idle_opts"])
+            self.remotes.append(remote)
+        self.geometry = None
+        self._woken = threading.Event()
+        for mb in self.mailboxes:
+            mb.set_waker(self._woken.set)
+
+        # Everything that can fail comes before the threads. If one of them
+        # does, whatever was opened before it is closed again: the rings
+        # are named shared memory and outlive a worker that only exits.
+        self.recorder = self.udp = self.events = self.frames = None
+        try:
+            if config["record"]:
+                self.recorder = SessionRecorder(config["record"])
+            if config["udp"]:
+                try:
+                    self.udp = UdpReceiver(config["udp"], self.mailboxes[0], self.stop_event,
+                                           frame_mode=config["frame_mode"], recorder=self.recorder,
+                                           metrics=self.metrics)
+                except OSError as e:
+                    raise OSError(f"UDP {config['udp']}: {e}") from None
+            self.events = EventRing(events_name)
+            self.frames = PointerBroadcast(config["frames"])
+        except BaseException:
+            self._release()
+            raise
+        self.public = config["public"]
+        self.wake = wake
+        self.ingest = None
+        if self.udp is not None:
+            self.thread = threading.Thread(target=self.udp.run, name="udp-ingest", daemon=True)
+            self.thread.start()
+        elif len(ports) == 1:
+            self.thread = threading.Thread(
+                target=config["reader"],
+                args=(ports[0], config["baud"], self.mailboxes[0], self.stop_event,
+                      config["frame_mode"], self.recorder, self.metrics),
+                kwargs={"usb_ids": config["usb_ids"], "usb_serial": config["usb_serial"]},
+                daemon=True)
+            self.thread.start()
+        else:
+            self.ingest, self.thread = start_ingest(ports, config["baud"], self.mailboxes,
+                                                    self.stop_event, frame_mode=config["frame_mode"],
+                                                    metrics=self.metrics)
+
+    def follow(self, ctl):
+        """Control messages from the GUI process; run on its own thread."""
+        while True:
+            try:
+                message = ctl.recv()
+            except (EOFError, OSError):
+                break
+            if message[0] == "geometry":
+                _, center, half, rect = message
+                self.geometry = (center, half)
+                self.frames.set_geometry(*rect)
+                self._woken.set()
+            elif message[0] == "stop":
+                break
+        self.stop()
+
+    def stop(self):
+        self.stop_event.set()
+        self._woken.set()
+
+    def run(self):
+        """Process samples until stopped, like HeadlessRunner.run()."""
+        while not self.stop_event.is_set():
+            deadline = min(r.buttons.next_deadline for r in self.remotes) + BUTTON_GRACE
+            timeout = min(max(deadline - time.monotonic(), 0.0), 0.25)
+            self._woken.wait(timeout)
+            self._woken.clear()
+            if self.geometry is not None:
+                self.process_data()
+
+    def process_data(self):
+        t0 = time.perf_counter() if self.metrics is not None else 0.0
+        center, half = self.geometry
+        published = False
+        for remote in self.remotes:
+            published |= self._process_remote(remote, center, half)
+            now = time.monotonic()
+            if remote.buttons.next_deadline + BUTTON_GRACE <= now:
+                published |= self._send(remote, remote.advance(now - BUTTON_GRACE))
+        if published and self.wake is not None:
+            try:
+                self.wake.send(b"\0")
+            except BlockingIOError:
+                # The GUI has plenty of wakeups queued already.
+                pass
+            except OSError:
+                self.stop_event.set()
+        if self.metrics is not None:
+            self.metrics.observe("process", time.perf_counter() - t0)
+
+    def _process_remote(self, remote, center, half):
+        samples, edges = remote.mailbox.take_batch()
+        for kind, text in remote.mailbox.take_messages():
+            print(f"[{kind}]", text, flush=True)
+        if not samples:
+            self._update_idle(remote, samples)
+            return False
+        if self.metrics is not None:
+            self.metrics.observe("queue", time.monotonic() - samples[-1]["t"])
+        if remote.link is not None:
+            remote.link.observe(time.monotonic(), samples)
+        _, fx, fy, actions = remote.update(samples, edges, center, half)
+        self.frames.publish(samples, fx, fy, remote.laser_on, remote.source)
+        self._send(remote, actions)
+        self._update_idle(remote, samples)
+        return True
+
+    def _send(self, remote, actions):
+        cal = [float(remote.cal[0]), float(remote.cal[1])]
+        for action, args, x, y in actions:
+            self.events.put([remote.source, action, list(args), x, y, remote.laser_on, cal])
+        return bool(actions)
+
+    def _update_idle(self, remote, samples):
+        if remote.idle is None:
+            return
+        if remote.idle.update(samples, remote.laser_on or remote.gestures is not None,
+                              busy=remote.buttons.next_deadline != float("inf"),
+                              heartbeat=remote.calibrator is not None) and remote.link is not None:
+            remote.link.pause()
+
+    def _release(self):
+        """Close what __init__ opened before one of its steps failed."""
+        for part in (self.frames, self.events, self.recorder):
+            if part is not None:
+                part.close()
+        if self.udp is not None:
+            self.udp.sock.close()
+
+    def close(self):
+        """Stop the sources and close the rings; returns the summary."""
+        self.stop_event.set()
+        self.thread.join(timeout=1.0)
+        tag = len(self.remotes) > 1
+        lines = [f"Mailbox{f' {i}' if tag else ''}: {mb.summary()}" for i, mb in enumerate(self.mailboxes)]
+        if self.ingest is not None:
+            lines.append("Ingest: " + self.ingest.summary())
+        if self.udp is not None:
+            lines.append(self.udp.summary())
+        if self.recorder is not None:
+            self.recorder.close()
+            lines.append(self.recorder.summary())
+        lines.append(f"Worker frames: {self.frames.published} in {self.frames.batches} batches, "
+                     f"{self.events.written} actions ({self.events.dropped} dropped)")
+        if self.public:
+            lines.append(self.frames.summary())
+        self.frames.close()
+        self.events.close()
+        if self.wake is not None:
+            self.wake.close()
+        for attr, name in (("link", "Link"), ("idle", "Idle"), ("gestures", "Gestures"),
+                           ("calibrator", "Calibration")):
+            for r in self.remotes:
+                part = getattr(r, attr)
+                if part is not None:
+                    lines.append(f"{name}{f' (remote {r.source})' if tag else ''}: {part.summary()}")
+        if self.metrics is not None:
+            lines.append("Pipeline stats (worker):\n" + self.metrics.report())
+        return "\n".join(lines)
+
+
+def _worker_main(config, ctl, wake, events_name):
+    # Ctrl+C reaches the whole process group; the GUI process decides.
+    # A SIGTERM (to the worker or its group) still cleans up.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if wake is not None:
+        wake.setblocking(False)
+    try:
+        pipeline = _WorkerPipeline(config, wake, events_name)
+    except (OSError, ValueError) as e:
+        if wake is not None:
+            wake.close()
+        ctl.send(("error", str(e)))
+        return
+    signal.signal(signal.SIGTERM, lambda signum, frame: pipeline.stop())
+    ctl.send(("ready", os.getpid()))
+    threading.Thread(target=pipeline.follow, args=(ctl,), name="worker-control", daemon=True).start()
+    try:
+        pipeline.run()
+    finally:
+        report = pipeline.close()
+        try:
+            ctl.send(("summary", report))
+        except OSError:
+            print(report, flush=True)
@@ -1,246 +1,371 @@
 import sys
+import signal
 import threading
-import queue
 import argparse
-import time
-import re
-import ctypes
-from PyQt5 import QtWidgets, QtGui, QtCore
-import serial
-import pyautogui
-
-pyautogui.FAILSAFE = False
-
-IS_WINDOWS = sys.platform.startswith("win")
-
-if IS_WINDOWS:
-    user32 = ctypes.windll.user32
-    ULONG_PTR = ctypes.c_size_t
-
-    class MOUSEINPUT(ctypes.Structure):
-        _fields_ = [
-            ("dx", ctypes.c_long),
-            ("dy", ctypes.c_long),
-            ("mouseData", ctypes.c_ulong),
-            ("dwFlags", ctypes.c_ulong),
-            ("time", ctypes.c_ulong),
-            ("dwExtraInfo", ULONG_PTR)
-        ]
-
-    class INPUT_union(ctypes.Union):
-        _fields_ = [("mi", MOUSEINPUT)]
-
-    class INPUT(ctypes.Structure):
-        _fields_ = [
-            ("type", ctypes.c_ulong),
-            ("union", INPUT_union)
-        ]
-
-    INPUT_MOUSE = 0
-    MOUSEEVENTF_MOVE = 0x0001
-    MOUSEEVENTF_LEFTDOWN = 0x0002
-    MOUSEEVENTF_LEFTUP = 0x0004
-    MOUSEEVENTF_ABSOLUTE = 0x8000
-    MOUSEEVENTF_VIRTUALDESK = 0x4000
-
-RX_PATTERN = re.compile(
-    r"RX\s*->\s*X:\s*([-\d\.]+)\s*Y:\s*([-\d\.]+)\s*Z:\s*([-\d\.]+)\s*\|\s*Buttons:\s*([01])\s+([01])\s+([01])\s+([01])",
-    re.IGNORECASE
-)
-
-def serial_reader(port, baud, q, stop_event):
-    try:
-        ser = serial.Serial(port, baud, timeout=0.5)
-    except Exception as e:
-        q.put(("ERROR", f"Serial error: {e}"))
-        return
-    while not stop_event.is_set():
-        try:
-            line = ser.readline().decode('utf-8', errors='ignore').strip()
-            if not line:
-                continue
-            m = RX_PATTERN.search(line)
-            if m:
-                try:
-                    x_val = float(m.group(1))
-                    y_val = float(m.group(2))
-                    z_val = float(m.group(3))
-                    buttons = tuple(int(m.group(i)) for i in range(4, 8))
-                    q.put(("DATA", {
-                        "x": z_val,  # Using Z for X-axis movement
-                        "y": y_val,  # Using Y for Y-axis movement
-                        "buttons": buttons
-                    }))
-                except:
-                    pass
-        except:
-            break
-    ser.close()
-
-class OverlayWindow(QtWidgets.QWidget):
-    def __init__(self, data_queue):
-        super().__init__(flags=QtCore.Qt.FramelessWindowHint | 
-                              QtCore.Qt.WindowStaysOnTopHint | 
-                              QtCore.Qt.Tool)
-        self.setAttribute(QtCore.Qt.WA_TranslucentBackground)
-        self.setAttribute(QtCore.Qt.WA_TransparentForMouseEvents)
-        
-        screen = QtWidgets.QApplication.primaryScreen().size()
-        self.sw, self.sh = screen.width(), screen.height()
-        self.setGeometry(0, 0, self.sw, self.sh)
-        
-        self.data_queue = data_queue
-        self.laser_on = False
-        self.lx, self.ly = self.sw // 2, self.sh // 2
-        self.prev_buttons = (0, 0, 0, 0)
-        self.button_press_time = 0
-        
-        # Cursor state tracking
-        self.cursor_visible = True
-        if IS_WINDOWS:
-            self._show_cursor(True)
-        
-        self.timer = QtCore.QTimer()
-        self.timer.timeout.connect(self.process_data)
-        self.timer.start(16)  # ~60 FPS
-
-    def _show_cursor(self, show):
-        if not IS_WINDOWS:
-            return
-        while True:
-            count = user32.ShowCursor(show)
-            if (show and count >= 0) or (not show and count < 0):
-                break
 
-    def _send_mouse_event(self, x, y, down=False):
-        if not IS_WINDOWS:
-            return
-            
-        screen_width = user32.GetSystemMetrics(0)
-        screen_height = user32.GetSystemMetrics(1)
-        
-        # Convert to absolute coordinates (0-65535 range)
-        dx = int(x * 65535 / screen_width)
-        dy = int(y * 65535 / screen_height)
-        
-        flags = MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_VIRTUALDESK
-        if down:
-            flags |= MOUSEEVENTF_LEFTDOWN
-        else:
-            flags |= MOUSEEVENTF_LEFTUP
-        
-        inp = INPUT()
-        inp.type = INPUT_MOUSE
-        inp.union.mi.dx = dx
-        inp.union.mi.dy = dy
-        inp.union.mi.dwFlags = flags
-        user32.SendInput(1, ctypes.byref(inp), ctypes.sizeof(inp))
-
-    def process_data(self):
-        while not self.data_queue.empty():
-            msg, data = self.data_queue.get()
-            if msg != "DATA":
-                continue
-                
-            # Process movement
-            nx = max(-1.0, min(1.0, data["x"] / 8.0))
-            ny = max(-1.0, min(1.0, data["y"] / 8.0))
-            
-            self.lx = int(self.sw / 2 + nx * (self.sw / 2))
-            self.ly = int(self.sh / 2 + ny * (self.sh / 2))
-            
-            # Process buttons
-            b0, b1, b2, b3 = data["buttons"]
-            
-            # Toggle laser state (button 2)
-            if b2 and not self.prev_buttons[2]:
-                self.laser_on = not self.laser_on
-                self._show_cursor(not self.laser_on)  # Hide cursor when laser on
-                print(f"Laser {'ON' if self.laser_on else 'OFF'}")
-            
-            # Slide up (button 0) - only when laser is OFF
-            if not self.laser_on and b0 and not self.prev_buttons[0]:
-                print("Slide up detected")
-                try:
-                    pyautogui.press('up')
-                except Exception as e:
-                    print(f"Slide up error: {e}")
-            
-            # Slide down (button 3) - only when laser is OFF
-            if not self.laser_on and b3 and not self.prev_buttons[3]:
-                print("Slide down detected")
-                try:
-                    pyautogui.press('down')
-                except Exception as e:
-                    print(f"Slide down error: {e}")
-            
-            # Left click when laser is on (button 1)
-            if self.laser_on:
-                if b1 and not self.prev_buttons[1]:
-                    self.button_press_time = time.time()
-                elif not b1 and self.prev_buttons[1]:
-                    press_duration = time.time() - self.button_press_time
-                    if press_duration < 0.3:  # Quick press = click
-                        self._send_mouse_event(self.lx, self.ly, down=True)
-                        time.sleep(0.01)
-                        self._send_mouse_event(self.lx, self.ly, down=False)
-            
-            self.prev_buttons = data["buttons"]
-            self.update()
-
-    def paintEvent(self, event):
-        if not self.laser_on:
-            return
-        painter = QtGui.QPainter(self)
-        painter.setRenderHint(QtGui.QPainter.Antialiasing)
-        
-        # Big laser dot with glow effect
-        center = QtCore.QPoint(self.lx, self.ly)
-        
-        # Outer glow
-        gradient = QtGui.QRadialGradient(center, 25)
-        gradient.setColorAt(0.0, QtGui.QColor(255, 100, 100, 200))
-        gradient.setColorAt(0.7, QtGui.QColor(255, 50, 50, 150))
-        gradient.setColorAt(1.0, QtGui.QColor(255, 0, 0, 0))
-        
-        painter.setBrush(QtGui.QBrush(gradient))
-        painter.setPen(QtCore.Qt.NoPen)
-        painter.drawEllipse(center, 25, 25)
-        
-        # Inner dot
-        painter.setBrush(QtGui.QColor(255, 0, 0, 255))
-        painter.drawEllipse(center, 8, 8)
-
-    def closeEvent(self, event):
-        if IS_WINDOWS and not self.cursor_visible:
-            self._show_cursor(True)
-        super().closeEvent(event)
+from airmouse.protocol import FRAME_MODES
+from airmouse.serial_io import DONGLE_IDS, parse_usb_id, serial_reader
+from airmouse.mailbox import SampleMailbox
+from airmouse.stats import LatencyLog
+from airmouse.recorder import SessionRecorder
+from airmouse.filters import FILTERS, make_filter, parse_filter_opts
+from airmouse.mapping import AREAS, WINDOW_MODES
+from airmouse.metrics import PipelineMetrics, serve_metrics
+from airmouse.ingest import start_ingest
+from airmouse.udp import UdpReceiver, parse_udp_address
+from airmouse.gestures import GestureEngine
+from airmouse.calibration import AutoCalibrator
+from airmouse.jitter import PlayoutBuffer
+from airmouse.idle import IdleTracker
+from airmouse.buttons import load_config
+from airmouse.broadcast import DEFAULT_NAME, PointerBroadcast
+from airmouse.worker import PipelineWorker
+from airmouse.injection import BACKENDS, Injector, show_cursor
+from airmouse.remote import BUTTONS, with_recalibrate_chord
+from airmouse.headless import HeadlessRunner, parse_screen_size
+
+# PyQt5 and pyautogui are only imported once they are needed (the overlay
+# in main(), injection on the dispatcher thread): --headless never loads Qt.
+
+BUTTON_ACTIONS = ("toggle_laser", "recalibrate") + Injector.ACTIONS
+
+
+def __getattr__(name):
+    # The overlay used to live here; keep `from app import OverlayWindow`
+    # working without importing Qt for everyone else.
+    if name in ("OverlayWindow", "REMOTE_COLORS", "GLOW_RADIUS"):
+        from airmouse import overlay
+        return getattr(overlay, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--port", required=True)
+    parser.add_argument("--port", action="append",
+                        help="Serial port; default: find the dongle by USB id. Repeat for several "
+                             "receivers, each driving its own dot")
+    parser.add_argument("--udp", metavar="HOST:PORT",
+                        help="Receive samples over UDP from a remote on Wi-Fi instead of a serial "
+                             "dongle, e.g. 0.0.0.0:5005 (see airmouse/udp.py)")
+    parser.add_argument("--usb-id", action="append", type=parse_usb_id, metavar="VID:PID",
+                        help="USB id of the dongle, in hex (repeatable; default: common ESP32 bridges)")
+    parser.add_argument("--usb-serial", metavar="SERIAL",
+                        help="Pick the dongle by USB serial number instead")
     parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("--frame", choices=FRAME_MODES, default="auto",
+                        help="Serial data format (default: detect from the first bytes)")
+    parser.add_argument("--wakeup", choices=("event", "timer"), default="event",
+                        help="Process samples as they arrive, or poll every 16 ms")
+    parser.add_argument("--latency-stats", action="store_true",
+                        help="Print the sample-to-GUI dispatch latency distribution on exit")
+    parser.add_argument("--filter", choices=sorted(FILTERS), default="none",
+                        help="Pointer smoothing filter (default: none)")
+    parser.add_argument("--filter-opt", action="append", metavar="NAME=VALUE",
+                        help="Filter parameter, e.g. min_cutoff=0.5 (repeatable)")
+    parser.add_argument("--paint-stats", action="store_true",
+                        help="Print paintEvent duration statistics on exit")
+    parser.add_argument("--frame-stats", action="store_true",
+                        help="Print frame pacing statistics (missed frames, paint time) on exit")
+    parser.add_argument("--stats-interval", type=float, default=0, metavar="SECONDS",
+                        help="Print per-stage pipeline timing histograms every SECONDS")
+    parser.add_argument("--stats-listen", metavar="HOST:PORT|unix:PATH",
+                        help="Serve per-stage timings in Prometheus text format, e.g. 127.0.0.1:9464")
+    parser.add_argument("--window", choices=WINDOW_MODES, default="full",
+                        help="Full-screen translucent overlay, or a small sprite window that follows the dot")
+    parser.add_argument("--screens", choices=AREAS, default="all",
+                        help="Map the pointer across all screens (virtual desktop) or the primary one")
+    parser.add_argument("--record", metavar="FILE",
+                        help="Record every decoded sample to a binary session file")
+    parser.add_argument("--buttons", metavar="FILE",
+                        help="Button bindings (JSON): chords, long press, double click, auto-repeat; "
+                             "see airmouse/buttons.py")
+    parser.add_argument("--gestures", action="store_true",
+                        help="With the laser off, swipe for next/previous slide, move up/down to "
+                             "scroll and twist to zoom")
+    parser.add_argument("--gesture-opt", action="append", metavar="NAME=VALUE",
+                        help="Gesture engine parameter, e.g. onset=0.8 (repeatable)")
+    parser.add_argument("--auto-cal", action="store_true",
+                        help="Keep the pointer centred: recalibrate from still rest periods with "
+                             "the laser off and follow the sensor drift in between; buttons 0+3 "
+                             "together recentre")
+    parser.add_argument("--cal-opt", action="append", metavar="NAME=VALUE",
+                        help="Auto-calibration parameter, e.g. tau=10 (repeatable)")
+    parser.add_argument("--headless", action="store_true",
+                        help="No overlay and no Qt: run the buttons, gestures and key/click "
+                             "injection only (the laser just toggles state)")
+    parser.add_argument("--screen-size", metavar="WxH",
+                        help="With --headless, the screen the pointer is mapped onto "
+                             "(default: the primary screen's size)")
+    parser.add_argument("--injection", choices=BACKENDS, default="auto",
+                        help="How keys, clicks and cursor moves are injected (default: auto; "
+                             "see airmouse/injection.py)")
+    parser.add_argument("--cursor", action="store_true",
+                        help="Move the real cursor with the laser instead of drawing a dot, "
+                             "once per display frame")
+    parser.add_argument("--cursor-rate", type=float, default=60.0, metavar="HZ",
+                        help="With --headless --cursor, the most cursor moves per second (default: 60)")
+    parser.add_argument("--broadcast", nargs="?", const=DEFAULT_NAME, metavar="NAME",
+                        help="Publish every pointer sample in shared memory for other processes "
+                             f"(default name: {DEFAULT_NAME}; see airmouse/broadcast.py)")
+    parser.add_argument("--jitter-buffer", action="store_true",
+                        help="Draw the dot an adaptive delay behind bursty samples so it moves "
+                             "smoothly (see airmouse/jitter.py)")
+    parser.add_argument("--jitter-opt", action="append", metavar="NAME=VALUE",
+                        help="Playout buffer option, e.g. max_delay=0.05 or quantile=99 (repeatable)")
+    parser.add_argument("--no-idle", action="store_true",
+                        help="Keep processing every sample while the laser is off or the hand is still "
+                             "(see airmouse/idle.py)")
+    parser.add_argument("--idle-opt", action="append", metavar="NAME=VALUE",
+                        help="Idle mode option, e.g. after=1.0 (seconds still) or motion=0.02 (repeatable)")
+    parser.add_argument("--worker", action="store_true",
+                        help="Read, calibrate, filter and run the buttons in a separate process; the "
+                             "overlay only draws and injects (see airmouse/worker.py)")
     args = parser.parse_args()
+    screen_size = None
+    if args.screen_size:
+        try:
+            screen_size = parse_screen_size(args.screen_size)
+        except ValueError as e:
+            parser.error(f"--screen-size: {e}")
+    try:
+        pointer_filter = make_filter(args.filter, args.filter_opt)
+    except (TypeError, ValueError) as e:
+        parser.error(f"--filter-opt: {e}")
+    buttons = BUTTONS
+    if args.buttons:
+        try:
+            buttons = load_config(args.buttons)
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            parser.error(f"--buttons: {e}")
+        unknown = {b["action"] for b in buttons.get("bindings", ())} - set(BUTTON_ACTIONS)
+        if unknown:
+            parser.error(f"--buttons: unknown actions {', '.join(sorted(unknown))} "
+                         f"(available: {', '.join(BUTTON_ACTIONS)})")
+    gesture_opts = None
+    if args.gestures:
+        try:
+            gesture_opts = parse_filter_opts(args.gesture_opt)
+            GestureEngine(**gesture_opts)
+        except (TypeError, ValueError) as e:
+            parser.error(f"--gesture-opt: {e}")
+    cal_opts = None
+    if args.auto_cal:
+        try:
+            cal_opts = parse_filter_opts(args.cal_opt)
+            AutoCalibrator(**cal_opts)
+        except (TypeError, ValueError) as e:
+            parser.error(f"--cal-opt: {e}")
+        if not args.buttons:
+            buttons = with_recalibrate_chord(buttons)
+    jitter_opts = None
+    if args.jitter_buffer:
+        if args.headless:
+            parser.error("--jitter-buffer needs the overlay (no --headless)")
+        if args.worker:
+            parser.error("--jitter-buffer does not work with --worker yet")
+        try:
+            jitter_opts = parse_filter_opts(args.jitter_opt)
+            PlayoutBuffer(**jitter_opts)
+        except (TypeError, ValueError) as e:
+            parser.error(f"--jitter-opt: {e}")
+    idle_opts = None
+    if not args.no_idle:
+        try:
+            idle_opts = parse_filter_opts(args.idle_opt)
+            IdleTracker(None, **idle_opts)
+        except (TypeError, ValueError) as e:
+            parser.error(f"--idle-opt: {e}")
+
+    metrics = PipelineMetrics() if args.stats_interval or args.stats_listen else None
+    stats_server = None
+    if args.stats_listen:
+        try:
+            stats_server = serve_metrics(metrics, args.stats_listen)
+        except (OSError, ValueError) as e:
+            parser.error(f"--stats-listen: {e}")
 
-    data_queue = queue.Queue()
+    ports = args.port or [None]
+    if args.udp and args.port:
+        parser.error("--udp replaces --port")
+    if len(ports) > 1 and args.record:
+        parser.error("--record supports a single --port")
+    if len(ports) > 1 and args.window != "full":
+        parser.error("several --port receivers need --window full")
+    if len(ports) > 1 and args.cursor:
+        parser.error("--cursor supports a single --port")
+    if args.cursor_rate <= 0:
+        parser.error("--cursor-rate must be positive")
+    if args.worker and args.headless:
+        parser.error("--worker needs the overlay (no --headless)")
+    broadcast = None
+    if args.broadcast and not args.worker:
+        try:
+            broadcast = PointerBroadcast(args.broadcast)
+        except (OSError, ValueError) as e:
+            parser.error(f"--broadcast: {e}")
+        print("Broadcasting the pointer as", repr(args.broadcast))
+
+    worker = None
+    if args.worker:
+        if args.udp:
+            try:
+                parse_udp_address(args.udp)
+            except ValueError as e:
+                parser.error(f"--udp: {e}")
+        worker = PipelineWorker(serial_reader, ports=args.port, udp=args.udp, baud=args.baud,
+                                frame_mode=args.frame, usb_ids=args.usb_id or DONGLE_IDS,
+                                usb_serial=args.usb_serial, pointer_filter=pointer_filter,
+                                buttons=buttons, gesture_opts=gesture_opts, cal_opts=cal_opts,
+                                idle_opts=idle_opts, link_stats=metrics is not None,
+                                metrics=metrics is not None, record=args.record,
+                                broadcast=args.broadcast, wake=args.wakeup == "event")
+        # The worker starts up while Qt does.
+        worker.start()
+
+    mailboxes = [SampleMailbox() for _ in ports] if worker is None else []
     stop_event = threading.Event()
+    recorder = SessionRecorder(args.record) if args.record and worker is None else None
     
-    serial_thread = threading.Thread(
-        target=serial_reader,
-        args=(args.port, args.baud, data_queue, stop_event),
-        daemon=True
-    )
-    serial_thread.start()
+    ingest = None
+    udp = None
+    if worker is not None:
+        # The worker process owns the sources.
+        serial_thread = None
+    elif args.udp:
+        try:
+            udp = UdpReceiver(args.udp, mailboxes[0], stop_event, frame_mode=args.frame,
+                              recorder=recorder, metrics=metrics)
+        except (OSError, ValueError) as e:
+            if broadcast is not None:
+                broadcast.close()
+            parser.error(f"--udp: {e}")
+        serial_thread = threading.Thread(target=udp.run, name="udp-ingest", daemon=True)
+        serial_thread.start()
+    elif len(ports) == 1:
+        serial_thread = threading.Thread(
+            target=serial_reader,
+            args=(ports[0], args.baud, mailboxes[0], stop_event, args.frame, recorder, metrics),
+            kwargs={"usb_ids": args.usb_id or DONGLE_IDS, "usb_serial": args.usb_serial},
+            daemon=True
+        )
+        serial_thread.start()
+    else:
+        # One selector loop reads every receiver.
+        ingest, serial_thread = start_ingest(ports, args.baud, mailboxes, stop_event,
+                                             frame_mode=args.frame, metrics=metrics)
 
-    app = QtWidgets.QApplication(sys.argv)
-    window = OverlayWindow(data_queue)
-    window.show()
+    latency_log = LatencyLog() if args.latency_stats else None
+    if args.headless:
+        window = HeadlessRunner(mailboxes, stop_event, size=screen_size, latency_log=latency_log,
+                                pointer_filter=pointer_filter, metrics=metrics,
+                                gesture_opts=gesture_opts, buttons=buttons, cal_opts=cal_opts,
+                                injection=args.injection,
+                                cursor_rate=args.cursor_rate if args.cursor else None,
+                                broadcast=broadcast, link_stats=metrics is not None, idle_opts=idle_opts)
+        print("Screen:", window.describe())
+        window.injector.warm_up()
+    else:
+        from PyQt5 import QtWidgets, QtCore
+        from airmouse.overlay import OverlayWindow
+        from airmouse.qt_wakeup import SignalWaker
+
+        app = QtWidgets.QApplication(sys.argv)
+        # SIGTERM and Ctrl+C quit the event loop, so cleanup() runs.
+        signal_waker = SignalWaker(app)
+        if worker is not None:
+            try:
+                worker.wait_ready()
+            except OSError as e:
+                parser.error(f"--worker: {e}")
+            print("Worker process:", worker.pid)
+            if args.broadcast:
+                print("Broadcasting the pointer as", repr(args.broadcast))
+        window = OverlayWindow(mailboxes, wakeup=args.wakeup, latency_log=latency_log,
+                               pointer_filter=pointer_filter,
+                               paint_log=LatencyLog() if args.paint_stats or args.frame_stats else None,
+                               window_mode=args.window, screens=args.screens, metrics=metrics,
+                               gesture_opts=gesture_opts, buttons=buttons, cal_opts=cal_opts,
+                               injection=args.injection, cursor=args.cursor, broadcast=broadcast,
+                               jitter_opts=jitter_opts, link_stats=metrics is not None and worker is None,
+                               idle_opts=idle_opts if worker is None else None, worker=worker)
+        print("Desktop:", window.desktop.describe())
+        window.show()
+        # Set the injection backend up off the GUI thread now the overlay is up.
+        window.injector.warm_up()
+
+        if args.stats_interval:
+            stats_timer = QtCore.QTimer()
+            stats_timer.timeout.connect(lambda: print("Pipeline stats:\n" + metrics.report()
+                                                      + ("\n" + window.link_summary() if worker is None else "")))
+            stats_timer.start(int(args.stats_interval * 1000))
 
     def cleanup():
         stop_event.set()
-        if IS_WINDOWS:
-            user32.ShowCursor(True)  # Ensure cursor visible on exit
-    
+        show_cursor(True)  # Ensure cursor visible on exit
+        if worker is not None:
+            # Mailboxes, sources, recorder and the pipeline's own summaries
+            # come from the worker.
+            worker.close()
+            if worker.report:
+                print(worker.report)
+            print(worker.summary())
+        for i, mailbox in enumerate(mailboxes):
+            print(f"Mailbox{f' {i}' if len(mailboxes) > 1 else ''}:", mailbox.summary())
+        if ingest is not None:
+            serial_thread.join(timeout=1.0)
+            print("Ingest:", ingest.summary())
+        if udp is not None:
+            serial_thread.join(timeout=1.0)
+            print(udp.summary())
+        window.dispatcher.close()
+        window.injector.close()
+        print(window.dispatcher.summary())
+        if args.cursor:
+            print(window.cursor_summary())
+        if recorder is not None:
+            serial_thread.join(timeout=1.0)
+            recorder.close()
+            print(recorder.summary())
+        if broadcast is not None:
+            broadcast.close()
+            print(broadcast.summary())
+        if latency_log is not None:
+            print(latency_log.summary(f"Dispatch latency ({'headless' if args.headless else args.wakeup})"))
+        if stats_server is not None:
+            stats_server.shutdown()
+            stats_server.server_close()
+        if metrics is not None:
+            print("Pipeline stats:\n" + metrics.report())
+        if worker is None:
+            if metrics is not None or jitter_opts is not None:
+                print(window.link_summary())
+            if idle_opts is not None:
+                print(window.idle_summary())
+            if gesture_opts is not None:
+                print(window.gesture_summary())
+            if cal_opts is not None:
+                print(window.calibration_summary())
+        if args.headless:
+            return
+        if args.frame_stats:
+            print(window.frame_summary())
+        elif window.paint_log is not None:
+            print(window.paint_log.summary("Paint time"))
+
+    if args.headless:
+        # No event loop to quit: SIGTERM and Ctrl+C stop the runner, then
+        # the same cleanup runs.
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+        if args.stats_interval:
+            def report():
+                while not stop_event.wait(args.stats_interval):
+                    print("Pipeline stats:\n" + metrics.report() + "\n" + window.link_summary())
+            threading.Thread(target=report, daemon=True).start()
+        try:
+            window.run()
+        except KeyboardInterrupt:
+            pass
+        cleanup()
+        return
     app.aboutToQuit.connect(cleanup)
     sys.exit(app.exec_())
 
@@ -0,0 +1,236 @@
+"""Writer overhead and reader latency of the shared-memory pointer broadcast.
+
+Usage:
+    python bench/bench_broadcast.py [--rate 1000] [--seconds 3] [--readers 1]
+                                    [--poll 0.0005] [--budget 20] [--lap-seconds 2]
+
+Writer: PointerBroadcast.publish() is timed for batches of 1, 4, 16 and 64
+samples, the sizes the GUI thread sees from idle to a busy tick; the cost
+per batch is what the overlay pays.
+
+Readers: --readers processes attach to the block and poll read() every
+--poll seconds (0 spins) while this process publishes a synthetic pointer
+at --rate samples per second, one sample per batch. Each reader notes
+monotonic() - t when it first sees a record; all processes share the
+monotonic clock. Reported: latency p50/p95/p99/max, records seen and
+missed.
+
+Lapping: every record's t and x are its own seq, so a record that mixes
+two samples shows. First a reader whose copy is torn on purpose (seq
+copied before the writer laps it, the fields after) must return nothing
+torn from read() or latest(); then a writer process laps a reader in a
+tiny ring as fast as it can for --lap-seconds, in batches that take both
+publish() paths, and every record the reader accepted is checked.
+
+The exit status is the number of failed checks: a one-sample publish over
+--budget us, a reader that missed records, or a torn record accepted.
+"""
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from airmouse.broadcast import PointerBroadcast, PointerReader
+from airmouse.stats import percentile
+
+NAME = f"airmouse-bench-{os.getpid()}"
+
+
+def batch(n, t0=0.0):
+    samples = [{"t": t0 + i * 1e-3, "buttons": (0, 1, 0, 0)} for i in range(n)]
+    return samples, np.linspace(0, 1919, n), np.linspace(0, 1079, n)
+
+
+def time_writer(writer, sizes, repeat=2000):
+    worst = 0.0
+    for n in sizes:
+        samples, x, y = batch(n)
+        best = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                writer.publish(samples, x, y, True)
+            best = min(best, (time.perf_counter() - start) / repeat)
+        print(f"  batch {n:3d}: {best * 1e6:6.2f} us per publish, {best / n * 1e6:6.2f} us per sample")
+        if n == 1:
+            worst = best
+    return worst
+
+
+def counted(first, n):
+    """n samples whose t and x are their seq, from `first` on."""
+    seq = np.arange(first, first + n, dtype=float)
+    return [{"t": float(v), "buttons": (0, 0, 0, 0)} for v in seq], seq % (1 << 20), -seq
+
+
+def torn(records):
+    """How many records do not match their own seq."""
+    seq = records["seq"].astype(float)
+    return int(np.count_nonzero((records["t"] != seq) | (records["x"] != seq % (1 << 20))))
+
+
+class LappedRing:
+    """A reader's view of the ring, lapped by the writer halfway through
+    every copy: seq is copied before the writer gets to the slots, the
+    fields after."""
+
+    def __init__(self, ring, lap):
+        self.ring = ring
+        self.lap = lap
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.ring[key]
+        seq = self.ring["seq"][key].copy()
+        self.lap()
+        copy = self.ring[key].copy()
+        copy["seq"] = seq
+        return copy
+
+
+def check_torn_copy(name, slots=8):
+    writer = PointerBroadcast(name, slots=slots)
+    published = [0]
+
+    def lap():
+        writer.publish(*counted(published[0] + 1, slots), True)
+        published[0] += slots
+
+    try:
+        r = PointerReader(name)
+        lap()
+        r._ring = LappedRing(r._ring, lap)
+        records = r.read()
+        bad = torn(records)
+        state = r.latest()
+        bad += state is not None and (state.t != state.seq or state.x != state.seq % (1 << 20))
+        print(f"  torn copy: read() kept {len(records)} of {slots} records, {r.missed} missed, "
+              f"latest() {'gave up' if state is None else 'returned seq %d' % state.seq}, {bad} torn")
+        r._ring = r._ring.ring
+        r.close()
+    finally:
+        writer.close()
+    return bad
+
+
+def lapper(name, slots, seconds, ready, done):
+    writer = PointerBroadcast(name, slots=slots)
+    ready.set()
+    sent = 0
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        for n in (1, 3, 2 * slots):
+            writer.publish(*counted(sent + 1, n), True)
+            sent += n
+    done.wait(10)
+    writer.close()
+
+
+def check_lapping(name, seconds, slots=8):
+    ctx = multiprocessing.get_context("spawn")
+    ready, done = ctx.Event(), ctx.Event()
+    proc = ctx.Process(target=lapper, args=(name, slots, seconds, ready, done))
+    proc.start()
+    try:
+        ready.wait(10)
+        r = PointerReader(name)
+        kept = bad = 0
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            records = r.read()
+            kept += len(records)
+            bad += torn(records)
+            state = r.latest()
+            if state is not None:
+                kept += 1
+                bad += state.t != state.seq or state.x != state.seq % (1 << 20)
+        print(f"  writer lapping a {slots}-slot ring for {seconds:.1f} s: {kept} records kept, "
+              f"{r.missed} missed, {bad} torn")
+        r.close()
+    finally:
+        done.set()
+        proc.join()
+    return bad
+
+
+def reader(name, poll, stop, results):
+    r = PointerReader(name)
+    lat = []
+    seen = 0
+    while not stop.is_set():
+        records = r.read()
+        if len(records):
+            now = time.monotonic()
+            lat.extend((now - records["t"]).tolist())
+            seen += len(records)
+        if poll:
+            time.sleep(poll)
+    results.put((lat, seen, r.missed))
+    r.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=1000.0)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--readers", type=int, default=1)
+    parser.add_argument("--poll", type=float, default=0.0005, help="reader poll interval in s (0 spins)")
+    parser.add_argument("--budget", type=float, default=20.0, help="one-sample publish budget in us")
+    parser.add_argument("--lap-seconds", type=float, default=2.0, help="how long the writer laps a reader")
+    args = parser.parse_args()
+
+    failures = 0
+    writer = PointerBroadcast(NAME)
+    try:
+        print("writer:")
+        cost = time_writer(writer, (1, 4, 16, 64))
+        if cost * 1e6 > args.budget:
+            print(f"FAIL one-sample publish {cost * 1e6:.1f} us is over {args.budget:.0f} us")
+            failures += 1
+
+        ctx = multiprocessing.get_context("spawn")
+        stop = ctx.Event()
+        results = ctx.Queue()
+        procs = [ctx.Process(target=reader, args=(NAME, args.poll, stop, results))
+                 for _ in range(args.readers)]
+        for p in procs:
+            p.start()
+        time.sleep(1.0)     # let the readers attach
+
+        period = 1.0 / args.rate
+        n = int(args.seconds * args.rate)
+        x, y = np.array([960.0]), np.array([540.0])
+        start = time.monotonic()
+        for i in range(n):
+            delay = start + i * period - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            writer.publish([{"t": time.monotonic(), "buttons": (0, 0, 0, 0)}], x, y, True)
+        time.sleep(0.1)
+        stop.set()
+        print(f"readers ({args.rate:.0f} Hz, poll {args.poll * 1e3:.2f} ms):")
+        for k in range(args.readers):
+            lat, seen, missed = results.get(timeout=10)
+            lat.sort()
+            print(f"  reader {k}: p50 {percentile(lat, 50) * 1e6:7.1f}  p95 {percentile(lat, 95) * 1e6:7.1f}  "
+                  f"p99 {percentile(lat, 99) * 1e6:7.1f}  max {lat[-1] * 1e6 if lat else 0:7.1f} us, "
+                  f"{seen} seen, {missed} missed")
+            failures += missed > 0
+        for p in procs:
+            p.join()
+    finally:
+        writer.close()
+
+    print("lapping:")
+    failures += check_torn_copy(NAME + "-torn") > 0
+    failures += check_lapping(NAME + "-lap", args.lap_seconds) > 0
+    sys.exit(failures)
+
+
+if __name__ == "__main__":
+    main()
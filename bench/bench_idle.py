@@ -0,0 +1,212 @@
+"""GUI wakeups and CPU with and without the idle power mode.
+
+Usage:
+    python bench/bench_idle.py [--target app test1] [--wakeup event timer]
+                               [--scenarios still slides laser moving] [--seconds 3]
+
+A pty stands in for the dongle and streams 1 kHz samples (in 1 ms
+writes) into the target's own serial_reader and OverlayWindow under the Qt
+offscreen platform, first with --no-idle behaviour, then with the idle
+mode on. Scenarios:
+
+    still    laser off, hand resting (sensor noise only)
+    slides   laser off, resting, button 0 (next slide) clicked every second
+    laser    laser on, hand resting on the slide
+    moving   laser on, pointer sweeping a figure-eight
+
+Reported: GUI thread context switches per second (its wakeups; Linux
+only), calls into the consumer per second, GUI thread CPU% and whole
+process CPU% (which includes the serial reader and this feeder), and for
+slides the button-edge-to-consumer latency, which shows whether the idle
+mode still reacts at once. OS injection is replaced by a stand-in.
+
+The exit status is the number of still/slides runs where the idle mode did
+not at least halve the consumer calls, plus those where a button edge took
+more than --budget ms to reach the consumer.
+"""
+import os
+import sys
+import tty
+import math
+import time
+import random
+import argparse
+import importlib
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtCore, QtWidgets
+
+from airmouse import injection
+from airmouse.mailbox import SampleMailbox
+from airmouse.stats import percentile
+
+CONSUMER = {"app": "process_data", "test1": "process_data"}
+SCENARIOS = ("still", "slides", "laser", "moving")
+
+
+class InjectionStandIn:
+    """Replaces pyautogui so the bench never presses real keys."""
+
+    def _inject(self, *args, **kwargs):
+        pass
+
+    press = keyDown = keyUp = click = moveTo = mouseDown = mouseUp = scroll = _inject
+
+    def position(self):
+        return 0, 0
+
+
+class ProbeMailbox(SampleMailbox):
+    """Notes how long each button edge took to reach the consumer."""
+
+    def __init__(self, sent_at):
+        super().__init__()
+        self.sent_at = sent_at
+        self.edge_latency = []
+
+    def take_batch(self):
+        samples, edges = super().take_batch()
+        now = time.monotonic()
+        for edge in edges:
+            self.edge_latency.append(now - self.sent_at[int(edge["raw"][0])])
+        return samples, edges
+
+
+def feeder(fd, scenario, seconds, sent_at, stop):
+    rnd = random.Random(3)
+    seq = 0
+    t_next = time.perf_counter()
+    t_end = t_next + seconds
+    while not stop.is_set() and t_next < t_end:
+        t = seq * 1e-3
+        if scenario == "moving":
+            y, z = 3.0 * math.sin(2 * math.pi * t / 3.0), 4.0 * math.sin(4 * math.pi * t / 3.0)
+        else:
+            y, z = 1.5 + rnd.uniform(-0.003, 0.003), -2.25 + rnd.uniform(-0.003, 0.003)
+        b0 = 1 if scenario == "slides" and 0.5 <= t % 1.0 < 0.55 else 0
+        sent_at.append(time.monotonic())
+        os.write(fd, f"RX -> X: {seq} Y: {y:.4f} Z: {z:.4f} | Buttons: {b0} 0 0 0\r\n".encode())
+        seq += 1
+        t_next += 1e-3
+        delay = t_next - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def context_switches(tid):
+    """Voluntary + involuntary context switches of one thread (Linux)."""
+    try:
+        with open(f"/proc/self/task/{tid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f if "ctxt_switches" in line)
+    except OSError:
+        return None
+    return sum(int(v) for v in fields.values())
+
+
+def run_one(app, name, wakeup, scenario, idle, args):
+    module = importlib.import_module(name)
+    consumer = CONSUMER[name]
+    base = module.OverlayWindow
+    calls = [0]
+
+    def probe(self):
+        calls[0] += 1
+        getattr(base, consumer)(self)
+
+    window_cls = type("Probe", (base,), {consumer: probe})
+    master, slave = os.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    sent_at = []
+    mailbox = ProbeMailbox(sent_at)
+    stop_reader = threading.Event()
+    reader = threading.Thread(target=module.serial_reader,
+                              args=(os.ttyname(slave), 115200, mailbox, stop_reader, "text"), daemon=True)
+    reader.start()
+    injection._pyautogui = InjectionStandIn()
+
+    window = window_cls(mailbox, wakeup=wakeup, idle_opts={} if idle else None)
+    for pointer in getattr(window, "remotes", [window]):
+        pointer.laser_on = scenario in ("laser", "moving")
+    window.show()
+
+    stop_feed = threading.Event()
+    feed = threading.Thread(target=feeder, args=(master, scenario, args.seconds + 1.0, sent_at, stop_feed))
+    feed.start()
+    # Measure after a second of warm-up (idle needs `after` to kick in).
+    marks = {}
+
+    def start():
+        calls[0] = 0
+        mailbox.edge_latency.clear()
+        marks["t"] = time.monotonic()
+        marks["cpu"] = time.process_time()
+        marks["gui"] = time.thread_time()
+        marks["ctx"] = context_switches(threading.get_native_id())
+
+    def finish():
+        wall = time.monotonic() - marks["t"]
+        marks["wall"] = wall
+        marks["calls"] = calls[0] / wall
+        marks["cpu"] = (time.process_time() - marks["cpu"]) / wall
+        marks["gui"] = (time.thread_time() - marks["gui"]) / wall
+        ctx = context_switches(threading.get_native_id())
+        marks["ctx"] = None if ctx is None or marks["ctx"] is None else (ctx - marks["ctx"]) / wall
+        app.quit()
+
+    QtCore.QTimer.singleShot(1000, start)
+    QtCore.QTimer.singleShot(int((args.seconds + 1.0) * 1000), finish)
+    app.exec_()
+    stop_feed.set()
+    feed.join()
+    stop_reader.set()
+    reader.join(timeout=1.0)
+    if getattr(window, "timer", None) is not None:
+        # The poll timer has no parent and would outlive the window.
+        window.timer.stop()
+    window.close()
+    window.deleteLater()
+    os.close(master)
+    os.close(slave)
+
+    lat = sorted(mailbox.edge_latency)
+    ctx = "   n/a" if marks["ctx"] is None else f"{marks['ctx']:6.0f}"
+    edge = ""
+    if lat:
+        edge = f"  edge p50 {percentile(lat, 50) * 1e3:5.2f} max {lat[-1] * 1e3:5.2f} ms"
+    print(f"{name:<6} {wakeup:<5} {scenario:<7} idle {'on ' if idle else 'off'}  GUI wakeups {ctx}/s  "
+          f"consumer {marks['calls']:6.0f}/s  GUI CPU {100 * marks['gui']:5.1f}%  "
+          f"process CPU {100 * marks['cpu']:5.1f}%{edge}")
+    return marks["calls"], (lat[-1] if lat else 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", nargs="+", choices=sorted(CONSUMER), default=["app", "test1"])
+    parser.add_argument("--wakeup", nargs="+", choices=("event", "timer"), default=["event", "timer"])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--budget", type=float, default=20.0, help="button edge latency budget in ms")
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication(sys.argv)
+    failures = 0
+    for name in args.target:
+        for wakeup in args.wakeup:
+            for scenario in args.scenarios:
+                busy, _ = run_one(app, name, wakeup, scenario, False, args)
+                idle, worst = run_one(app, name, wakeup, scenario, True, args)
+                if scenario in ("still", "slides") and idle > busy / 2:
+                    print(f"FAIL {name} {wakeup} {scenario}: idle mode kept {idle:.0f} calls/s")
+                    failures += 1
+                if worst * 1e3 > args.budget:
+                    print(f"FAIL {name} {wakeup} {scenario}: a button edge took {worst * 1e3:.1f} ms")
+                    failures += 1
+    sys.exit(failures)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Thread-per-port vs single selector loop ingest, 1 to 16 receivers.
+
+Usage:
+    python bench/bench_ingest.py [--sources 1 2 4 8 16] [--rate 500] [--seconds 3]
+
+For every source count N, N ptys stand in for N dongles; a separate
+feeder process writes ``RX -> ...`` lines to all of them at --rate lines/s
+each, so its CPU is not counted. The same load is read twice:
+
+    threads   one app.serial_reader thread per port (the old way)
+    selector  one MultiSourceIngest thread for all ports
+
+Reported: reader CPU per line and as % of one core, the fraction of lines
+delivered to the mailboxes, and the 99th percentile oversleep of a 1 ms
+sleep loop on the main thread - a stand-in for how long the Qt thread waits
+for the GIL while the readers run.
+"""
+import os
+import sys
+import tty
+import time
+import argparse
+import threading
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airmouse.ingest import start_ingest
+from airmouse.mailbox import SampleMailbox
+from airmouse.stats import percentile
+
+
+def feeder(masters, rate, seconds, sent):
+    line = b"RX -> X: 1.00 Y: 1.50 Z: -2.25 | Buttons: 0 0 0 0\r\n"
+    per_burst = max(1, int(round(rate / 1000)))
+    period = per_burst / rate
+    burst = line * per_burst
+    t_next = time.perf_counter()
+    t_end = t_next + seconds
+    n = 0
+    while t_next < t_end:
+        for fd in masters:
+            os.write(fd, burst)
+        n += per_burst
+        t_next += period
+        delay = t_next - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    sent.value = n * len(masters)
+
+
+def run_one(mode, n, args, serial_reader):
+    ptys = [os.openpty() for _ in range(n)]
+    for master, slave in ptys:
+        tty.setraw(master)
+        tty.setraw(slave)
+    ports = [os.ttyname(slave) for _, slave in ptys]
+    mailboxes = [SampleMailbox() for _ in range(n)]
+    stop = threading.Event()
+    if mode == "threads":
+        threads = [threading.Thread(target=serial_reader, args=(port, 115200, mb, stop, "text"), daemon=True)
+                   for port, mb in zip(ports, mailboxes)]
+        for t in threads:
+            t.start()
+    else:
+        _, thread = start_ingest(ports, 115200, mailboxes, stop, frame_mode="text")
+        threads = [thread]
+    time.sleep(0.3)  # let every port open
+
+    sent = multiprocessing.Value("q", 0)
+    proc = multiprocessing.Process(target=feeder, args=([m for m, _ in ptys], args.rate, args.seconds, sent))
+    cpu0 = time.process_time()
+    proc.start()
+    oversleep = []
+    t_end = time.monotonic() + args.seconds
+    while time.monotonic() < t_end:
+        t0 = time.perf_counter()
+        time.sleep(0.001)
+        oversleep.append(time.perf_counter() - t0 - 0.001)
+    proc.join()
+    time.sleep(0.2)
+    cpu = time.process_time() - cpu0
+    stop.set()
+    for t in threads:
+        t.join(timeout=1.0)
+    for master, slave in ptys:
+        os.close(master)
+        os.close(slave)
+
+    lines = max(sent.value, 1)
+    delivered = sum(mb.published for mb in mailboxes)
+    oversleep.sort()
+    print(f"{mode:<8} {n:>3} sources  CPU {cpu / lines * 1e6:6.1f} us/line "
+          f"{cpu / (args.seconds + 0.2) * 100:5.1f}% core  delivered {100.0 * delivered / lines:5.1f}%  "
+          f"main-thread oversleep p99 {percentile(oversleep, 99) * 1e3:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sources", nargs="+", type=int, default=[1, 2, 4, 8, 16])
+    parser.add_argument("--rate", type=float, default=500.0, help="lines per second per source")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--mode", nargs="+", choices=("threads", "selector"), default=["threads", "selector"])
+    args = parser.parse_args()
+
+    serial_reader = None
+    if "threads" in args.mode:
+        from app import serial_reader
+    for n in args.sources:
+        for mode in args.mode:
+            run_one(mode, n, args, serial_reader)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Injected events and their cost when the laser drives the real cursor.
+
+Usage:
+    python bench/bench_injection.py [--rate 1000] [--seconds 3] [--frame-rate 60]
+                                    [--cost 1.0] [--backends record pyautogui xtest uinput]
+
+A synthetic pointer stream (a slow circle with hand tremor) is produced in
+real time at --rate samples per second and fed to the cursor two ways, both
+through an InputDispatcher and a RecordingBackend that takes --cost ms per
+event (about what a pyautogui move costs):
+
+    per-sample   one move per sample, as a naive cursor mode would
+    per-frame    CursorDriver, fed the newest position once per display frame
+
+Reported per mode: moves injected and per second, the dispatcher queue wait
+(how far the cursor lags the pointer) and the time left to drain the queue
+when the stream stops.
+
+Then each backend in --backends that can be set up here is timed: --events
+moves in one batch and one by one, per event. Real backends move the real
+cursor around the top left of the screen. Last, a click as the old Windows
+path did it (move, sleep 10 ms, down, sleep 10 ms, up, move back) against
+one batched send.
+
+The exit status is the number of checks failed: per-frame mode may inject
+at most one move per frame, and must not lag more than two frames.
+"""
+import os
+import sys
+import math
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airmouse.dispatch import InputDispatcher
+from airmouse.injection import CursorDriver, Injector, RecordingBackend, make_backend
+from airmouse.stats import percentile
+
+
+def pointer(t):
+    """Screen position at time t: a circle every 4 s plus a little tremor."""
+    a = 2 * math.pi * t / 4.0
+    return (960 + 400 * math.cos(a) + 3 * math.sin(2 * math.pi * 9 * t),
+            540 + 300 * math.sin(a) + 3 * math.cos(2 * math.pi * 11 * t))
+
+
+def to_absolute(x, y):
+    return int(x * 65535 / 1919), int(y * 65535 / 1079)
+
+
+def stream(args, on_sample, on_frame):
+    """Calls on_sample(x, y) at --rate and on_frame(x, y) at --frame-rate,
+    in real time, for --seconds."""
+    period = 1.0 / args.rate
+    frame = 1.0 / args.frame_rate
+    start = time.perf_counter()
+    next_frame = start + frame
+    n = int(args.seconds * args.rate)
+    for i in range(n):
+        due = start + i * period
+        # Sleep rather than spin, so the dispatcher thread gets the GIL.
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        x, y = pointer(i * period)
+        on_sample(x, y)
+        now = time.perf_counter()
+        if now >= next_frame:
+            on_frame(x, y)
+            next_frame += frame
+    return n
+
+
+def run_mode(mode, args):
+    backend = RecordingBackend(cost=args.cost / 1e3)
+    dispatcher = InputDispatcher(name=f"bench-{mode}")
+    injector = Injector(dispatcher, to_absolute, backend)
+    driver = CursorDriver(injector)
+    if mode == "per-sample":
+        def move(x, y):
+            dispatcher.submit(injector.send, [("move", int(x), int(y))])
+        samples = stream(args, move, lambda x, y: None)
+    else:
+        samples = stream(args, lambda x, y: None, driver.move)
+    t_end = time.perf_counter()
+    dispatcher.close(timeout=60.0)
+    drain = time.perf_counter() - t_end
+    moves = sum(1 for _, events in backend.batches for e in events if e[0] == "move")
+    wait = sorted(dispatcher.queue_latency.values)
+    frames = int(args.seconds * args.frame_rate)
+    print(f"{mode:<11} {samples} samples, {moves} moves ({moves / args.seconds:7.1f}/s), "
+          f"wait p50 {percentile(wait, 50) * 1e3:7.2f} p99 {percentile(wait, 99) * 1e3:7.2f} ms, "
+          f"drain {drain * 1e3:7.1f} ms")
+    return moves, frames, percentile(wait, 99)
+
+
+def time_backend(name, args):
+    try:
+        backend = RecordingBackend() if name == "record" else make_backend(name, to_absolute)
+    except Exception as e:
+        print(f"  {name:<10} unavailable: {e}")
+        return
+    events = [("move", 100 + (i % 50), 100 + (i % 37)) for i in range(args.events)]
+    try:
+        start = time.perf_counter()
+        backend.send(events)
+        batched = (time.perf_counter() - start) / len(events)
+        start = time.perf_counter()
+        for event in events:
+            backend.send([event])
+        single = (time.perf_counter() - start) / len(events)
+    except Exception as e:
+        print(f"  {name:<10} failed: {e}")
+        return
+    finally:
+        backend.close()
+    print(f"  {name:<10} {batched * 1e6:8.1f} us/event batched, {single * 1e6:8.1f} us/event one by one")
+
+
+def time_clicks(args):
+    backend = RecordingBackend()
+    n = args.clicks
+
+    start = time.perf_counter()
+    for _ in range(n):
+        old = backend.position()
+        backend.send([("move", 500, 400)])
+        time.sleep(0.01)
+        backend.send([("down", "left")])
+        time.sleep(0.01)
+        backend.send([("up", "left")])
+        backend.send([("move",) + tuple(old)])
+    slept = (time.perf_counter() - start) / n
+
+    start = time.perf_counter()
+    for _ in range(n):
+        old = backend.position()
+        backend.send([("move", 500, 400), ("down", "left"), ("up", "left"), ("move",) + tuple(old)])
+    batched = (time.perf_counter() - start) / n
+    print(f"click: {slept * 1e3:.2f} ms with sleeps, {batched * 1e6:.1f} us batched "
+          f"(dispatcher blocked {slept / batched:.0f}x less)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=1000.0, help="pointer samples per second")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--frame-rate", type=float, default=60.0, help="display refresh rate")
+    parser.add_argument("--cost", type=float, default=1.0, help="recording backend ms per event")
+    parser.add_argument("--backends", nargs="+", default=["record", "pyautogui", "xtest", "uinput"],
+                        choices=("record", "sendinput", "pyautogui", "xtest", "uinput"))
+    parser.add_argument("--events", type=int, default=1000, help="moves per backend timing")
+    parser.add_argument("--clicks", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{args.rate:.0f} Hz pointer, {args.frame_rate:.0f} Hz frames, "
+          f"{args.cost:.2f} ms per injected event, {args.seconds:.0f} s")
+    failures = 0
+    run_mode("per-sample", args)
+    moves, frames, wait = run_mode("per-frame", args)
+    frame = 1.0 / args.frame_rate
+    if moves > frames + 1:
+        print(f"FAIL per-frame injected {moves} moves in {frames} frames")
+        failures += 1
+    if wait > 2 * frame:
+        print(f"FAIL per-frame p99 wait {wait * 1e3:.1f} ms is over two frames")
+        failures += 1
+
+    print("per-event cost:")
+    for name in args.backends:
+        time_backend(name, args)
+    time_clicks(args)
+    sys.exit(failures)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""Added latency against smoothness of the playout buffer on bursty links.
+
+Usage:
+    python bench/bench_jitter.py [--traces steady usb espnow] [--rate 1000] [--seconds 4]
+                                 [--fps 60] [--format text|binary] [--seed 1]
+
+Each trace is a synthetic delivery schedule for a remote sampling at
+--rate, replayed through a pty into app.serial_reader and a SampleMailbox:
+
+    steady   every sample written on its own, on time
+    usb      samples held and written in chunks every 16 ms +- 3 ms, like a
+             USB-CDC dongle flushing its buffer
+    espnow   a chunk every 5 ms, but 1 in 20 is held back 20-60 ms (radio
+             retries) and the backlog then arrives at once
+
+The raw X field carries each sample's number, so the moment it was
+sampled is known. A consumer thread plays the GUI: it takes every batch as
+it is woken, and at each --fps frame asks every setting for the position
+the way FrameScheduler does (PointerTrail.at() at now + one frame, minus the
+playout delay, at most one frame of extrapolation). All settings see the
+very same arrivals:
+
+    off        no playout buffer
+    fixed N    a constant N ms delay
+    p95, p99   the adaptive PlayoutBuffer at that quantile
+
+Reported per setting: display latency (frame present time minus the time
+the shown sample was taken) p50/p95; speed CV, the spread of the pointer's
+speed from frame to frame relative to the true constant speed (0 is
+perfectly smooth); held frames (under a quarter of the speed) and jumps
+(over twice the speed); playout underruns and the final delay. The first
+second is warm-up.
+
+The exit status is the number of bursty traces where the adaptive p95
+setting was not smoother than no buffer.
+"""
+import os
+import sys
+import tty
+import time
+import random
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from airmouse.frames import PointerTrail
+from airmouse.jitter import LinkMonitor, PlayoutBuffer
+from airmouse.mailbox import SampleMailbox
+from airmouse.protocol import pack_frame
+from airmouse.stats import percentile
+
+WARMUP = 1.0
+
+
+def schedule(trace, n, rate, rnd):
+    """[(delivery time from start, first, end)] of the samples 0..n-1."""
+    if trace == "steady":
+        return [(i / rate, i, i + 1) for i in range(n)]
+    out = []
+    first = 0
+    t = 0.0
+    while first < n:
+        if trace == "usb":
+            t += 0.016 + rnd.uniform(-0.003, 0.003)
+        else:
+            t += 0.005 + (rnd.uniform(0.020, 0.060) if rnd.random() < 0.05 else 0.0)
+        end = min(n, int(t * rate) + 1)
+        if end > first:
+            out.append((t, first, end))
+            first = end
+    return out
+
+
+def encode(i, fmt):
+    if fmt == "binary":
+        return pack_frame(i, int(i * 1e3), float(i), 0.5, -0.5, (0, 0, 0, 0))
+    return f"RX -> X: {i} Y: 0.50 Z: -0.50 | Buttons: 0 0 0 0\n".encode()
+
+
+class Setting:
+    """One way of picking the position shown at a frame."""
+
+    def __init__(self, name, playout, period):
+        self.name = name
+        self.playout = playout
+        self.period = period
+        self.trail = PointerTrail(4096)
+        self.frames = []
+
+    def frame(self, now):
+        play = now + self.period
+        if self.playout is not None:
+            play -= self.playout.delay
+            last = self.trail.last_time
+            self.playout.frame(play, None if last is None else last + self.period)
+        pos = self.trail.at(play, self.period)
+        if pos is not None:
+            self.frames.append((now, pos[0]))
+
+
+def consume(mailbox, settings, link, stop, fps):
+    wake = threading.Event()
+    mailbox.set_waker(wake.set)
+    period = 1.0 / fps
+    next_frame = time.monotonic() + period
+    while not stop.is_set():
+        wake.wait(max(next_frame - time.monotonic(), 0.0))
+        wake.clear()
+        samples, _ = mailbox.take_batch()
+        now = time.monotonic()
+        if samples:
+            staleness = link.observe(now, samples)
+            for sample in samples:
+                for s in settings:
+                    s.trail.push(sample["t"], sample["raw"][0], 0.0)
+            for s in settings:
+                if s.playout is not None:
+                    s.playout.observe(now, staleness)
+        if now >= next_frame:
+            for s in settings:
+                s.frame(now)
+            next_frame += period
+            if next_frame < now:
+                next_frame = now + period
+
+
+def run(trace, args, serial_reader):
+    rnd = random.Random(args.seed)
+    n = int(args.rate * args.seconds)
+    period = 1.0 / args.fps
+    settings = [Setting("off", None, period),
+                Setting("fixed 10", PlayoutBuffer(0.010, 0.010), period),
+                Setting("fixed 30", PlayoutBuffer(0.030, 0.030), period),
+                Setting("p95", PlayoutBuffer(quantile=95), period),
+                Setting("p99", PlayoutBuffer(quantile=99), period)]
+    link = LinkMonitor()
+    master, slave = os.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    mailbox = SampleMailbox(history=4096)
+    stop = threading.Event()
+    reader = threading.Thread(target=serial_reader,
+                              args=(os.ttyname(slave), 115200, mailbox, stop, args.format), daemon=True)
+    reader.start()
+    time.sleep(0.3)
+    mailbox.take_batch()
+    mailbox.take_messages()
+    done = threading.Event()
+    consumer = threading.Thread(target=consume, args=(mailbox, settings, link, done, args.fps), daemon=True)
+    consumer.start()
+
+    lines = [encode(i, args.format) for i in range(n)]
+    start = time.monotonic()
+    for at, first, end in schedule(trace, n, args.rate, rnd):
+        delay = start + at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        os.write(master, b"".join(lines[first:end]))
+    time.sleep(0.2)
+    done.set()
+    consumer.join(timeout=1.0)
+    stop.set()
+    reader.join(timeout=1.0)
+    os.close(master)
+    os.close(slave)
+
+    print(f"{trace}: {link.summary()}")
+    result = {}
+    for s in settings:
+        frames = [(t, v) for t, v in s.frames if start + WARMUP <= t <= start + args.seconds]
+        if len(frames) < 3:
+            print(f"  {s.name:<9} too few frames")
+            continue
+        t = np.array([f[0] for f in frames])
+        v = np.array([f[1] for f in frames])
+        lat = sorted((t + period - (start + v / args.rate)).tolist())
+        # Pointer speed between frames in samples per second, so a late
+        # frame tick is not mistaken for a jump.
+        speed = np.diff(v) / np.diff(t) / args.rate
+        cv = float(np.std(speed))
+        held = float(np.mean(speed < 0.25))
+        jumps = float(np.mean(speed > 2.0))
+        extra = ""
+        if s.playout is not None:
+            extra = f"  {s.playout.underruns:4d} underruns  delay {s.playout.delay * 1e3:5.1f} ms"
+        print(f"  {s.name:<9} latency p50 {percentile(lat, 50) * 1e3:6.1f}  p95 {percentile(lat, 95) * 1e3:6.1f} ms"
+              f"  speed CV {cv:5.2f}  held {100 * held:5.1f}%  jumps {100 * jumps:5.1f}%{extra}")
+        result[s.name] = cv
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--traces", nargs="+", choices=("steady", "usb", "espnow"),
+                        default=["steady", "usb", "espnow"])
+    parser.add_argument("--rate", type=float, default=1000.0, help="samples per second")
+    parser.add_argument("--seconds", type=float, default=4.0)
+    parser.add_argument("--fps", type=float, default=60.0)
+    parser.add_argument("--format", choices=("text", "binary"), default="text")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    from app import serial_reader
+    failures = 0
+    for trace in args.traces:
+        cv = run(trace, args, serial_reader)
+        if trace != "steady" and not cv.get("p95", 1e9) < cv.get("off", 0.0):
+            print(f"FAIL {trace}: the adaptive buffer was not smoother than none")
+            failures += 1
+    sys.exit(failures)
+
+
+if __name__ == "__main__":
+    main()
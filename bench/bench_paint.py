@@ -0,0 +1,94 @@
+"""Per-frame paint cost of the laser dot, old vs cached sprite.
+
+Usage:
+    python bench/bench_paint.py [--width 3840] [--height 2160] [--frames 2000] [--dpr 1 2]
+
+Paints a moving dot into a full-screen ARGB32 image the way the overlays
+do under a compositor (clear the damaged area, then draw the dot):
+
+    old     full-screen clear + per-frame gradient/ellipse painting
+            (app.py's glow, test1.py's solid dot)
+    sprite  clear only the old and new dot rects + one drawPixmap of the
+            cached sprite (airmouse.sprites)
+
+Runs under the Qt offscreen platform, so no display is needed.
+"""
+import os
+import sys
+import time
+import math
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+from airmouse.sprites import SpriteCache, DotDamage, sprite_rect, _PAINTERS
+from airmouse.stats import LatencyLog
+
+RADIUS = {"glow": 25, "dot": 12}
+
+
+def path(i, width, height):
+    a = i * 0.01
+    return width / 2 + width / 3 * math.cos(a), height / 2 + height / 3 * math.sin(1.3 * a)
+
+
+def old_frame(painter, image, style, x, y):
+    painter.setCompositionMode(QtGui.QPainter.CompositionMode_Source)
+    painter.fillRect(image.rect(), QtCore.Qt.transparent)
+    painter.setCompositionMode(QtGui.QPainter.CompositionMode_SourceOver)
+    painter.setRenderHint(QtGui.QPainter.Antialiasing)
+    _PAINTERS[style](painter, QtCore.QPointF(x, y), RADIUS[style])
+
+
+def sprite_frame(painter, image, style, x, y, sprites, damage, dpr):
+    rect = sprite_rect(x, y, RADIUS[style])
+    region = damage.move(rect)
+    painter.setCompositionMode(QtGui.QPainter.CompositionMode_Source)
+    for r in region.rects():
+        painter.fillRect(r, QtCore.Qt.transparent)
+    painter.setCompositionMode(QtGui.QPainter.CompositionMode_SourceOver)
+    painter.drawPixmap(rect.topLeft(), sprites.get(style, RADIUS[style], dpr))
+
+
+def run(style, variant, dpr, args):
+    image = QtGui.QImage(int(args.width * dpr), int(args.height * dpr),
+                         QtGui.QImage.Format_ARGB32_Premultiplied)
+    image.setDevicePixelRatio(dpr)
+    image.fill(QtCore.Qt.transparent)
+    sprites = SpriteCache()
+    damage = DotDamage()
+    log = LatencyLog()
+    for i in range(args.frames):
+        x, y = path(i, args.width, args.height)
+        t0 = time.perf_counter()
+        painter = QtGui.QPainter(image)
+        if variant == "old":
+            old_frame(painter, image, style, x, y)
+        else:
+            sprite_frame(painter, image, style, x, y, sprites, damage, dpr)
+        painter.end()
+        log.add(time.perf_counter() - t0)
+    return log
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--dpr", nargs="+", type=float, default=[1.0])
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication(sys.argv)  # noqa: F841 - pixmaps need it
+    for dpr in args.dpr:
+        for style in RADIUS:
+            for variant in ("old", "sprite"):
+                label = f"{style:<5} {variant:<6} {args.width}x{args.height} @{dpr:g}x"
+                print(run(style, variant, dpr, args).summary(label))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""End-to-end serial-to-overlay benchmark without the ESP32 dongle.
+
+Usage:
+    python bench/bench_pipeline.py [--target app test1] [--rates 100 500 1000 2000 5000]
+                                   [--seconds 3] [--wakeup event|timer]
+
+For every target and rate a pty pair stands in for the dongle: a writer
+thread feeds ``RX -> X: .. | Buttons: ..`` lines into the master side and
+the target's own serial_reader reads the slave side, feeding its
+OverlayWindow under the Qt offscreen platform. The X field of every line
+carries its sequence number, so each state update can be matched to the
+moment its line was written.
+
+Reported per rate: line-to-state-update latency p50/p95/p99, the fraction
+of lines that reached the overlay, GUI tick duration and process CPU per
+line. With --press-every N, button 0 is pressed for one line out of every
+N (slide key in both overlays) and OS injection is replaced by a stand-in
+that sleeps --inject-cost ms, pyautogui's default PAUSE, so the tick
+columns show whether injection still blocks the GUI thread.
+
+The maximum sustainable rate is the highest rate where the reader kept up
+(>= 99% of lines decoded) and p99 latency stayed under --budget ms.
+
+pyautogui is never loaded: nothing is injected without --press-every,
+and with it the stand-in takes its place.
+"""
+import os
+import sys
+import tty
+import time
+import argparse
+import importlib
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtCore, QtWidgets
+
+from airmouse import injection
+from airmouse.mailbox import SampleMailbox
+from airmouse.stats import LatencyLog, percentile
+
+CONSUMER = {"app": "process_data", "test1": "process_data"}
+
+
+class ProbeMailbox(SampleMailbox):
+    """Remembers the last pose handed to the overlay."""
+
+    last_taken = None
+
+    def take(self):
+        latest, edges = super().take()
+        if latest is not None:
+            self.last_taken = latest
+        return latest, edges
+
+    def take_batch(self):
+        samples, edges = super().take_batch()
+        if samples:
+            self.last_taken = samples[-1]
+        return samples, edges
+
+
+class InjectionStandIn:
+    """Replaces the target's pyautogui so benchmarks never press real keys."""
+
+    def __init__(self, cost):
+        self.cost = cost
+        self.calls = 0
+
+    def _inject(self, *args, **kwargs):
+        self.calls += 1
+        time.sleep(self.cost)
+
+    press = click = moveTo = mouseDown = mouseUp = _inject
+
+    def position(self):
+        return QtCore.QPoint(0, 0)
+
+
+def feeder(fd, rate, seconds, sent_at, stop, press_every=0):
+    per_burst = max(1, int(round(rate / 1000)))
+    period = per_burst / rate
+    seq = 0
+    t_next = time.perf_counter()
+    t_end = t_next + seconds
+    while not stop.is_set() and t_next < t_end:
+        lines = []
+        now = time.monotonic()
+        for _ in range(per_burst):
+            sent_at.append(now)
+            b0 = 1 if press_every and seq % press_every == 0 else 0
+            lines.append(f"RX -> X: {seq} Y: 1.50 Z: -2.25 | Buttons: {b0} 0 0 0\r\n")
+            seq += 1
+        os.write(fd, "".join(lines).encode())
+        t_next += period
+        delay = t_next - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def make_probe(module, consumer):
+    base = module.OverlayWindow
+
+    class Probe(base):
+        def __init__(self, *args, **kwargs):
+            self.latency_probe = LatencyLog()
+            self.tick_times = LatencyLog()
+            self.sent_at = []
+            self.probe_mailbox = args[0]
+            super().__init__(*args, **kwargs)
+
+        def _probe_tick(self):
+            t0 = time.perf_counter()
+            getattr(base, consumer)(self)
+            self.tick_times.add(time.perf_counter() - t0)
+            sample = self.probe_mailbox.last_taken
+            if sample is not None:
+                self.probe_mailbox.last_taken = None
+                seq = int(sample["raw"][0])
+                self.latency_probe.add(time.monotonic() - self.sent_at[seq])
+
+    setattr(Probe, consumer, Probe._probe_tick)
+    return Probe
+
+
+def run_one(app, name, rate, args):
+    module = importlib.import_module(name)
+    consumer = CONSUMER[name]
+    master, slave = os.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+
+    mailbox = ProbeMailbox()
+    stop_reader = threading.Event()
+    reader = threading.Thread(target=module.serial_reader,
+                              args=(os.ttyname(slave), 115200, mailbox, stop_reader, "text"),
+                              daemon=True)
+    reader.start()
+
+    stand_in = None
+    if args.press_every:
+        stand_in = InjectionStandIn(args.inject_cost / 1e3)
+        injection._pyautogui = stand_in
+
+    window = make_probe(module, consumer)(mailbox, wakeup=args.wakeup)
+    # app.py only sends slide keys while the laser is off; it keeps laser
+    # state per remote.
+    for pointer in getattr(window, "remotes", [window]):
+        pointer.laser_on = not (args.press_every and name == "app")
+    window.show()
+    sent_at = window.sent_at
+
+    stop_feed = threading.Event()
+    feed = threading.Thread(target=feeder, args=(master, rate, args.seconds, sent_at, stop_feed,
+                                                 args.press_every))
+    cpu0 = time.process_time()
+    feed.start()
+    QtCore.QTimer.singleShot(int(args.seconds * 1000) + 200, app.quit)
+    app.exec_()
+    stop_feed.set()
+    feed.join()
+    cpu = time.process_time() - cpu0
+    stop_reader.set()
+    reader.join(timeout=1.0)
+    window.close()
+    window.deleteLater()
+    if stand_in is not None:
+        print(f"       {stand_in.calls} injected key presses")
+    os.close(master)
+    os.close(slave)
+
+    lat = sorted(window.latency_probe.values)
+    ticks = sorted(window.tick_times.values)
+    sent = len(sent_at)
+    decoded = mailbox.published
+    p = [percentile(lat, q) * 1e3 for q in (50, 95, 99)]
+    ok = decoded >= 0.99 * sent and p[2] <= args.budget
+    print(f"{name:<6} {rate:>6.0f} Hz  lat p50 {p[0]:7.2f}  p95 {p[1]:7.2f}  p99 {p[2]:7.2f} ms  "
+          f"decoded {100.0 * decoded / max(sent, 1):5.1f}%  tick p99 {percentile(ticks, 99) * 1e3:6.2f} "
+          f"max {(ticks[-1] if ticks else 0) * 1e3:6.2f} ms  CPU {cpu / max(sent, 1) * 1e6:6.1f} us/line"
+          f"  {'ok' if ok else 'BACKLOG'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", nargs="+", choices=sorted(CONSUMER), default=["app", "test1"])
+    parser.add_argument("--rates", nargs="+", type=float, default=[100, 500, 1000, 2000, 5000])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--wakeup", choices=("event", "timer"), default="event")
+    parser.add_argument("--budget", type=float, default=50.0, help="p99 latency budget in ms")
+    parser.add_argument("--press-every", type=int, default=0, metavar="N",
+                        help="press button 0 on every Nth line (0 = never)")
+    parser.add_argument("--inject-cost", type=float, default=100.0, metavar="MS",
+                        help="simulated cost of one injected input event")
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication(sys.argv)
+    for name in args.target:
+        best = None
+        for rate in args.rates:
+            if run_one(app, name, rate, args):
+                best = rate
+        print(f"{name}: max sustainable rate {best if best is not None else 'none'} Hz")
+
+
+if __name__ == "__main__":
+    main()
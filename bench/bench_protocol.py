@@ -0,0 +1,89 @@
+"""Decode throughput: RX_PATTERN text lines vs packed binary frames.
+
+Usage:
+    python bench/bench_protocol.py [--samples 200000] [--chunk 64]
+
+The "legacy" row repeats what serial_reader did per line before binary
+frames existed (decode, strip, regex, seven conversions); the other rows go
+through FrameDecoder with the stream cut into --chunk sized reads.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airmouse.protocol import RX_PATTERN, FRAME_SIZE, FrameDecoder, pack_frame
+
+
+def make_streams(n):
+    rnd = random.Random(1)
+    lines = []
+    frames = []
+    for i in range(n):
+        x, y, z = (rnd.uniform(-8, 8) for _ in range(3))
+        b = tuple(rnd.randint(0, 1) for _ in range(4))
+        lines.append(f"RX -> X: {x:.2f} Y: {y:.2f} Z: {z:.2f} | Buttons: {b[0]} {b[1]} {b[2]} {b[3]}\r\n".encode())
+        frames.append(pack_frame(i, i * 1000, x, y, z, b))
+    return lines, b"".join(frames)
+
+
+def legacy(lines):
+    out = 0
+    for raw in lines:
+        line = raw.decode('utf-8', errors='ignore').strip()
+        m = RX_PATTERN.search(line)
+        if m:
+            x_val = float(m.group(1))
+            y_val = float(m.group(2))
+            z_val = float(m.group(3))
+            buttons = tuple(int(m.group(i)) for i in range(4, 8))
+            out += 1
+    return out
+
+
+def decoder_text(lines):
+    dec = FrameDecoder("text")
+    return sum(len(dec.feed(raw)) for raw in lines)
+
+
+def decoder_binary(blob, chunk):
+    dec = FrameDecoder("binary")
+    step = FRAME_SIZE * chunk
+    return sum(len(dec.feed(blob[i:i + step])) for i in range(0, len(blob), step))
+
+
+def decoder_auto(blob, chunk):
+    dec = FrameDecoder("auto")
+    step = FRAME_SIZE * chunk
+    return sum(len(dec.feed(blob[i:i + step])) for i in range(0, len(blob), step))
+
+
+def run(name, fn, *args):
+    t0 = time.perf_counter()
+    n = fn(*args)
+    dt = time.perf_counter() - t0
+    print(f"{name:<28} {n:>8} samples  {dt * 1e3:8.1f} ms  {n / dt / 1e3:8.1f} k samples/s  "
+          f"{dt / n * 1e6:6.2f} us/sample")
+    return dt
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=200000)
+    parser.add_argument("--chunk", type=int, default=64, help="frames per read() in the binary runs")
+    args = parser.parse_args()
+
+    lines, blob = make_streams(args.samples)
+    print(f"text: {sum(map(len, lines)) / len(lines):.1f} bytes/sample, binary: {FRAME_SIZE} bytes/sample")
+    base = run("legacy readline + regex", legacy, lines)
+    run("FrameDecoder text", decoder_text, lines)
+    dt = run("FrameDecoder binary", decoder_binary, blob, args.chunk)
+    run("FrameDecoder auto->binary", decoder_auto, blob, args.chunk)
+    print(f"binary speedup over legacy text path: {base / dt:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
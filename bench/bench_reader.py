@@ -0,0 +1,146 @@
+"""Serial reader throughput over a pty: readline() per line vs chunked reads.
+
+Usage:
+    python bench/bench_reader.py [--lines 100000] [--rate 0] [--format text|csv|binary]
+
+A writer thread plays the dongle on the master side of a pty; the reader
+opens the slave with pyserial exactly like serial_reader does. --rate 0
+writes as fast as the pty accepts (throughput), a positive rate paces the
+writer in 1 ms bursts (CPU cost at a realistic device rate).
+"""
+import os
+import sys
+import tty
+import time
+import queue
+import random
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serial
+
+from airmouse.protocol import RX_PATTERN, FrameDecoder, pack_frame
+from airmouse.serial_io import ChunkReader
+
+
+def make_records(n, fmt):
+    rnd = random.Random(2)
+    out = []
+    for i in range(n):
+        x, y, z = (rnd.uniform(-8, 8) for _ in range(3))
+        b = tuple(rnd.randint(0, 1) for _ in range(4))
+        if fmt == "binary":
+            out.append(pack_frame(i, i * 1000, x, y, z, b))
+        elif fmt == "csv":
+            out.append(f"{x:.2f},{y:.2f},{z:.2f},{b[0]},{b[1]},{b[2]},{b[3]}\r\n".encode())
+        else:
+            out.append(f"RX -> X: {x:.2f} Y: {y:.2f} Z: {z:.2f} | Buttons: {b[0]} {b[1]} {b[2]} {b[3]}\r\n".encode())
+    return out
+
+
+def legacy_reader(ser, q, total, done, stats):
+    # The pre-ChunkReader loop: readline, decode, regex, one put per line.
+    t_cpu = time.thread_time()
+    n = 0
+    while n < total and not done.is_set():
+        line = ser.readline().decode('utf-8', errors='ignore').strip()
+        if not line:
+            continue
+        m = RX_PATTERN.search(line)
+        if m:
+            x_val = float(m.group(1))
+            y_val = float(m.group(2))
+            z_val = float(m.group(3))
+            buttons = tuple(int(m.group(i)) for i in range(4, 8))
+            q.put(("DATA", {"x": z_val, "y": y_val, "buttons": buttons}))
+            n += 1
+            continue
+        parts = [p.strip() for p in line.split(",") if p.strip() != ""]
+        if len(parts) >= 7:
+            xv = float(parts[0]); yv = float(parts[1]); zv = float(parts[2])
+            b = (int(parts[3]), int(parts[4]), int(parts[5]), int(parts[6]))
+            q.put(("DATA", {"x": zv, "y": yv, "buttons": b}))
+            n += 1
+    stats["samples"] = n
+    stats["cpu"] = time.thread_time() - t_cpu
+
+
+def chunk_reader(ser, q, total, done, stats):
+    t_cpu = time.thread_time()
+    decoder = FrameDecoder("auto", csv_fallback=True)
+    reader = ChunkReader(ser)
+    n = 0
+    while n < total and not done.is_set():
+        chunk = reader.read()
+        if not chunk:
+            continue
+        samples = decoder.feed(chunk)
+        if samples:
+            q.put(("BATCH", samples))
+            n += len(samples)
+    stats["samples"] = n
+    stats["cpu"] = time.thread_time() - t_cpu
+    stats["reads"] = reader.reads
+
+
+def writer(fd, records, rate):
+    if rate <= 0:
+        blob = b"".join(records)
+        view = memoryview(blob)
+        while view:
+            view = view[os.write(fd, view[:4096]):]
+        return
+    per_ms = max(1, int(rate / 1000))
+    t_next = time.perf_counter()
+    for i in range(0, len(records), per_ms):
+        os.write(fd, b"".join(records[i:i + per_ms]))
+        t_next += per_ms / rate
+        delay = t_next - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def run(name, target, records, rate):
+    master, slave = os.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    ser = serial.Serial(os.ttyname(slave), 115200, timeout=0.5)
+    q = queue.Queue()
+    done = threading.Event()
+    stats = {}
+    rt = threading.Thread(target=target, args=(ser, q, len(records), done, stats))
+    wt = threading.Thread(target=writer, args=(master, records, rate))
+    t0 = time.perf_counter()
+    rt.start()
+    wt.start()
+    wt.join()
+    rt.join(timeout=30)
+    done.set()
+    rt.join()
+    dt = time.perf_counter() - t0
+    ser.close()
+    os.close(master)
+    os.close(slave)
+    n = stats["samples"]
+    extra = f"  {n / stats['reads']:.1f} lines/read" if "reads" in stats else ""
+    print(f"{name:<10} {n:>8} lines  {n / dt:10.0f} lines/s  CPU {100 * stats['cpu'] / dt:5.1f}%  "
+          f"{stats['cpu'] / max(n, 1) * 1e6:6.2f} us CPU/line  {q.qsize()} puts{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=100000)
+    parser.add_argument("--rate", type=float, default=0, help="lines per second, 0 = unthrottled")
+    parser.add_argument("--format", choices=("text", "csv", "binary"), default="text")
+    args = parser.parse_args()
+
+    records = make_records(args.lines, args.format)
+    if args.format != "binary":
+        run("readline", legacy_reader, records, args.rate)
+    run("chunked", chunk_reader, records, args.rate)
+
+
+if __name__ == "__main__":
+    main()
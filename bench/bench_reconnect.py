@@ -0,0 +1,148 @@
+"""Hot-plug recovery benchmark: tear the "dongle" down and bring it back.
+
+Usage:
+    python bench/bench_reconnect.py [--target app|test1] [--cycles 10] [--gap 200]
+
+A pty stands in for the dongle behind a stable symlink (like a udev
+/dev/serial/by-id name). The target's own serial_reader is started on the
+symlink, fed ``RX -> ...`` lines, and then repeatedly unplugged: master
+and slave are closed (the reader sees the same EIO as a yanked USB
+adapter), nothing exists for --gap ms (re-enumeration), and a fresh pty is
+linked in its place.
+
+Reported per cycle and as p50/max:
+
+    reconnect  link lost -> port reopened, as measured by PortSupervisor
+    recovery   unplug -> first sample from the new pty in the mailbox, minus
+               the --gap during which there was nothing to connect to
+
+On Linux pyautogui needs an X display at import time; run under xvfb-run
+if there is none.
+"""
+import os
+import sys
+import tty
+import time
+import argparse
+import tempfile
+import importlib
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airmouse.mailbox import SampleMailbox
+from airmouse.metrics import PipelineMetrics
+from airmouse.stats import LatencyLog
+
+
+class Dongle:
+    """A pty behind a symlink, fed at a fixed line rate."""
+
+    def __init__(self, link, rate):
+        self.link = link
+        self.rate = rate
+        self.seq = 0
+        self.master = self.slave = None
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.plug()
+        threading.Thread(target=self._feed, daemon=True).start()
+
+    def plug(self):
+        master, slave = os.openpty()
+        tty.setraw(master)
+        tty.setraw(slave)
+        tmp = self.link + ".new"
+        os.symlink(os.ttyname(slave), tmp)
+        os.replace(tmp, self.link)
+        with self.lock:
+            self.master, self.slave = master, slave
+            return self.seq
+
+    def unplug(self):
+        with self.lock:
+            master, slave = self.master, self.slave
+            self.master = self.slave = None
+        os.unlink(self.link)
+        os.close(master)
+        os.close(slave)
+
+    def _feed(self):
+        period = 1.0 / self.rate
+        while not self.stop.is_set():
+            with self.lock:
+                if self.master is not None:
+                    line = f"RX -> X: {self.seq} Y: 1.50 Z: -2.25 | Buttons: 0 0 0 0\r\n"
+                    try:
+                        os.write(self.master, line.encode())
+                        self.seq += 1
+                    except OSError:
+                        pass
+            time.sleep(period)
+
+
+def wait_for_seq(mailbox, first, timeout):
+    t_end = time.monotonic() + timeout
+    while time.monotonic() < t_end:
+        latest, _ = mailbox.take()
+        if latest is not None and latest["raw"][0] >= first:
+            return time.monotonic()
+        time.sleep(0.0005)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=("app", "test1"), default="test1")
+    parser.add_argument("--cycles", type=int, default=10)
+    parser.add_argument("--gap", type=float, default=200.0, metavar="MS",
+                        help="time the device is absent before it reappears")
+    parser.add_argument("--rate", type=float, default=500.0, help="lines per second")
+    parser.add_argument("--budget", type=float, default=1000.0, metavar="MS",
+                        help="recovery target")
+    args = parser.parse_args()
+
+    module = importlib.import_module(args.target)
+    link = os.path.join(tempfile.mkdtemp(prefix="airmouse-"), "dongle")
+    dongle = Dongle(link, args.rate)
+    mailbox = SampleMailbox()
+    metrics = PipelineMetrics()
+    stop = threading.Event()
+    reader = threading.Thread(target=module.serial_reader,
+                              args=(link, 115200, mailbox, stop, "text", None, metrics), daemon=True)
+    reader.start()
+    if wait_for_seq(mailbox, 0, 5.0) is None:
+        sys.exit("reader never delivered a sample")
+
+    recovery = LatencyLog()
+    reconnect = metrics.stages["reconnect"]
+    for cycle in range(args.cycles):
+        time.sleep(0.3)
+        t_down = time.monotonic()
+        dongle.unplug()
+        time.sleep(args.gap / 1e3)
+        first = dongle.plug()
+        t_up = wait_for_seq(mailbox, first, 5.0)
+        if t_up is None:
+            print(f"cycle {cycle + 1}: no sample within 5 s")
+            continue
+        took = t_up - t_down - args.gap / 1e3
+        recovery.add(took)
+        print(f"cycle {cycle + 1:>2}: recovered {took * 1e3:7.1f} ms after the device reappeared "
+              f"({reconnect.count} reconnects so far)")
+
+    stop.set()
+    dongle.stop.set()
+    reader.join(timeout=2.0)
+    for kind, text in mailbox.take_messages():
+        if not any(word in text for word in ("Reconnected", "reconnecting", "retrying")):
+            print(f"[{kind}]", text)
+    print(recovery.summary("recovery"))
+    print(f"reconnect: n={reconnect.count} mean={reconnect.sum / max(reconnect.count, 1) * 1e3:.1f} ms "
+          f"(includes the {args.gap:.0f} ms gap)")
+    worst = max(recovery.values, default=float("inf")) * 1e3
+    print(f"worst recovery {worst:.1f} ms: {'ok' if worst <= args.budget else 'OVER BUDGET'}")
+
+
+if __name__ == "__main__":
+    main()
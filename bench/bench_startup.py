@@ -0,0 +1,78 @@
+"""Import-time startup cost of the entry points, against a budget.
+
+Usage:
+    python bench/bench_startup.py [--runs 5] [--budget 250] [--top 8]
+
+Each target is imported in a fresh interpreter under ``python -X importtime``
+--runs times; the best run's cumulative import time is reported with the
+heaviest modules it pulled in. app.py, test1.py and airmouse.headless must
+also stay clear of the GUI and injection stacks (PyQt5, pyautogui) and the
+stats endpoint (http.server) until they are used. The exit status is the number
+of targets over --budget ms or loading something they should not.
+
+The budget covers imports only; the interpreter's own startup (about
+10-20 ms) and the Qt/pyautogui loading deferred to main() are not in it.
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# target -> top-level modules it must not import
+TARGETS = {
+    "app": ("PyQt5", "pyautogui", "http"),
+    "airmouse.headless": ("PyQt5", "pyautogui", "http"),
+    "test1": ("PyQt5", "pyautogui", "http"),
+}
+
+
+def import_times(module):
+    """[(cumulative us, depth, name)] of one fresh `import module`."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(cumulative), depth, name.strip()))
+    # Keep the target's own subtree, not what the interpreter imported
+    # before it (the target is the last line, its children precede it).
+    start = len(rows) - 1
+    while start > 0 and rows[start - 1][1] > 0:
+        start -= 1
+    return rows[start:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", nargs="+", choices=sorted(TARGETS), default=list(TARGETS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=250.0, help="import budget in ms")
+    parser.add_argument("--top", type=int, default=8, help="heaviest direct imports to list")
+    args = parser.parse_args()
+
+    failures = 0
+    for target in args.target:
+        runs = [import_times(target) for _ in range(args.runs)]
+        best = min(runs, key=lambda rows: rows[-1][0])
+        total = best[-1][0] / 1e3
+        loaded = {name.split(".")[0] for _, _, name in best}
+        leaked = [m for m in TARGETS[target] if m in loaded]
+        ok = total <= args.budget and not leaked
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {target:<18} {total:7.1f} ms "
+              f"(budget {args.budget:.0f}, {len(best)} modules)"
+              + (f"  loads {', '.join(leaked)}" if leaked else ""))
+        # The target's own imports (depth 1), heaviest first.
+        direct = sorted((row for row in best if row[1] == 1), reverse=True)[:args.top]
+        for cumulative, _, name in direct:
+            print(f"       {cumulative / 1e3:7.1f} ms  {name}")
+    sys.exit(failures)
+
+
+if __name__ == "__main__":
+    main()
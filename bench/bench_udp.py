@@ -0,0 +1,144 @@
+"""Latency and loss of UDP ingest against the serial path over a pty.
+
+Usage:
+    python bench/bench_udp.py [--rates 200 1000 2000] [--seconds 3] [--format text|binary]
+                              [--per-packet 1]
+
+For each rate the same stream of samples is sent twice from a feeder
+thread:
+
+    serial   ``RX -> ...`` lines (or binary frames) written to a pty master,
+             read by app.serial_reader from the slave side
+    udp      the same samples as datagrams to a UdpReceiver on 127.0.0.1,
+             --per-packet samples per datagram
+
+The raw X field carries each sample's number, so its send time is known;
+the sink notes when each batch is handed on. Reported: delivered
+fraction, send-to-sink latency p50/p95/p99/max and, for UDP, late and lost
+counts.
+
+A pty has no USB in it: the serial numbers are the host-side cost only. A
+real dongle adds its USB-CDC polling and buffering (typically 1-16 ms) on
+top, which is what the UDP path leaves out. The exit status is the number
+of runs that delivered less than 99% of the samples.
+"""
+import os
+import sys
+import tty
+import time
+import socket
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airmouse.protocol import pack_frame
+from airmouse.stats import percentile
+from airmouse.udp import UdpReceiver
+
+
+class ProbeSink:
+    """Stands in for the mailbox: records when each sample arrives."""
+
+    def __init__(self, n):
+        self.arrived = [None] * n
+
+    def put(self, item):
+        kind, payload = item
+        if kind != "BATCH":
+            return
+        now = time.monotonic()
+        arrived = self.arrived
+        for sample in payload:
+            i = int(round(sample["raw"][0]))
+            if 0 <= i < len(arrived) and arrived[i] is None:
+                arrived[i] = now
+
+
+def encode(i, fmt):
+    if fmt == "binary":
+        return pack_frame(i, int(i * 1e3), float(i), 0.5, -0.5, (0, 0, 0, 0))
+    return f"RX -> X: {i} Y: 0.50 Z: -0.50 | Buttons: 0 0 0 0 | Seq: {i & 0xFFFF}\n".encode()
+
+
+def feed(write, n, rate, per_packet, fmt, sent):
+    period = per_packet / rate
+    start = time.perf_counter()
+    for first in range(0, n, per_packet):
+        delay = start + (first // per_packet) * period - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        chunk = range(first, min(first + per_packet, n))
+        now = time.monotonic()
+        for i in chunk:
+            sent[i] = now
+        write(b"".join(encode(i, fmt) for i in chunk))
+
+
+def report(path, rate, sent, sink, extra=""):
+    lat = sorted(a - s for a, s in zip(sink.arrived, sent) if a is not None and s is not None)
+    delivered = len(lat) / max(len(sent), 1)
+    print(f"{path:<6} {rate:6.0f} Hz  delivered {100 * delivered:5.1f}%  latency p50 "
+          f"{percentile(lat, 50) * 1e3:6.3f}  p95 {percentile(lat, 95) * 1e3:6.3f}  "
+          f"p99 {percentile(lat, 99) * 1e3:6.3f}  max {(lat[-1] if lat else 0) * 1e3:6.2f} ms{extra}")
+    return delivered >= 0.99
+
+
+def run_serial(rate, args, serial_reader):
+    n = int(rate * args.seconds)
+    master, slave = os.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    sink = ProbeSink(n)
+    stop = threading.Event()
+    reader = threading.Thread(target=serial_reader,
+                              args=(os.ttyname(slave), 115200, sink, stop, args.format), daemon=True)
+    reader.start()
+    time.sleep(0.3)
+    sent = [None] * n
+    feed(lambda data: os.write(master, data), n, rate, args.per_packet, args.format, sent)
+    time.sleep(0.2)
+    stop.set()
+    reader.join(timeout=1.0)
+    os.close(master)
+    os.close(slave)
+    return report("serial", rate, sent, sink)
+
+
+def run_udp(rate, args):
+    n = int(rate * args.seconds)
+    sink = ProbeSink(n)
+    stop = threading.Event()
+    receiver = UdpReceiver(("127.0.0.1", 0), sink, stop, frame_mode=args.format)
+    thread = threading.Thread(target=receiver.run, daemon=True)
+    thread.start()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sent = [None] * n
+    feed(lambda data: sock.sendto(data, receiver.address), n, rate, args.per_packet, args.format, sent)
+    time.sleep(0.2)
+    stop.set()
+    thread.join(timeout=1.0)
+    sock.close()
+    seq = receiver.seq
+    return report("udp", rate, sent, sink, f"  ({seq.late} late, {seq.lost} lost)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rates", nargs="+", type=float, default=[200, 1000, 2000])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--format", choices=("text", "binary"), default="text")
+    parser.add_argument("--per-packet", type=int, default=1,
+                        help="samples per datagram (and per pty write)")
+    args = parser.parse_args()
+
+    from app import serial_reader
+    failures = 0
+    for rate in args.rates:
+        failures += not run_serial(rate, args, serial_reader)
+        failures += not run_udp(rate, args)
+    sys.exit(failures)
+
+
+if __name__ == "__main__":
+    main()
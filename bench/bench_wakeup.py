@@ -0,0 +1,92 @@
+"""Sample-to-GUI dispatch latency: QTimer polling vs event-driven wakeup.
+
+Usage:
+    python bench/bench_wakeup.py [--rate 200] [--seconds 5] [--period 16]
+
+A producer thread publishes samples into a SampleMailbox at --rate Hz (with
+an idle gap in the middle); the GUI side is a bare slot on a Qt event loop
+under the offscreen platform, so only the dispatch strategy is measured.
+For the real overlays use --latency-stats on app.py / test1.py.
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtCore, QtWidgets
+
+from airmouse.mailbox import SampleMailbox
+from airmouse.protocol import make_sample
+from airmouse.qt_wakeup import QtWaker
+from airmouse.stats import LatencyLog
+
+
+def producer(mailbox, rate, seconds, stop):
+    period = 1.0 / rate
+    t_next = time.perf_counter()
+    t_end = t_next + seconds
+    t_gap = (t_next + seconds / 2, t_next + seconds / 2 + 1.0)
+    while not stop.is_set() and t_next < t_end:
+        now = time.perf_counter()
+        if not t_gap[0] <= now < t_gap[1]:
+            mailbox.put(("DATA", make_sample(0.0, 1.0, 2.0, (0, 0, 0, 0))))
+        t_next += period
+        delay = t_next - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def run(app, strategy, args):
+    mailbox = SampleMailbox()
+    log = LatencyLog()
+    calls = [0, 0]
+
+    def tick():
+        calls[0] += 1
+        latest, _ = mailbox.take()
+        if latest is None:
+            calls[1] += 1
+            return
+        log.add(time.monotonic() - latest["t"])
+
+    holder = QtCore.QObject()
+    if strategy == "timer":
+        timer = QtCore.QTimer(holder)
+        timer.timeout.connect(tick)
+        timer.start(args.period)
+    else:
+        waker = QtWaker(tick, holder)
+        mailbox.set_waker(waker.wake.emit)
+
+    stop = threading.Event()
+    t = threading.Thread(target=producer, args=(mailbox, args.rate, args.seconds, stop))
+    cpu0 = time.process_time()
+    t.start()
+    QtCore.QTimer.singleShot(int(args.seconds * 1000) + 100, app.quit)
+    app.exec_()
+    stop.set()
+    t.join()
+    cpu = time.process_time() - cpu0
+    print(log.summary(f"{strategy:<6}"))
+    print(f"       GUI wakeups {calls[0]} ({calls[1]} found nothing), process CPU {cpu:.2f} s")
+    holder.deleteLater()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=200)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--period", type=int, default=16, help="polling period in ms for the timer run")
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication(sys.argv)
+    for strategy in ("timer", "event"):
+        run(app, strategy, args)
+
+
+if __name__ == "__main__":
+    main()
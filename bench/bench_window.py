@@ -0,0 +1,104 @@
+"""Full-screen overlay vs sprite window: per-frame cost of showing the dot.
+
+Usage:
+    python bench/bench_window.py [--frames 600] [--screens all|primary] [--radius 25]
+
+For each window mode a bare overlay (same flags, DotView and SpriteCache
+as the scripts) moves the dot along a path for --frames frames, one
+repaint + event-loop pass per frame. Reported per mode:
+
+    surface   pixels of the translucent window the compositor blends on
+              every frame it presents (the full-screen overlay is one
+              ARGB surface the size of the desktop area)
+    frame     GUI-thread time per frame, p50/p99
+    CPU       process CPU per frame
+
+Run it on the target desktop to measure the real window system; without
+a display on Linux it falls back to the Qt offscreen platform, where only
+the Qt side (backing store, region flushes, window moves) is measured.
+"""
+import os
+import sys
+import math
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if sys.platform.startswith("linux") and not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+from airmouse.desktop import AREAS, DesktopGeometry
+from airmouse.sprites import WINDOW_MODES, SpriteCache, DotView
+from airmouse.stats import LatencyLog
+
+
+class BenchOverlay(QtWidgets.QWidget):
+    def __init__(self, mode, radius, screens):
+        flags = QtCore.Qt.FramelessWindowHint | QtCore.Qt.WindowStaysOnTopHint | QtCore.Qt.Tool
+        super().__init__(flags=flags)
+        self.setAttribute(QtCore.Qt.WA_TranslucentBackground)
+        self.setAttribute(QtCore.Qt.WA_TransparentForMouseEvents)
+        self.radius = radius
+        self.desktop = DesktopGeometry(screens, self)
+        self.view = DotView(self, mode, radius, self.desktop)
+        self.sprites = SpriteCache()
+        self.lx, self.ly = self.desktop.center
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        sprite = self.sprites.get("glow", self.radius, self.devicePixelRatioF())
+        painter.drawPixmap(self.view.sprite_pos(self.lx, self.ly), sprite)
+        painter.end()
+
+
+def run(app, mode, args):
+    window = BenchOverlay(mode, args.radius, args.screens)
+    window.show()
+    app.processEvents()
+    rect = window.desktop.rect
+    frames = LatencyLog()
+    repainted = 0
+    cpu0 = time.process_time()
+    for i in range(args.frames):
+        a = i * 0.02
+        window.lx = int(rect.x() + rect.width() * (0.5 + 0.35 * math.cos(a)))
+        window.ly = int(rect.y() + rect.height() * (0.5 + 0.35 * math.sin(1.3 * a)))
+        t0 = time.perf_counter()
+        region = window.view.move(window.lx, window.ly, True)
+        if not region.isEmpty():
+            window.repaint(region)
+            repainted += sum(r.width() * r.height() for r in region.rects())
+        app.processEvents()
+        frames.add(time.perf_counter() - t0)
+    cpu = time.process_time() - cpu0
+    dpr = window.devicePixelRatioF()
+    surface = int(window.width() * window.height() * dpr * dpr)
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+
+    values = sorted(frames.values)
+    p50 = values[len(values) // 2] * 1e3
+    p99 = values[min(len(values) - 1, int(len(values) * 0.99))] * 1e3
+    print(f"{mode:<6} surface {surface:>10,d} px  repainted {repainted // args.frames:>6,d} px/frame  "
+          f"frame p50 {p50:6.3f}  p99 {p99:6.3f} ms  CPU {cpu / args.frames * 1e3:6.3f} ms/frame")
+    return surface
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--screens", choices=AREAS, default="all")
+    parser.add_argument("--radius", type=int, default=25)
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication(sys.argv)
+    print(f"platform {app.platformName()}, desktop {DesktopGeometry(args.screens).describe()}")
+    surfaces = {mode: run(app, mode, args) for mode in WINDOW_MODES}
+    print(f"sprite window blends {surfaces['full'] / surfaces['sprite']:.0f}x fewer pixels per frame")
+
+
+if __name__ == "__main__":
+    main()
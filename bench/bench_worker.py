@@ -0,0 +1,239 @@
+"""Pointer latency under GUI load: in-process pipeline against --worker.
+
+Usage:
+    python bench/bench_worker.py [--loads none frames stalls] [--rate 1000] [--seconds 4]
+
+A pty stands in for the dongle. A separate feeder process writes --rate
+samples per second into it, so the writer keeps time whatever the GUI
+does. The samples go to app.py's overlay under the Qt offscreen platform,
+read in one of two ways:
+
+    inproc   app.serial_reader on a thread of the GUI process, the overlay
+             running Remote.update() on the GUI thread (app.py's default)
+    worker   a PipelineWorker (airmouse/worker.py): reading, mapping and
+             buttons in a child process, the overlay only reading frames
+             from shared memory (app.py --worker)
+
+Meanwhile a QTimer puts synthetic load on the GUI thread, in pure Python
+so that it holds the GIL like a slow paint, injection call or GC pass:
+
+    none     no load
+    frames   8 ms of work every 16 ms frame
+    stalls   an 80 ms stall every 300 ms
+
+Both publish the filtered pointer in shared memory (--broadcast; the
+worker's frame ring is that block), and an observer process follows it
+like an OBS overlay would. Each sample's Y field encodes its number, which
+survives the mapping onto the screen (no filter, no calibration), so
+every stage can be timed from the moment the sample was written, p50, p99
+and max:
+
+    ingest   decoded (where the sample gets its timestamp)
+    shared   visible to the observer in the shared-memory ring
+    gui      handed to the FrameScheduler in the GUI process
+
+plus the fraction of samples that reached the GUI and the frame ticks' p99
+lateness. The first second is warm-up.
+
+The load runs on the GUI thread itself, so it delays `gui` (and the dot)
+in either mode: what the worker takes off that thread is everything before
+it. On a single CPU the worker also has to share the core with the load;
+it still gets it at once, since the scheduler favours a process that
+mostly sleeps.
+
+The exit status is the number of loaded runs where the worker did not
+beat the in-process pipeline on both ingest and shared p99 latency.
+"""
+import os
+import sys
+import tty
+import time
+import argparse
+import threading
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+from PyQt5 import QtCore, QtWidgets
+
+from airmouse.broadcast import PointerBroadcast, PointerReader
+from airmouse.mailbox import SampleMailbox
+from airmouse.mapping import SCALE
+from airmouse.stats import percentile
+from airmouse.worker import PipelineWorker
+
+LOADS = {"none": None, "frames": (16, 8), "stalls": (300, 80)}
+WARMUP = 1.0
+# Y = Y0 + n * STEP encodes sample n (up to SPAN samples).
+Y0 = -7.5
+STEP = 0.001
+SPAN = 15000
+
+
+def feeder(fd, n, rate, delay, sent):
+    """Write n samples at `rate` after `delay` seconds; sent[i] = when."""
+    time.sleep(delay)
+    t_next = time.perf_counter()
+    for i in range(n):
+        sent[i] = time.monotonic()
+        os.write(fd, f"RX -> X: {i} Y: {Y0 + i * STEP:.4f} Z: 0.0000 | Buttons: 0 0 0 0\r\n".encode())
+        t_next += 1.0 / rate
+        pause = t_next - time.perf_counter()
+        if pause > 0:
+            time.sleep(pause)
+
+
+def observer(name, cy, hy, until, seen):
+    """Follow the shared-memory pointer; seen[i] = when sample i showed."""
+    reader = PointerReader(name)
+    while time.monotonic() < until:
+        records = reader.read()
+        if not len(records):
+            time.sleep(0.0002)
+            continue
+        now = time.monotonic()
+        for i in decode(records["y"].astype(float), cy, hy).tolist():
+            if 0 <= i < len(seen) and not seen[i]:
+                seen[i] = now
+    reader.close()
+
+
+def decode(y, cy, hy):
+    """Sample numbers from screen Y positions."""
+    return np.rint(((y - cy) / hy * SCALE - Y0) / STEP).astype(int)
+
+
+def spin(ms):
+    end = time.perf_counter() + ms / 1e3
+    while time.perf_counter() < end:
+        pass
+
+
+def run(app, mode, load, args, serial_reader):
+    from airmouse.overlay import OverlayWindow
+
+    n = min(int(args.rate * (args.seconds + WARMUP)), SPAN)
+    master, slave = os.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    port = os.ttyname(slave)
+    name = f"bench-worker-{os.getpid()}"
+    stop = threading.Event()
+    worker = reader = broadcast = None
+    if mode == "worker":
+        worker = PipelineWorker(serial_reader, ports=[port], frame_mode="text", broadcast=name)
+        worker.start()
+        worker.wait_ready()
+        window = OverlayWindow(None, worker=worker)
+    else:
+        mailbox = SampleMailbox()
+        reader = threading.Thread(target=serial_reader, args=(port, 115200, mailbox, stop, "text"),
+                                  daemon=True)
+        reader.start()
+        broadcast = PointerBroadcast(name)
+        window = OverlayWindow(mailbox, broadcast=broadcast)
+    remote = window.remotes[0]
+    cy, hy = window.desktop.center[1], window.desktop.half[1]
+    seen = []
+    push = remote.scheduler.push
+
+    def probe(t, x, y):
+        seen.append((time.monotonic(), np.asarray(t, float), np.asarray(y, float)))
+        push(t, x, y)
+
+    remote.scheduler.push = probe
+    window.show()
+
+    loader = None
+    if LOADS[load] is not None:
+        every, work = LOADS[load]
+        loader = QtCore.QTimer()
+        loader.timeout.connect(lambda: spin(work))
+        loader.start(every)
+
+    # The feeder and the observer keep time in their own processes, away
+    # from this GIL.
+    ctx = multiprocessing.get_context("fork")
+    sent = ctx.Array("d", n, lock=False)
+    shown = ctx.Array("d", n, lock=False)
+    duration = 0.2 + n / args.rate + 0.3
+    feed = ctx.Process(target=feeder, args=(master, n, args.rate, 0.2, sent), daemon=True)
+    watch = ctx.Process(target=observer, args=(name, cy, hy, time.monotonic() + duration, shown),
+                        daemon=True)
+    watch.start()
+    feed.start()
+    QtCore.QTimer.singleShot(int(duration * 1000), app.quit)
+    app.exec_()
+    feed.join()
+    watch.join()
+    if loader is not None:
+        loader.stop()
+    if worker is not None:
+        worker.close()
+    if broadcast is not None:
+        broadcast.close()
+    stop.set()
+    if reader is not None:
+        reader.join(timeout=1.0)
+    if window.timer is not None:
+        window.timer.stop()
+    window.close()
+    window.deleteLater()
+    os.close(master)
+    os.close(slave)
+
+    sent = np.frombuffer(sent, float)
+    start = sent[0] + WARMUP
+    measured = sent >= start
+    shown = np.frombuffer(shown, float)
+    shared = sorted((shown - sent)[measured & (shown > 0)].tolist())
+    ingest, pointer, got = [], [], set()
+    for now, t, y in seen:
+        idx = decode(y, cy, hy)
+        ok = (idx >= 0) & (idx < n)
+        for i, ti in zip(idx[ok].tolist(), t[ok].tolist()):
+            if sent[i] < start or i in got:
+                continue
+            got.add(i)
+            ingest.append(ti - sent[i])
+            pointer.append(now - sent[i])
+    ingest.sort()
+    pointer.sort()
+    late = sorted(remote.scheduler.lateness.values)
+    expected = int(np.count_nonzero(measured))
+    if not pointer or not shared:
+        print(f"{mode:<7} {load:<7} nothing reached the GUI or the shared ring")
+        return float("inf"), float("inf")
+    columns = "   ".join(f"{label} p50 {percentile(v, 50) * 1e3:5.2f} p99 {percentile(v, 99) * 1e3:5.2f} "
+                          f"max {v[-1] * 1e3:5.2f}" for label, v in
+                          (("ingest", ingest), ("shared", shared), ("gui", pointer)))
+    print(f"{mode:<7} {load:<7} {columns} ms   delivered {100 * len(got) / max(expected, 1):5.1f}%   "
+          f"tick late p99 {percentile(late, 99) * 1e3 if late else 0.0:5.2f} ms")
+    return percentile(ingest, 99), percentile(shared, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--loads", nargs="+", choices=sorted(LOADS), default=["none", "frames", "stalls"])
+    parser.add_argument("--modes", nargs="+", choices=("inproc", "worker"), default=["inproc", "worker"])
+    parser.add_argument("--rate", type=float, default=1000.0, help="samples per second")
+    parser.add_argument("--seconds", type=float, default=4.0, help="measured seconds per run")
+    args = parser.parse_args()
+
+    from app import serial_reader
+    app = QtWidgets.QApplication(sys.argv)
+    failures = 0
+    for load in args.loads:
+        p99 = {mode: run(app, mode, load, args, serial_reader) for mode in args.modes}
+        if load != "none" and len(p99) == 2:
+            (ingest_in, shared_in), (ingest_w, shared_w) = p99["inproc"], p99["worker"]
+            if not (ingest_w < ingest_in and shared_w < shared_in):
+                print(f"FAIL {load}: the worker did not cut the p99 latency")
+                failures += 1
+    sys.exit(failures)
+
+
+if __name__ == "__main__":
+    main()
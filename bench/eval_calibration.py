@@ -0,0 +1,190 @@
+"""Drift of the pointer's rest position over long sessions, with and without
+automatic calibration.
+
+Usage:
+    python bench/eval_calibration.py [SESSION.amrec ...] [--minutes 30] [--drift 0.004]
+                                     [--opt NAME=VALUE ...]
+
+Without a session file a synthetic talk is generated at 100 Hz: the sensor
+offset drifts linearly with a random walk on top, and the presenter
+alternates between resting the remote (laser off, near the neutral pose),
+pointing at things with the laser on (slow moves and holds anywhere on the
+screen) and quick gestures. The true offset is known, so the pointer error
+|offset - cal| is reported over the whole talk, as pixels on a 1920 px wide
+screen at unit gain, for:
+
+    none       no calibration (cal = 0)
+    once       calibrated once at the start (the old C key)
+    auto       AutoCalibrator, rest pose only (predict=0)
+    auto+rate  AutoCalibrator with drift-rate prediction (the default)
+
+Recorded sessions (--record) have no ground truth. They are replayed with
+the laser toggled by button 2 presses (app.py's default), and each rest
+period the calibrator accepts is scored by how far its pose was from the
+calibration in force just before it. For `once` that is the first rest
+pose, and for `none` it is zero. A drifting session shows a growing error
+without calibration.
+
+The calibrator's per-sample cost is printed too.
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from airmouse.calibration import AutoCalibrator
+from airmouse.filters import parse_filter_opts
+from airmouse.mapping import SCALE
+from airmouse.recorder import load_session, buttons_from_mask
+from airmouse.stats import percentile
+
+# Normalised units -> pixels: half of a 1920 px wide screen at unit gain.
+PIXELS = 960.0
+
+
+def synthetic(minutes=30.0, rate=100.0, drift=0.004, walk=0.002, noise=0.03, seed=3):
+    """Raw x/y (sensor units), laser state and the true offset (normalised)
+    per sample. drift is in normalised units per minute, walk the random
+    walk's standard deviation per sqrt(minute)."""
+    rnd = np.random.default_rng(seed)
+    dt = 1.0 / rate
+    pose = np.zeros(2)
+    rows = []
+
+    def move(target, seconds, laser):
+        start = pose.copy()
+        n = max(int(seconds * rate), 1)
+        for k in range(1, n + 1):
+            u = k / n
+            u = u * u * (3 - 2 * u)
+            rows.append((*(start + (target - start) * u), laser))
+        pose[:] = target
+
+    def hold(seconds, laser, sway=0.0):
+        n = int(seconds * rate)
+        # A hand at rest sways slowly a little around the pose.
+        phase = rnd.uniform(0, 2 * np.pi)
+        for k in range(n):
+            s = sway * np.sin(phase + 2 * np.pi * 0.3 * k * dt)
+            rows.append((pose[0] + s, pose[1] + 0.5 * s, laser))
+
+    while len(rows) < minutes * 60 * rate:
+        # Resting near the neutral pose, between slides.
+        move(rnd.normal(0, 0.01, 2), 0.8, False)
+        hold(rnd.uniform(2, 15), False, sway=0.002)
+        # Pointing: a few targets anywhere, each held for a moment.
+        for _ in range(rnd.integers(1, 5)):
+            move(rnd.uniform(-0.7, 0.7, 2), rnd.uniform(0.4, 1.2), True)
+            hold(rnd.uniform(0.5, 6), True, sway=0.002)
+        # Back down; sometimes a quick swipe with the laser off.
+        move(rnd.normal(0, 0.01, 2), 0.8, False)
+        if rnd.random() < 0.3:
+            move(pose + [0.6, 0.0], 0.2, False)
+            move(rnd.normal(0, 0.01, 2), 1.0, False)
+
+    data = np.array(rows)
+    n = len(data)
+    t = np.arange(n) * dt
+    minutes_t = t / 60.0
+    offset = np.empty((n, 2))
+    steps = rnd.normal(0, walk * np.sqrt(dt / 60.0), (n, 2))
+    direction = rnd.normal(0, 1, 2)
+    direction /= np.linalg.norm(direction)
+    offset[:] = np.cumsum(steps, axis=0) + np.outer(minutes_t, direction * drift)
+    offset += rnd.normal(0, 0.02, 2)         # the offset at power-on
+    raw = (data[:, :2] + offset) * SCALE + rnd.normal(0, noise, (n, 2))
+    return t, raw[:, 0], raw[:, 1], data[:, 2].astype(bool), offset
+
+
+def from_session(path, laser_button=2):
+    rec = load_session(path)
+    t = np.asarray(rec["t"], dtype=np.float64)
+    pressed = buttons_from_mask(rec["buttons"], laser_button).astype(bool)
+    presses = pressed & ~np.concatenate(([False], pressed[:-1]))
+    laser = (np.cumsum(presses) % 2).astype(bool)
+    # The overlays feed x = raw z and y = raw y.
+    return t, np.asarray(rec["z"], dtype=np.float64), np.asarray(rec["y"], dtype=np.float64), laser
+
+
+def replay(cal, t, x, y, laser):
+    """Feed the calibrator; returns cal per sample (n, 2), the rest periods
+    [(t, pose, cal before)] and the cost per sample."""
+    out = np.empty((len(t), 2))
+    rests = []
+    feed = cal.feed
+    n_rests = 0
+    start = time.perf_counter()
+    for i, (ti, xi, yi, li) in enumerate(zip(t.tolist(), x.tolist(), y.tolist(), laser.tolist())):
+        before = cal.cal
+        feed(ti, xi, yi, not li)
+        if cal.rests != n_rests:
+            n_rests = cal.rests
+            rests.append((ti, cal.last_rest[1:], before))
+        out[i] = cal.cal
+    return out, rests, (time.perf_counter() - start) / max(len(t), 1)
+
+
+def stats(err):
+    px = np.hypot(err[:, 0], err[:, 1]) * PIXELS
+    return (f"mean {px.mean():6.1f}  p95 {np.percentile(px, 95):6.1f}  max {px.max():6.1f}  "
+            f"end {px[-1]:6.1f} px")
+
+
+def report_synthetic(minutes, drift, opts):
+    t, x, y, laser, offset = synthetic(minutes, drift=drift)
+    print(f"synthetic talk: {t[-1] / 60:.0f} min, {len(t)} samples, "
+          f"drift {np.hypot(*(offset[-1] - offset[0])) * PIXELS:.0f} px, "
+          f"{100 * laser.mean():.0f}% laser on")
+    print(f"  {'none':<10} {stats(offset)}")
+    print(f"  {'once':<10} {stats(offset - offset[0])}")
+    for name, extra in (("auto", {"predict": False}), ("auto+rate", {})):
+        cal = AutoCalibrator(**{**opts, **extra})
+        cals, _, cost = replay(cal, t, x, y, laser)
+        print(f"  {name:<10} {stats(offset - cals)}  ({cost * 1e6:.2f} us/sample)")
+        print(f"  {'':<10} {cal.summary()}")
+
+
+def report_session(path, opts):
+    t, x, y, laser = from_session(path)
+    cal = AutoCalibrator(**opts)
+    _, rests, cost = replay(cal, t, x, y, laser)
+    print(f"{path}: {(t[-1] - t[0]) / 60:.1f} min, {len(t)} samples, {cost * 1e6:.2f} us/sample")
+    print("  calibrator:", cal.summary())
+    if not rests:
+        print("  no rest periods found")
+        return
+    pose = np.array([p for _, p, _ in rests])
+    before = np.array([b for _, _, b in rests])
+    for name, err in (("none", pose), ("once", pose - pose[0]), ("auto", pose - before)):
+        px = sorted((np.hypot(err[:, 0], err[:, 1]) * PIXELS).tolist())
+        print(f"  {name:<5} rest pose off centre: p50 {percentile(px, 50):6.1f}  "
+              f"p95 {percentile(px, 95):6.1f}  max {px[-1]:6.1f} px over {len(px)} rests")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sessions", nargs="*", help="recordings made with --record")
+    parser.add_argument("--minutes", type=float, default=30.0, help="length of the synthetic talk")
+    parser.add_argument("--drift", type=float, default=0.004,
+                        help="synthetic drift in normalised units per minute")
+    parser.add_argument("--opt", action="append", metavar="NAME=VALUE",
+                        help="AutoCalibrator parameter, e.g. tau=5 (repeatable)")
+    args = parser.parse_args()
+    try:
+        opts = parse_filter_opts(args.opt)
+        AutoCalibrator(**opts)
+    except (TypeError, ValueError) as e:
+        parser.error(f"--opt: {e}")
+
+    if not args.sessions:
+        report_synthetic(args.minutes, args.drift, opts)
+    for path in args.sessions:
+        report_session(path, opts)
+
+
+if __name__ == "__main__":
+    main()
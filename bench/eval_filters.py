@@ -0,0 +1,143 @@
+"""Offline lag/jitter comparison of the pointer filters.
+
+Usage:
+    python bench/eval_filters.py [SESSION.amrec ...] [--width 1920] [--height 1080]
+                                 [--filter NAME[:k=v,k=v]] ...
+
+Without a session file a synthetic trace is generated (rest, fast moves
+between targets, slow circles) with known ground truth and sensor noise.
+Recorded sessions (--record) are mapped to pixels the way test1.py does and
+compared against a zero-phase (centred moving average) reference, since the
+true pointer path is unknown.
+
+    lag     time shift that best aligns the filter output with the
+            reference during motion, in ms (near zero is best; negative
+            means the output runs ahead, i.e. prediction overshoots)
+    jitter  RMS sample-to-sample movement of the output while the reference
+            is at rest, in pixels (lower is better)
+    error   RMS distance to the reference over the whole trace, in pixels
+"""
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from airmouse.filters import make_filter
+from airmouse.recorder import load_session
+
+DEFAULT_FILTERS = ["none", "ema", "one-euro", "kalman", "kalman:predict=0"]
+
+
+def synthetic(width, height, rate=250.0, seconds=20.0, noise=3.0, seed=3):
+    rnd = np.random.default_rng(seed)
+    t = np.arange(0, seconds, 1.0 / rate)
+    x = np.empty_like(t)
+    y = np.empty_like(t)
+    cx, cy = width / 2, height / 2
+    px, py = cx, cy
+    seg = -1.0
+    for i, ti in enumerate(t):
+        phase = ti % 4.0
+        if phase < 1.0:            # hold still
+            x[i], y[i] = px, py
+        elif phase < 1.3:          # fast move to a new target
+            if seg != ti // 4.0:
+                seg = ti // 4.0
+                tx, ty = rnd.uniform(0.2, 0.8) * width, rnd.uniform(0.2, 0.8) * height
+                sx, sy = px, py
+            u = (phase - 1.0) / 0.3
+            u = u * u * (3 - 2 * u)
+            x[i], y[i] = sx + (tx - sx) * u, sy + (ty - sy) * u
+        elif phase < 2.0:
+            px, py = tx, ty
+            x[i], y[i] = px, py
+        else:                      # slow circle around the target
+            a = (phase - 2.0) * np.pi
+            x[i], y[i] = px + 80 * np.sin(a), py + 80 * (1 - np.cos(a))
+    truth = np.stack([x, y], axis=1)
+    measured = truth + rnd.normal(0, noise, truth.shape)
+    return t, measured, truth
+
+
+def from_session(path, width, height):
+    rec = load_session(path)
+    t = np.asarray(rec["t"], dtype=np.float64)
+    # Same mapping as test1.py: Z drives screen X, Y drives screen Y.
+    nx = np.clip(rec["z"], -8.0, 8.0) / 8.0 * 2
+    ny = np.clip(rec["y"], -8.0, 8.0) / 8.0 * 2
+    measured = np.stack([width / 2 + nx * width / 2, height / 2 + ny * height / 2], axis=1)
+    k = 9
+    kernel = np.ones(k) / k
+    ref = np.stack([np.convolve(np.pad(measured[:, i], k // 2, mode="edge"), kernel, "valid")
+                    for i in range(2)], axis=1)
+    return t, measured, ref
+
+
+def run_filter(spec, t, measured):
+    name, _, opts = spec.partition(":")
+    f = make_filter(name, opts.split(",") if opts else None)
+    out = np.empty_like(measured)
+    for i in range(len(t)):
+        out[i] = f(t[i], measured[i, 0], measured[i, 1])
+    return out
+
+
+def metrics(t, out, ref):
+    dt = float(np.median(np.diff(t)))
+    speed = np.linalg.norm(np.gradient(ref, t, axis=0), axis=1)
+    moving = speed > 200.0
+    rest = speed < 20.0
+
+    # Positive shift: output trails the reference; negative: it leads
+    # (prediction overshooting).
+    best_shift, best_err = 0, np.inf
+    n = len(out)
+    for shift in range(-int(0.1 / dt), int(0.25 / dt)):
+        if shift >= 0:
+            a, b, m = out[shift:], ref[:n - shift], moving[:n - shift]
+        else:
+            a, b, m = out[:n + shift], ref[-shift:], moving[-shift:]
+        if not m.any():
+            continue
+        err = np.sqrt(np.mean(np.sum((a[m] - b[m]) ** 2, axis=1)))
+        if err < best_err:
+            best_shift, best_err = shift, err
+    lag = best_shift * dt
+
+    step = np.linalg.norm(np.diff(out, axis=0), axis=1)
+    jitter = float(np.sqrt(np.mean(step[rest[1:]] ** 2))) if rest[1:].any() else float("nan")
+    error = float(np.sqrt(np.mean(np.sum((out - ref) ** 2, axis=1))))
+    return lag * 1e3, jitter, error
+
+
+def report(label, t, measured, ref, specs):
+    print(f"{label}: {len(t)} samples, {len(t) / (t[-1] - t[0]):.0f} Hz")
+    print(f"  {'filter':<28} {'lag ms':>8} {'jitter px':>10} {'error px':>9}")
+    for spec in specs:
+        out = run_filter(spec, t, measured)
+        lag, jitter, error = metrics(t, out, ref)
+        print(f"  {spec:<28} {lag:8.1f} {jitter:10.2f} {error:9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sessions", nargs="*", help="recordings made with --record")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--filter", action="append", dest="filters", metavar="NAME[:k=v,...]")
+    args = parser.parse_args()
+
+    specs = args.filters or DEFAULT_FILTERS
+    if not args.sessions:
+        t, measured, truth = synthetic(args.width, args.height)
+        report("synthetic trace", t, measured, truth, specs)
+    for path in args.sessions:
+        t, measured, ref = from_session(path, args.width, args.height)
+        report(path, t, measured, ref, specs)
+
+
+if __name__ == "__main__":
+    main()
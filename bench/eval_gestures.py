@@ -0,0 +1,201 @@
+"""Offline accuracy and latency of the gesture engine.
+
+Usage:
+    python bench/eval_gestures.py [SESSION.amrec --labels LABELS ...] [--opt NAME=VALUE ...]
+
+Without a session file a synthetic trace is generated at 250 Hz with sensor
+noise: rest, slow pointing moves, fast diagonal jumps (pointing, not a
+gesture), and labelled swipes, scrolls and twists, each followed by a slow
+return. Recorded sessions (--record) are replayed through the engine the
+way the overlays feed it; with a labels file (one "START END LABEL" per
+line, seconds from the start of the recording, LABEL one of next, prev,
+scroll-up, scroll-down, zoom-in, zoom-out) they are scored too, otherwise
+the detections are listed.
+
+    hits     labelled gestures recognised as the right action
+    missed   labelled gestures with no matching action
+    false    actions outside any labelled gesture, or of the wrong kind
+    latency  labelled start of the motion to the first matching action
+
+The engine's per-sample cost is measured for several window lengths; it
+should not grow with the window.
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from airmouse.filters import parse_filter_opts
+from airmouse.gestures import GestureEngine
+from airmouse.recorder import load_session
+from airmouse.stats import percentile
+
+LABELS = ("next", "prev", "scroll-up", "scroll-down", "zoom-in", "zoom-out")
+# Labelled motion may end a little before the action it produced.
+SLACK = 0.3
+
+
+def label_of(gesture, amount):
+    if gesture in ("next", "prev"):
+        return gesture
+    if gesture == "scroll":
+        return "scroll-up" if amount > 0 else "scroll-down"
+    return "zoom-in" if amount > 0 else "zoom-out"
+
+
+def synthetic(rate=250.0, repeats=6, noise=0.03, seed=5):
+    """Raw x/y/z in sensor units (+/-8) and the labels [(start, end, label)]."""
+    rnd = np.random.default_rng(seed)
+    dt = 1.0 / rate
+    pos = np.zeros(3)
+    rows, labels = [], []
+    t = 0.0
+
+    def move(delta, seconds):
+        nonlocal t
+        start = pos.copy()
+        n = max(int(seconds * rate), 1)
+        for k in range(1, n + 1):
+            u = k / n
+            u = u * u * (3 - 2 * u)
+            rows.append((t, *(start + delta * u)))
+            t += dt
+        pos[:] = start + delta
+
+    def rest(seconds):
+        nonlocal t
+        for _ in range(int(seconds * rate)):
+            rows.append((t, *pos))
+            t += dt
+
+    scripted = [("next", (4.8, 0, 0), 0.2), ("prev", (-4.8, 0, 0), 0.2),
+                ("scroll-up", (0, -4.0, 0), 0.5), ("scroll-down", (0, 4.0, 0), 0.5),
+                ("zoom-in", (0, 0, 4.0), 0.4), ("zoom-out", (0, 0, -4.0), 0.4)]
+    for _ in range(repeats):
+        for k in rnd.permutation(len(scripted)):
+            label, delta, seconds = scripted[k]
+            rest(0.6)
+            # Pointing around: slow moves and one fast diagonal jump,
+            # staying well inside the sensor range.
+            for _ in range(2):
+                move(np.array([*rnd.uniform(-1.5, 1.5, 2), 0.0]) - pos, 0.8)
+            jump = -np.sign(pos[:2]) * 2.4
+            move(np.array([jump[0], jump[1], 0.0]), 0.3)
+            rest(0.4)
+            t0 = t
+            delta = np.array(delta, dtype=float)
+            move(delta, seconds)
+            labels.append((t0, t, label))
+            rest(0.3)
+            move(-delta, 1.6)
+    data = np.array(rows)
+    data[:, 1:] += rnd.normal(0, noise, (len(data), 3))
+    return data[:, 0], data[:, 1], data[:, 2], data[:, 3], labels
+
+
+def from_session(path, labels_path):
+    rec = load_session(path)
+    t = np.asarray(rec["t"], dtype=np.float64)
+    labels = []
+    if labels_path:
+        with open(labels_path) as f:
+            for line in f:
+                line = line.split("#")[0].split()
+                if not line:
+                    continue
+                start, end, label = float(line[0]), float(line[1]), line[2]
+                if label not in LABELS:
+                    raise ValueError(f"{labels_path}: unknown label {label!r}")
+                labels.append((t[0] + start, t[0] + end, label))
+    # The overlays feed x = raw z, y = raw y and the third axis = raw x.
+    return t, np.asarray(rec["z"]), np.asarray(rec["y"]), np.asarray(rec["x"]), labels
+
+
+def run(engine, t, x, y, z):
+    events = []
+    feed = engine.feed
+    start = time.perf_counter()
+    for ti, xi, yi, zi in zip(t.tolist(), x.tolist(), y.tolist(), z.tolist()):
+        g = feed(ti, xi, yi, zi)
+        if g is not None:
+            events.append((ti, label_of(*g), g))
+    return events, (time.perf_counter() - start) / max(len(t), 1)
+
+
+def score(events, labels):
+    hits, latency, false = 0, [], 0
+    for start, end, label in labels:
+        first = next((te for te, lab, _ in events
+                      if lab == label and start <= te <= end + SLACK), None)
+        if first is not None:
+            hits += 1
+            latency.append(first - start)
+    for te, lab, _ in events:
+        inside = [(s, e, l) for s, e, l in labels if s <= te <= e + SLACK]
+        if not any(l == lab for _, _, l in inside):
+            false += 1
+    return hits, len(labels) - hits, false, sorted(latency)
+
+
+def report(name, t, x, y, z, labels, opts):
+    engine = GestureEngine(**opts)
+    events, cost = run(engine, t, x, y, z)
+    print(f"{name}: {len(t)} samples, {len(t) / max(t[-1] - t[0], 1e-9):.0f} Hz, "
+          f"{cost * 1e6:.2f} us/sample")
+    print("  engine:", engine.summary())
+    if not labels:
+        for te, lab, g in events:
+            print(f"  {te - t[0]:8.2f} s  {lab:<12} {g[1]:+d}")
+        return
+    print(f"  {'gesture':<12} {'labels':>6} {'hits':>5} {'missed':>6} {'false':>6} "
+          f"{'p50 ms':>7} {'max ms':>7}")
+    for label in LABELS:
+        mine = [lb for lb in labels if lb[2] == label]
+        hits, missed, false, lat = score([e for e in events if e[1] == label], mine)
+        if not mine and not false:
+            continue
+        p50 = percentile(lat, 50) * 1e3
+        worst = lat[-1] * 1e3 if lat else float("nan")
+        print(f"  {label:<12} {len(mine):>6} {hits:>5} {missed:>6} {false:>6} {p50:7.0f} {worst:7.0f}")
+    hits, missed, false, lat = score(events, labels)
+    print(f"  accuracy {hits}/{len(labels)} ({100.0 * hits / len(labels):.1f}%), {false} false actions, "
+          f"latency p50 {percentile(lat, 50) * 1e3:.0f} ms p95 {percentile(lat, 95) * 1e3:.0f} ms")
+
+
+def cost_by_window(t, x, y, z, opts):
+    print("  per-sample cost by feature window:")
+    for window in (0.05, 0.15, 0.5, 1.0):
+        engine = GestureEngine(**{**opts, "window": window, "size": int(window * 1000) + 2})
+        _, cost = run(engine, t, x, y, z)
+        print(f"    window {window * 1e3:6.0f} ms  {cost * 1e6:6.2f} us/sample")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sessions", nargs="*", help="recordings made with --record")
+    parser.add_argument("--labels", action="append", default=[],
+                        help="labels file for the session at the same position")
+    parser.add_argument("--opt", action="append", metavar="NAME=VALUE",
+                        help="GestureEngine parameter, e.g. onset=0.8 (repeatable)")
+    args = parser.parse_args()
+    try:
+        opts = parse_filter_opts(args.opt)
+        GestureEngine(**opts)
+    except (TypeError, ValueError) as e:
+        parser.error(f"--opt: {e}")
+
+    if not args.sessions:
+        t, x, y, z, labels = synthetic()
+        report("synthetic trace", t, x, y, z, labels, opts)
+        cost_by_window(t, x, y, z, opts)
+    for i, path in enumerate(args.sessions):
+        t, x, y, z, labels = from_session(path, args.labels[i] if i < len(args.labels) else None)
+        report(path, t, x, y, z, labels, opts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Replay timed button traces through the button state machine.
+
+Usage:
+    python bench/replay_buttons.py                    # run the built-in cases
+    python bench/replay_buttons.py SESSION.amrec [--config FILE]
+
+Each built-in case is a button trace (times of every state change), a
+bindings config and the exact events expected. The trace is replayed as a
+sample stream at several rates, regular and jittered; the events, whose
+times come from the samples and the timers rather than from when they are
+noticed, must be identical at every rate. The exit status is the number of
+failing cases. The per-sample cost of the machine is printed at the end.
+
+With a session recording (--record) the recorded button states are
+replayed and the events printed, using --config (JSON, see
+airmouse/buttons.py) or bindings of every event on every button.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airmouse.buttons import EVENTS, ButtonMachine, load_config
+
+RATES = (100.0, 250.0, 1000.0)
+
+
+def bind(*pairs, **timing):
+    """Config binding each (event, button) pair to a dummy action."""
+    bindings = []
+    for event, button in pairs:
+        key = "buttons" if event == "chord" else "button"
+        bindings.append({"event": event, key: button, "action": "x"})
+    return {**timing, "bindings": bindings}
+
+
+# name, config, [(t, "b0b1b2b3")], [expected "t kind button"]
+CASES = [
+    ("click", bind(("click", 1)),
+     [(0.0, "0100"), (0.1, "0000")],
+     ["0.000 press 1", "0.100 release 1", "0.100 click 1"]),
+    ("click just under long_press", bind(("click", 1), ("long", 1)),
+     [(0.0, "0100"), (0.399, "0000")],
+     ["0.000 press 1", "0.399 release 1", "0.399 click 1"]),
+    ("long press", bind(("click", 1), ("long", 1)),
+     [(0.0, "0100"), (0.401, "0000")],
+     ["0.000 press 1", "0.400 long 1", "0.401 release 1", "0.401 long_release 1"]),
+    ("double click", bind(("click", 0), ("double", 0)),
+     [(0.0, "1000"), (0.1, "0000"), (0.25, "1000"), (0.35, "0000")],
+     ["0.000 press 0", "0.100 release 0", "0.250 press 0", "0.250 double 0", "0.350 release 0"]),
+    ("click waits for a double", bind(("click", 0), ("double", 0)),
+     [(0.0, "1000"), (0.1, "0000"), (0.5, "0000")],
+     ["0.000 press 0", "0.100 release 0", "0.400 click 0"]),
+    ("two slow clicks", bind(("click", 0), ("double", 0)),
+     [(0.0, "1000"), (0.1, "0000"), (0.45, "1000"), (0.5, "0000"), (0.9, "0000")],
+     ["0.000 press 0", "0.100 release 0", "0.400 click 0", "0.450 press 0", "0.500 release 0",
+      "0.800 click 0"]),
+    ("auto-repeat", bind(("press", 3), ("repeat", 3), repeat=0.1),
+     [(0.0, "0001"), (0.75, "0000")],
+     ["0.000 press 3", "0.400 long 3", "0.500 repeat 3", "0.600 repeat 3", "0.700 repeat 3",
+      "0.750 release 3", "0.750 long_release 3"]),
+    ("chord", bind(("chord", (0, 3)), ("press", 0), ("press", 3)),
+     [(0.0, "1000"), (0.05, "1001"), (0.3, "0001"), (0.35, "0000")],
+     ["0.050 chord (0, 3)"]),
+    ("chord partner too late", bind(("chord", (0, 3)), ("press", 0), ("press", 3)),
+     [(0.0, "1000"), (0.2, "1001"), (0.3, "0001"), (0.35, "0000")],
+     ["0.080 press 0", "0.280 press 3", "0.300 release 0", "0.300 click 0", "0.350 release 3",
+      "0.350 click 3"]),
+    ("chord member tapped alone", bind(("chord", (0, 3)), ("press", 0)),
+     [(0.0, "1000"), (0.03, "0000")],
+     ["0.030 press 0", "0.030 release 0", "0.030 click 0"]),
+    ("independent buttons", bind(("press", 2), ("click", 1), ("long", 1)),
+     [(0.0, "0100"), (0.2, "0110"), (0.3, "0100"), (0.6, "0000")],
+     ["0.000 press 1", "0.200 press 2", "0.300 release 2", "0.300 click 2", "0.400 long 1",
+      "0.600 release 1", "0.600 long_release 1"]),
+]
+
+
+def resample(trace, rate, jitter, rnd):
+    """Samples (t, buttons) at `rate` Hz holding each state, plus one at every
+    change; jitter spreads the sample times by up to that fraction of a period."""
+    period = 1.0 / rate
+    end = trace[-1][0]
+    samples = []
+    k = 0
+    t = 0.0
+    while t <= end + 1e-9:
+        while k + 1 < len(trace) and trace[k + 1][0] <= t:
+            k += 1
+        samples.append((t, trace[k][1]))
+        t += period * (1.0 + (rnd.uniform(-jitter, jitter) if jitter else 0.0))
+    samples.extend(trace)
+    samples.sort(key=lambda s: s[0])
+    return [(t, tuple(int(c) for c in state)) for t, state in samples]
+
+
+def replay(config, samples):
+    machine = ButtonMachine(config)
+    out = []
+    for t, buttons in samples:
+        out.extend(machine.feed(t, buttons))
+    return [f"{t:.3f} {kind} {button}" for t, kind, button in out]
+
+
+def run_cases():
+    rnd = random.Random(7)
+    failures = 0
+    for name, config, trace, expected in CASES:
+        bad = []
+        for rate in RATES:
+            for jitter in (0.0, 0.5):
+                got = replay(config, resample(trace, rate, jitter, rnd))
+                if got != expected:
+                    bad.append((rate, jitter, got))
+        if bad:
+            failures += 1
+            rate, jitter, got = bad[0]
+            print(f"FAIL {name} ({len(bad)} of {2 * len(RATES)} runs, first at {rate:.0f} Hz "
+                  f"jitter {jitter}):\n  expected {expected}\n  got      {got}")
+        else:
+            print(f"ok   {name}")
+    return failures
+
+
+def cost():
+    """Per-sample cost on a long random trace with every feature bound."""
+    config = bind(*[(e, b) for e in EVENTS if e != "chord" for b in range(4)], ("chord", (0, 3)))
+    rnd = random.Random(1)
+    samples = []
+    state = [0, 0, 0, 0]
+    t = 0.0
+    for _ in range(200_000):
+        t += 0.002
+        if rnd.random() < 0.01:
+            i = rnd.randrange(4)
+            state[i] ^= 1
+        samples.append((t, tuple(state)))
+    machine = ButtonMachine(config)
+    start = time.perf_counter()
+    n = 0
+    for t, buttons in samples:
+        n += len(machine.feed(t, buttons))
+    took = time.perf_counter() - start
+    print(f"{len(samples)} samples, {n} events: {took / len(samples) * 1e6:.2f} us/sample")
+
+
+def replay_session(path, config_path):
+    from airmouse.recorder import load_session, buttons_from_mask
+    rec = load_session(path)
+    if config_path:
+        config = load_config(config_path)
+    else:
+        config = bind(*[(e, b) for e in EVENTS if e != "chord" for b in range(4)])
+    machine = ButtonMachine(config)
+    t = rec["t"].tolist()
+    columns = [buttons_from_mask(rec["buttons"], i).tolist() for i in range(4)]
+    t0 = t[0] if t else 0.0
+    for i, ti in enumerate(t):
+        for te, kind, button in machine.feed(ti, tuple(c[i] for c in columns)):
+            print(f"{te - t0:10.3f} s  {kind:<13} {button}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("session", nargs="?", help="recording made with --record")
+    parser.add_argument("--config", help="bindings config (JSON) for the session replay")
+    args = parser.parse_args()
+    if args.session:
+        replay_session(args.session, args.config)
+        return
+    failures = run_cases()
+    cost()
+    sys.exit(failures)
+
+
+if __name__ == "__main__":
+    main()
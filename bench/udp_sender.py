@@ -0,0 +1,113 @@
+"""Stand-in for a remote sending over Wi-Fi: samples as UDP datagrams.
+
+Usage:
+    python bench/udp_sender.py [HOST:PORT] [--rate 200] [--seconds 0] [--format text|binary]
+                               [--per-packet 1] [--press BUTTON@SECONDS ...]
+                               [--loss 0] [--reorder 0] [--duplicate 0]
+
+Sends a slow figure-eight (raw Y/Z, the axes the overlays map) to
+app.py --udp HOST:PORT, default 127.0.0.1:5005, until Ctrl+C or --seconds.
+Text datagrams are ``RX -> ... | Buttons: a b c d | Seq: n`` lines,
+binary ones protocol.FRAME_STRUCT frames; --per-packet samples share a
+datagram. --press 2@1 holds button 2 (the laser toggle) for 0.1 s one
+second in. --loss, --reorder and --duplicate are the probabilities of a
+datagram being dropped, held back behind the next one, or sent twice, to
+exercise the receiver's sequence checks the way a busy Wi-Fi link would.
+"""
+import os
+import sys
+import math
+import time
+import random
+import socket
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airmouse.protocol import pack_frame
+from airmouse.udp import DEFAULT_PORT, parse_udp_address
+
+
+def text_line(seq, x, y, z, buttons):
+    return (f"RX -> X: {x:.3f} Y: {y:.3f} Z: {z:.3f} | Buttons: {buttons[0]} {buttons[1]} "
+            f"{buttons[2]} {buttons[3]} | Seq: {seq & 0xFFFF}\n").encode()
+
+
+def parse_press(text):
+    button, _, at = text.partition("@")
+    button, at = int(button), float(at)
+    if not 0 <= button <= 3:
+        raise argparse.ArgumentTypeError("button must be 0-3")
+    return button, at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("address", nargs="?", default=f"127.0.0.1:{DEFAULT_PORT}")
+    parser.add_argument("--rate", type=float, default=200.0, help="samples per second")
+    parser.add_argument("--seconds", type=float, default=0.0, help="stop after this long (0: never)")
+    parser.add_argument("--format", choices=("text", "binary"), default="text")
+    parser.add_argument("--per-packet", type=int, default=1, help="samples per datagram")
+    parser.add_argument("--press", action="append", type=parse_press, default=[], metavar="BUTTON@SECONDS")
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--reorder", type=float, default=0.0)
+    parser.add_argument("--duplicate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    try:
+        host, port = parse_udp_address(args.address)
+    except ValueError as e:
+        parser.error(str(e))
+
+    rnd = random.Random(args.seed)
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_DGRAM)
+    target = (host or "127.0.0.1", port)
+    period = args.per_packet / args.rate
+    start = time.perf_counter()
+    seq = 0
+    held = None
+    n_sent = 0
+    try:
+        while not args.seconds or time.perf_counter() - start < args.seconds:
+            payload = []
+            for _ in range(args.per_packet):
+                t = seq / args.rate
+                y = 3.0 * math.sin(2 * math.pi * t / 6.0)
+                z = 4.0 * math.sin(4 * math.pi * t / 6.0)
+                buttons = [0, 0, 0, 0]
+                for button, at in args.press:
+                    if at <= t < at + 0.1:
+                        buttons[button] = 1
+                if args.format == "text":
+                    payload.append(text_line(seq, 0.0, y, z, buttons))
+                else:
+                    payload.append(pack_frame(seq, int(t * 1e6), 0.0, y, z, buttons))
+                seq += 1
+            datagram = b"".join(payload)
+
+            if rnd.random() >= args.loss:
+                if held is None and rnd.random() < args.reorder:
+                    held = datagram
+                else:
+                    sock.sendto(datagram, target)
+                    n_sent += 1
+                    if rnd.random() < args.duplicate:
+                        sock.sendto(datagram, target)
+                        n_sent += 1
+                    if held is not None:
+                        sock.sendto(held, target)
+                        n_sent += 1
+                        held = None
+
+            delay = start + (seq / args.per_packet) * period - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+    print(f"sent {seq} samples in {n_sent} datagrams to {target[0]}:{target[1]}")
+
+
+if __name__ == "__main__":
+    main()
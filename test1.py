@@ -1,464 +1,335 @@
 # air_mouse_overlay_fixed_sendinput.py
 # Requirements:
-#   pip install pyqt5 pyserial pyautogui
+#   pip install pyqt5 pyserial pyautogui numpy
 #
 # Usage:
 #   python air_mouse_overlay_fixed_sendinput.py --port COM3 --baud 115200
 
 import sys
-import threading
-import queue
-import argparse
-import time
-import re
 import signal
-import ctypes
-
-from PyQt5 import QtWidgets, QtGui, QtCore
-import serial
-import pyautogui
-
-pyautogui.FAILSAFE = False
-
-RX_PATTERN = re.compile(
-    r"RX\s*->\s*X:\s*([-\d\.]+)\s*Y:\s*([-\d\.]+)\s*Z:\s*([-\d\.]+)\s*\|\s*Buttons:\s*([01])\s+([01])\s+([01])\s+([01])",
-    re.IGNORECASE
-)
-
-IS_WINDOWS = sys.platform.startswith("win")
-
-# --- Windows SendInput setup ---
-if IS_WINDOWS:
-    user32 = ctypes.windll.user32
-    kernel32 = ctypes.windll.kernel32
-
-    ULONG_PTR = ctypes.c_size_t
-
-    class MOUSEINPUT(ctypes.Structure):
-        _fields_ = [
-            ("dx", ctypes.c_long),
-            ("dy", ctypes.c_long),
-            ("mouseData", ctypes.c_ulong),
-            ("dwFlags", ctypes.c_ulong),
-            ("time", ctypes.c_ulong),
-            ("dwExtraInfo", ULONG_PTR)
-        ]
-
-    class INPUT_union(ctypes.Union):
-        _fields_ = [("mi", MOUSEINPUT)]
-
-    class INPUT(ctypes.Structure):
-        _fields_ = [
-            ("type", ctypes.c_ulong),
-            ("union", INPUT_union)
-        ]
-
-    INPUT_MOUSE = 0
-    MOUSEEVENTF_MOVE = 0x0001
-    MOUSEEVENTF_LEFTDOWN = 0x0002
-    MOUSEEVENTF_LEFTUP = 0x0004
-    MOUSEEVENTF_RIGHTDOWN = 0x0008
-    MOUSEEVENTF_RIGHTUP = 0x0010
-    MOUSEEVENTF_ABSOLUTE = 0x8000
-    MOUSEEVENTF_VIRTUALDESK = 0x4000
-
-    class POINT(ctypes.Structure):
-        _fields_ = [("x", ctypes.c_long), ("y", ctypes.c_long)]
-
-    def win_get_cursor_pos():
-        pt = POINT()
-        user32.GetCursorPos(ctypes.byref(pt))
-        return pt.x, pt.y
-
-    def win_set_cursor_pos(x, y):
-        return user32.SetCursorPos(int(x), int(y))
-
-    def win_send_input_mouse(dwFlags, dx=0, dy=0, absolute=False):
-        inp = INPUT()
-        inp.type = INPUT_MOUSE
-        inp.union.mi.dx = dx
-        inp.union.mi.dy = dy
-        inp.union.mi.mouseData = 0
-        inp.union.mi.dwFlags = dwFlags
-        inp.union.mi.time = 0
-        inp.union.mi.dwExtraInfo = 0
-        
-        if absolute:
-            inp.union.mi.dwFlags |= MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_VIRTUALDESK
-        
-        n = user32.SendInput(1, ctypes.byref(inp), ctypes.sizeof(inp))
-        return n
-
-    def win_absolute_move(x, y):
-        # Get screen dimensions
-        screen_width = user32.GetSystemMetrics(0)  # SM_CXSCREEN
-        screen_height = user32.GetSystemMetrics(1)  # SM_CYSCREEN
-        
-        # Convert to absolute coordinates (0-65535)
-        abs_x = int(x * 65535 / screen_width)
-        abs_y = int(y * 65535 / screen_height)
-        
-        # Move cursor absolutely
-        win_send_input_mouse(
-            MOUSEEVENTF_MOVE,
-            dx=abs_x,
-            dy=abs_y,
-            absolute=True
-        )
-
-# Serial reader thread
-def serial_reader(port, baud, q, stop_event):
-    try:
-        ser = serial.Serial(port, baud, timeout=0.5)
-    except Exception as e:
-        q.put(("ERROR", f"Serial open error: {e}"))
-        return
-    q.put(("INFO", f"Opened {port} @ {baud}"))
-    while not stop_event.is_set():
-        try:
-            raw = ser.readline()
-            if not raw:
-                continue
-            line = raw.decode('utf-8', errors='ignore').strip()
-            if not line:
-                continue
-
-            m = RX_PATTERN.search(line)
-            if m:
-                try:
-                    x_val = float(m.group(1))
-                    y_val = float(m.group(2))
-                    z_val = float(m.group(3))
-                    b1 = int(m.group(4))
-                    b2 = int(m.group(5))
-                    b3 = int(m.group(6))
-                    b4 = int(m.group(7))
-                except Exception:
-                    continue
-                q.put(("DATA", {"x": z_val, "y": y_val, "buttons": (b1, b2, b3, b4)}))
-                continue
-
-            parts = [p.strip() for p in line.split(",") if p.strip() != ""]
-            if len(parts) >= 7:
-                try:
-                    xv = float(parts[0]); yv = float(parts[1]); zv = float(parts[2])
-                    b1 = int(parts[3]); b2 = int(parts[4]); b3 = int(parts[5]); b4 = int(parts[6])
-                    q.put(("DATA", {"x": zv, "y": yv, "buttons": (b1, b2, b3, b4)}))
-                except Exception:
-                    pass
-        except Exception as e:
-            q.put(("ERROR", f"Serial read error: {e}"))
-            break
-    try:
-        ser.close()
-    except:
-        pass
-    q.put(("INFO", "Serial thread exiting"))
-
-class OverlayWindow(QtWidgets.QWidget):
-    def __init__(self, data_queue, sensitivity=1.0, dot_radius=10):
-        flags = QtCore.Qt.FramelessWindowHint | QtCore.Qt.WindowStaysOnTopHint | QtCore.Qt.Tool
-        super().__init__(flags=flags)
-        self.setAttribute(QtCore.Qt.WA_TranslucentBackground)
-        self.setWindowFlag(QtCore.Qt.WindowDoesNotAcceptFocus)
-        self.setAttribute(QtCore.Qt.WA_TransparentForMouseEvents)
-
-        self.data_queue = data_queue
-        screen = QtWidgets.QApplication.primaryScreen()
-        size = screen.size()
-        self.sw = size.width()
-        self.sh = size.height()
-        self.setGeometry(0, 0, self.sw, self.sh)
-
-        self.sensitivity = sensitivity
-        self.dot_radius = dot_radius
-
-        self.cx = self.sw // 2
-        self.cy = self.sh // 2
-
-        self.lx = self.cx
-        self.ly = self.cy
-
-        self.ema_alpha = 0.2
-        self.smoothed_x = float(self.lx)
-        self.smoothed_y = float(self.ly)
-
-        self.cal_x = 0.0
-        self.cal_y = 0.0
-
-        self.prev_buttons = (0,0,0,0)
-        self.button_press_time = [0,0,0,0]
-        self.is_rightclick_held = False
-        self.laser_on = False
-        self.cursor_moved_for_click = False
-        self.original_cursor_pos = None
-
-        self.timer = QtCore.QTimer()
-        self.timer.timeout.connect(self.update_from_queue)
-        self.timer.start(12)
-
-        self._closing = False
-
-    def update_from_queue(self):
-        latest = None
-        while True:
-            try:
-                msg, val = self.data_queue.get_nowait()
-            except queue.Empty:
-                break
-            if msg == "DATA":
-                latest = val
-            elif msg == "ERROR":
-                print("[ERROR]", val)
-            elif msg == "INFO":
-                print("[INFO]", val)
-
-        if latest is not None:
-            raw_x = latest["x"]
-            raw_y = latest["y"]
-            b1,b2,b3,b4 = latest["buttons"]
-
-            SCALE = 8.0
-            z_clamped = max(-SCALE, min(SCALE, raw_x))
-            y_clamped = max(-SCALE, min(SCALE, raw_y))
-
-            nx = z_clamped / SCALE
-            ny = y_clamped / SCALE
-
-            nx = (nx - self.cal_x) * self.sensitivity*2
-            ny = (ny - self.cal_y) * self.sensitivity*2
-
-            target_x = int(self.cx + nx * (self.sw / 2))
-            target_y = int(self.cy + ny * (self.sh / 2))
-
-            self.smoothed_x = (1 - self.ema_alpha) * self.smoothed_x + self.ema_alpha * target_x
-            self.smoothed_y = (1 - self.ema_alpha) * self.smoothed_y + self.ema_alpha * target_y
-
-            self.lx = int(self.smoothed_x)
-            self.ly = int(self.smoothed_y)
-
-            self._process_buttons((b1,b2,b3,b4))
-
-            rad = max(60, self.dot_radius*4)
-            self.repaint(QtCore.QRect(self.lx-rad, self.ly-rad, rad*2, rad*2))
-
-    def _process_buttons(self, buttons):
-        prev = self.prev_buttons
-        now = buttons
-        t = time.time()
-
-        # b3 toggle laser (index 2)
-        if now[2] == 1 and prev[2] == 0:
-            self.laser_on = not self.laser_on
-            print("Laser toggled ->", self.laser_on)
-            if not self.laser_on and self.is_rightclick_held:
-                self._mouse_up_at(self.lx, self.ly, button='right')
-                self.is_rightclick_held = False
-
-        # b2 (index 1) press start
-        if now[1] == 1 and prev[1] == 0:
-            self.button_press_time[1] = t
-
-        # right-click hold start if held > 0.4s and laser is ON
-        if now[1] == 1 and self.laser_on:
-            if (t - self.button_press_time[1]) >= 0.4 and not self.is_rightclick_held:
-                print("Start right-click hold at", (self.lx, self.ly))
-                self._mouse_down_at(self.lx, self.ly, button='right')
-                self.is_rightclick_held = True
-
-        # release b2
-        if now[1] == 0 and prev[1] == 1:
-            duration = t - self.button_press_time[1]
-            if self.is_rightclick_held:
-                print("Release right-click at", (self.lx, self.ly))
-                self._mouse_up_at(self.lx, self.ly, button='right')
-                self.is_rightclick_held = False
-            else:
-                if duration < 0.4 and self.laser_on:
-                    print("Left click at", (self.lx, self.ly))
-                    self._click_at(self.lx, self.ly, button='left')
-
-        # b1 right arrow (index 0)
-        if now[0] == 1 and prev[0] == 0:
-            print("Right arrow pressed")
-            try:
-                pyautogui.press('right')
-            except Exception as e:
-                print("Key press error:", e)
-
-        # b4 left arrow (index 3)
-        if now[3] == 1 and prev[3] == 0:
-            print("Left arrow pressed")
-            try:
-                pyautogui.press('left')
-            except Exception as e:
-                print("Key press error:", e)
-
-        self.prev_buttons = now
-
-    # --- Fixed clicking functions ---
-    def _click_at(self, x, y, button='left'):
-        if IS_WINDOWS:
-            try:
-                # Save original position
-                orig_x, orig_y = win_get_cursor_pos()
-                
-                # Move cursor absolutely to target position
-                win_absolute_move(x, y)
-                time.sleep(0.01)  # Allow time for cursor to move
-                
-                # Perform click
-                if button == 'left':
-                    win_send_input_mouse(MOUSEEVENTF_LEFTDOWN)
-                    time.sleep(0.01)
-                    win_send_input_mouse(MOUSEEVENTF_LEFTUP)
-                else:
-                    win_send_input_mouse(MOUSEEVENTF_RIGHTDOWN)
-                    time.sleep(0.01)
-                    win_send_input_mouse(MOUSEEVENTF_RIGHTUP)
-                
-                # Restore original position
-                win_absolute_move(orig_x, orig_y)
-            except Exception as e:
-                print("Win click error:", e)
-        else:
-            # Non-Windows fallback
-            try:
-                old = pyautogui.position()
-                pyautogui.moveTo(x, y, duration=0)
-                pyautogui.click(button=button)
-                pyautogui.moveTo(old.x, old.y, duration=0)
-            except Exception as e:
-                print("Fallback click error:", e)
-
-    def _mouse_down_at(self, x, y, button='left'):
-        if IS_WINDOWS:
-            try:
-                # Save original position
-                self.original_cursor_pos = win_get_cursor_pos()
-                
-                # Move cursor absolutely to target position
-                win_absolute_move(x, y)
-                time.sleep(0.01)
-                
-                # Record that we moved the cursor for click operations
-                self.cursor_moved_for_click = True
-                
-                # Perform mouse down
-                if button == 'left':
-                    win_send_input_mouse(MOUSEEVENTF_LEFTDOWN)
-                else:
-                    win_send_input_mouse(MOUSEEVENTF_RIGHTDOWN)
-            except Exception as e:
-                print("Win mouseDown error:", e)
-        else:
-            try:
-                old = pyautogui.position()
-                pyautogui.moveTo(x, y, duration=0)
-                pyautogui.mouseDown(button=button)
-                pyautogui.moveTo(old.x, old.y, duration=0)
-            except Exception as e:
-                print("Fallback mouseDown error:", e)
-
-    def _mouse_up_at(self, x, y, button='left'):
-        if IS_WINDOWS:
-            try:
-                # If we moved the cursor for the down event, move back to target position
-                if self.cursor_moved_for_click:
-                    win_absolute_move(x, y)
-                    time.sleep(0.01)
-                
-                # Perform mouse up
-                if button == 'left':
-                    win_send_input_mouse(MOUSEEVENTF_LEFTUP)
-                else:
-                    win_send_input_mouse(MOUSEEVENTF_RIGHTUP)
-                
-                # Restore original position if we had moved it
-                if self.cursor_moved_for_click and self.original_cursor_pos:
-                    orig_x, orig_y = self.original_cursor_pos
-                    win_absolute_move(orig_x, orig_y)
-                    self.cursor_moved_for_click = False
-                    self.original_cursor_pos = None
-            except Exception as e:
-                print("Win mouseUp error:", e)
-                # Cleanup state on error
-                self.cursor_moved_for_click = False
-                self.original_cursor_pos = None
-        else:
-            try:
-                old = pyautogui.position()
-                pyautogui.moveTo(x, y, duration=0)
-                pyautogui.mouseUp(button=button)
-                pyautogui.moveTo(old.x, old.y, duration=0)
-            except Exception as e:
-                print("Fallback mouseUp error:", e)
-
-    def paintEvent(self, event):
-        if not self.laser_on:
-            return
-        qp = QtGui.QPainter(self)
-        qp.setRenderHint(QtGui.QPainter.Antialiasing)
-        r = self.dot_radius
-        color = QtGui.QColor(255, 0, 0, 230)
-        qp.setBrush(QtGui.QBrush(color))
-        qp.setPen(QtCore.Qt.NoPen)
-        qp.drawEllipse(int(self.lx - r), int(self.ly - r), r*2, r*2)
-
-    def keyPressEvent(self, event):
-        if event.key() == QtCore.Qt.Key_C:
-            self.cal_x = ((self.lx - self.cx) / (self.sw / 2))
-            self.cal_y = ((self.ly - self.cy) / (self.sh / 2))
-            print(f"Calibrated! cal_x={self.cal_x:.3f}, cal_y={self.cal_y:.3f}")
-        elif event.key() == QtCore.Qt.Key_Escape:
-            QtWidgets.QApplication.quit()
+import argparse
+import functools
+import threading
 
-    def closeEvent(self, event):
-        if self.is_rightclick_held:
-            try:
-                self._mouse_up_at(self.lx, self.ly, button='right')
-            except:
-                pass
-            self.is_rightclick_held = False
-        if self.cursor_moved_for_click and self.original_cursor_pos:
-            try:
-                orig_x, orig_y = self.original_cursor_pos
-                win_absolute_move(orig_x, orig_y)
-            except:
-                pass
-            self.cursor_moved_for_click = False
-            self.original_cursor_pos = None
-        self._closing = True
-        super().closeEvent(event)
+from airmouse import serial_io
+from airmouse.protocol import FRAME_MODES
+from airmouse.serial_io import DONGLE_IDS, parse_usb_id
+from airmouse.udp import UdpReceiver
+from airmouse.mailbox import SampleMailbox
+from airmouse.stats import LatencyLog
+from airmouse.recorder import SessionRecorder
+from airmouse.filters import FILTERS, make_filter, parse_filter_opts
+from airmouse.mapping import AREAS, WINDOW_MODES
+from airmouse.metrics import PipelineMetrics, serve_metrics
+from airmouse.gestures import GestureEngine
+from airmouse.calibration import AutoCalibrator
+from airmouse.jitter import PlayoutBuffer
+from airmouse.idle import IdleTracker
+from airmouse.buttons import load_config
+from airmouse.broadcast import DEFAULT_NAME, PointerBroadcast
+from airmouse.remote import with_recalibrate_chord
+from airmouse.headless import parse_screen_size
+from airmouse.injection import BACKENDS
+from airmouse.drag import ACTIONS as BUTTON_ACTIONS, DragRunner
+
+# The pipeline is app.py's (airmouse/remote.py); PyQt5 and pyautogui are
+# only imported once they are needed (the overlay in main(), injection on
+# the dispatcher thread): --headless never loads Qt.
+
+# Default button bindings (see airmouse/buttons.py); --buttons FILE
+# replaces them. b2 is a click when tapped, a right-button drag when held.
+BUTTONS = {
+    "long_press": 0.4,
+    "bindings": [
+        {"event": "press", "button": 2, "action": "toggle_laser"},
+        {"event": "click", "button": 1, "when": "laser", "action": "left_click"},
+        {"event": "long", "button": 1, "when": "laser", "action": "right_down"},
+        {"event": "long_release", "button": 1, "action": "right_up"},
+        {"event": "press", "button": 0, "action": "key", "args": ["right"]},
+        {"event": "press", "button": 3, "action": "key", "args": ["left"]},
+    ],
+}
+
+# The shared reader thread (airmouse/serial_io.py); test1.py also takes
+# the comma-separated x,y,z,b1,b2,b3,b4 lines.
+serial_reader = functools.partial(serial_io.serial_reader, csv_fallback=True)
+
+
+def __getattr__(name):
+    # `from test1 import OverlayWindow` loads Qt only when it is asked for.
+    if name == "OverlayWindow":
+        from airmouse.drag_overlay import DragOverlay
+        return DragOverlay
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def main():
     parser = argparse.ArgumentParser(description="Laser overlay (SendInput fix).")
-    parser.add_argument("--port", required=True, help="Serial port (e.g. COM3 or /dev/ttyUSB0)")
+    parser.add_argument("--port", help="Serial port (e.g. COM3 or /dev/ttyUSB0); "
+                                        "default: find the dongle by USB id")
+    parser.add_argument("--udp", metavar="HOST:PORT",
+                        help="Receive samples over UDP from a remote on Wi-Fi instead of a serial "
+                             "dongle, e.g. 0.0.0.0:5005 (see airmouse/udp.py)")
+    parser.add_argument("--usb-id", action="append", type=parse_usb_id, metavar="VID:PID",
+                        help="USB id of the dongle to look for, in hex (repeatable; default: common "
+                             "ESP32 USB-serial bridges)")
+    parser.add_argument("--usb-serial", metavar="SERIAL",
+                        help="Pick the dongle by USB serial number instead")
     parser.add_argument("--baud", type=int, default=115200)
     parser.add_argument("--sensitivity", type=float, default=1.0)
     parser.add_argument("--dot", type=int, default=12)
+    parser.add_argument("--frame", choices=FRAME_MODES, default="auto",
+                        help="Serial data format: text lines, binary frames, or auto-detect (default)")
+    parser.add_argument("--wakeup", choices=("event", "timer"), default="event",
+                        help="Process samples as they arrive (default) or poll every 12 ms")
+    parser.add_argument("--latency-stats", action="store_true",
+                        help="Print the sample-to-GUI dispatch latency distribution on exit")
+    parser.add_argument("--filter", choices=sorted(FILTERS), default="ema",
+                        help="Pointer smoothing filter (default: ema)")
+    parser.add_argument("--filter-opt", action="append", metavar="NAME=VALUE",
+                        help="Filter parameter, e.g. beta=0.01 or predict=0.03 (repeatable)")
+    parser.add_argument("--paint-stats", action="store_true",
+                        help="Print paintEvent duration statistics on exit")
+    parser.add_argument("--frame-stats", action="store_true",
+                        help="Print frame pacing statistics (missed frames, paint time) on exit")
+    parser.add_argument("--stats-interval", type=float, default=0, metavar="SECONDS",
+                        help="Print per-stage pipeline timing histograms every SECONDS")
+    parser.add_argument("--stats-listen", metavar="HOST:PORT|unix:PATH",
+                        help="Serve per-stage timings in Prometheus text format, e.g. 127.0.0.1:9464")
+    parser.add_argument("--window", choices=WINDOW_MODES, default="full",
+                        help="Full-screen translucent overlay, or a small sprite window that follows the dot")
+    parser.add_argument("--screens", choices=AREAS, default="all",
+                        help="Map the pointer across all screens (virtual desktop) or the primary one")
+    parser.add_argument("--record", metavar="FILE",
+                        help="Record every decoded sample to a binary session file (see airmouse/recorder.py)")
+    parser.add_argument("--buttons", metavar="FILE",
+                        help="Button bindings (JSON): chords, long press, double click, auto-repeat; "
+                             "see airmouse/buttons.py")
+    parser.add_argument("--gestures", action="store_true",
+                        help="With the laser off, swipe for next/previous slide, move up/down to "
+                             "scroll and twist to zoom")
+    parser.add_argument("--gesture-opt", action="append", metavar="NAME=VALUE",
+                        help="Gesture engine parameter, e.g. onset=0.8 (repeatable)")
+    parser.add_argument("--auto-cal", action="store_true",
+                        help="Keep the pointer centred: recalibrate from still rest periods with "
+                             "the laser off and follow the sensor drift in between; buttons 0+3 "
+                             "together recentre")
+    parser.add_argument("--cal-opt", action="append", metavar="NAME=VALUE",
+                        help="Auto-calibration parameter, e.g. tau=10 (repeatable)")
+    parser.add_argument("--injection", choices=BACKENDS, default="auto",
+                        help="How keys, clicks and cursor moves are injected (default: auto; "
+                             "see airmouse/injection.py)")
+    parser.add_argument("--cursor", action="store_true",
+                        help="Move the real cursor with the laser instead of drawing a dot, "
+                             "once per display frame")
+    parser.add_argument("--broadcast", nargs="?", const=DEFAULT_NAME, metavar="NAME",
+                        help="Publish every pointer sample in shared memory for other processes "
+                             f"(default name: {DEFAULT_NAME}; see airmouse/broadcast.py)")
+    parser.add_argument("--jitter-buffer", action="store_true",
+                        help="Draw the dot an adaptive delay behind bursty samples so it moves "
+                             "smoothly (see airmouse/jitter.py)")
+    parser.add_argument("--jitter-opt", action="append", metavar="NAME=VALUE",
+                        help="Playout buffer option, e.g. max_delay=0.05 or quantile=99 (repeatable)")
+    parser.add_argument("--no-idle", action="store_true",
+                        help="Keep processing every sample while the laser is off or the hand is still")
+    parser.add_argument("--idle-opt", action="append", metavar="NAME=VALUE",
+                        help="Idle mode option, e.g. after=1.0 (seconds still) or motion=0.02 (repeatable)")
+    parser.add_argument("--headless", action="store_true",
+                        help="No overlay and no Qt: run the buttons, gestures and key/click "
+                             "injection only (see airmouse/headless.py)")
+    parser.add_argument("--screen-size", metavar="WxH",
+                        help="With --headless, the screen the pointer is mapped onto "
+                             "(default: the primary screen)")
+    parser.add_argument("--cursor-rate", type=float, default=60.0, metavar="HZ",
+                        help="With --headless --cursor, the most cursor moves per second (default: 60)")
     args = parser.parse_args()
+    screen_size = None
+    if args.screen_size:
+        try:
+            screen_size = parse_screen_size(args.screen_size)
+        except ValueError as e:
+            parser.error(f"--screen-size: {e}")
+    if args.cursor_rate <= 0:
+        parser.error("--cursor-rate must be positive")
+    try:
+        pointer_filter = make_filter(args.filter, args.filter_opt)
+    except (TypeError, ValueError) as e:
+        parser.error(f"--filter-opt: {e}")
+    buttons = BUTTONS
+    if args.buttons:
+        try:
+            buttons = load_config(args.buttons)
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            parser.error(f"--buttons: {e}")
+        unknown = {b["action"] for b in buttons.get("bindings", ())} - set(BUTTON_ACTIONS)
+        if unknown:
+            parser.error(f"--buttons: unknown actions {', '.join(sorted(unknown))} "
+                         f"(available: {', '.join(BUTTON_ACTIONS)})")
+    gesture_opts = None
+    if args.gestures:
+        try:
+            gesture_opts = parse_filter_opts(args.gesture_opt)
+            GestureEngine(**gesture_opts)
+        except (TypeError, ValueError) as e:
+            parser.error(f"--gesture-opt: {e}")
+    cal_opts = None
+    if args.auto_cal:
+        try:
+            cal_opts = parse_filter_opts(args.cal_opt)
+            AutoCalibrator(**cal_opts)
+        except (TypeError, ValueError) as e:
+            parser.error(f"--cal-opt: {e}")
+        if not args.buttons:
+            buttons = with_recalibrate_chord(buttons)
+    jitter_opts = None
+    if args.jitter_buffer:
+        if args.headless:
+            parser.error("--jitter-buffer needs the overlay (no --headless)")
+        try:
+            jitter_opts = parse_filter_opts(args.jitter_opt)
+            PlayoutBuffer(**jitter_opts)
+        except (TypeError, ValueError) as e:
+            parser.error(f"--jitter-opt: {e}")
+    idle_opts = None
+    if not args.no_idle:
+        try:
+            idle_opts = parse_filter_opts(args.idle_opt)
+            IdleTracker(None, **idle_opts)
+        except (TypeError, ValueError) as e:
+            parser.error(f"--idle-opt: {e}")
+
+    metrics = PipelineMetrics() if args.stats_interval or args.stats_listen else None
+    stats_server = None
+    if args.stats_listen:
+        try:
+            stats_server = serve_metrics(metrics, args.stats_listen)
+        except (OSError, ValueError) as e:
+            parser.error(f"--stats-listen: {e}")
+        print("[INFO] Serving pipeline stats on", args.stats_listen)
 
-    q = queue.Queue()
+    broadcast = None
+    if args.broadcast:
+        try:
+            broadcast = PointerBroadcast(args.broadcast)
+        except (OSError, ValueError) as e:
+            parser.error(f"--broadcast: {e}")
+        print("[INFO] Broadcasting the pointer as", repr(args.broadcast))
+
+    q = SampleMailbox()
     stop_event = threading.Event()
-    reader = threading.Thread(target=serial_reader, args=(args.port, args.baud, q, stop_event), daemon=True)
+    recorder = SessionRecorder(args.record) if args.record else None
+    udp = None
+    if args.udp:
+        try:
+            udp = UdpReceiver(args.udp, q, stop_event, frame_mode=args.frame, recorder=recorder,
+                              metrics=metrics)
+        except (OSError, ValueError) as e:
+            if broadcast is not None:
+                broadcast.close()
+            parser.error(f"--udp: {e}")
+        reader = threading.Thread(target=udp.run, name="udp-ingest", daemon=True)
+    else:
+        reader = threading.Thread(target=serial_reader,
+                                  args=(args.port, args.baud, q, stop_event, args.frame, recorder, metrics),
+                                  kwargs={"usb_ids": args.usb_id or DONGLE_IDS, "usb_serial": args.usb_serial},
+                                  daemon=True)
     reader.start()
 
-    app = QtWidgets.QApplication(sys.argv)
-    overlay = OverlayWindow(q, sensitivity=args.sensitivity, dot_radius=args.dot)
-    overlay.show()
-
-    def sigint_handler(sig, frame):
-        stop_event.set()
-        QtWidgets.QApplication.quit()
-    signal.signal(signal.SIGINT, sigint_handler)
-
-    try:
-        rc = app.exec_()
-    finally:
+    latency_log = LatencyLog() if args.latency_stats else None
+    if args.headless:
+        overlay = DragRunner([q], stop_event, size=screen_size, latency_log=latency_log,
+                             pointer_filter=pointer_filter, metrics=metrics, gesture_opts=gesture_opts,
+                             buttons=buttons, cal_opts=cal_opts, injection=args.injection,
+                             cursor_rate=args.cursor_rate if args.cursor else None, broadcast=broadcast,
+                             link_stats=metrics is not None, idle_opts=idle_opts,
+                             gain=args.sensitivity * 2)
+        print("[INFO] Screen:", overlay.describe())
+        overlay.injector.warm_up()
+    else:
+        from PyQt5 import QtWidgets, QtCore
+        from airmouse.drag_overlay import DragOverlay
+        from airmouse.qt_wakeup import SignalWaker
+
+        app = QtWidgets.QApplication(sys.argv)
+        # SIGTERM and Ctrl+C quit the event loop, so cleanup() runs.
+        signal_waker = SignalWaker(app)
+        overlay = DragOverlay([q], dot_radius=args.dot, wakeup=args.wakeup, latency_log=latency_log,
+                              pointer_filter=pointer_filter,
+                              paint_log=LatencyLog() if args.paint_stats or args.frame_stats else None,
+                              window_mode=args.window, screens=args.screens, metrics=metrics,
+                              gesture_opts=gesture_opts, buttons=buttons, cal_opts=cal_opts,
+                              injection=args.injection, cursor=args.cursor, broadcast=broadcast,
+                              jitter_opts=jitter_opts, link_stats=metrics is not None,
+                              idle_opts=idle_opts, gain=args.sensitivity * 2)
+        print("[INFO] Desktop:", overlay.desktop.describe())
+        overlay.show()
+        # Set the injection backend up off the GUI thread now the overlay is up.
+        overlay.injector.warm_up()
+
+        if args.stats_interval:
+            stats_timer = QtCore.QTimer()
+            stats_timer.timeout.connect(lambda: print("[STATS] Pipeline stages:\n" + metrics.report()
+                                                      + "\n[STATS] " + overlay.link_summary()))
+            stats_timer.start(int(args.stats_interval * 1000))
+
+    def cleanup():
         stop_event.set()
         reader.join(timeout=0.5)
-    sys.exit(rc)
+        if udp is not None:
+            print("[INFO]", udp.summary())
+        print("[INFO] Mailbox:", q.summary())
+        if recorder is not None:
+            recorder.close()
+            print("[INFO]", recorder.summary())
+        if broadcast is not None:
+            broadcast.close()
+            print("[INFO]", broadcast.summary())
+        overlay.end_drag()
+        overlay.dispatcher.close()
+        overlay.injector.close()
+        print("[INFO]", overlay.dispatcher.summary())
+        if args.cursor:
+            print("[INFO]", overlay.cursor_summary())
+        if latency_log is not None:
+            print("[INFO]", latency_log.summary(
+                f"Dispatch latency ({'headless' if args.headless else args.wakeup})"))
+        if stats_server is not None:
+            stats_server.shutdown()
+            stats_server.server_close()
+        if metrics is not None:
+            print("[INFO] Pipeline stages:\n" + metrics.report())
+        if metrics is not None or jitter_opts is not None:
+            print("[INFO]", overlay.link_summary())
+        if idle_opts is not None:
+            print("[INFO]", overlay.idle_summary())
+        if gesture_opts is not None:
+            print("[INFO]", overlay.gesture_summary())
+        if cal_opts is not None:
+            print("[INFO]", overlay.calibration_summary())
+        if args.headless:
+            return
+        if args.frame_stats:
+            print("[INFO]", overlay.frame_summary())
+        elif overlay.paint_log is not None:
+            print("[INFO]", overlay.paint_log.summary("Paint time"))
+
+    if args.headless:
+        # No event loop to quit: SIGTERM and Ctrl+C stop the runner, then
+        # the same cleanup runs.
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+        if args.stats_interval:
+            def report():
+                while not stop_event.wait(args.stats_interval):
+                    print("[STATS] Pipeline stages:\n" + metrics.report() + "\n[STATS] "
+                          + overlay.link_summary())
+            threading.Thread(target=report, daemon=True).start()
+        try:
+            overlay.run()
+        except KeyboardInterrupt:
+            pass
+        cleanup()
+        return
+    app.aboutToQuit.connect(cleanup)
+    sys.exit(app.exec_())
 
 if __name__ == "__main__":
     main()